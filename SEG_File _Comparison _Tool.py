@@ -1,14 +1,31 @@
 import os
 import sys
-import shutil
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
                              QLabel, QLineEdit, QPushButton, QFileDialog, QTreeWidget,
                              QTreeWidgetItem, QTabWidget, QTextEdit, QHeaderView, QMessageBox,
-                             QGroupBox, QComboBox, QRadioButton, QProgressBar, QDialog,
-                             QScrollArea, QFrame, QToolBar, QStatusBar, QGridLayout)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize
+                             QGroupBox, QComboBox, QRadioButton, QCheckBox, QProgressBar, QDialog,
+                             QScrollArea, QFrame, QToolBar, QStatusBar, QGridLayout, QSpinBox,
+                             QTreeView, QDoubleSpinBox, QTableView)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QAbstractTableModel, QModelIndex
 from PyQt5.QtGui import QColor, QBrush, QFont, QIcon
 
+from seg_engine import SegComparisonEngine, SegComparisonCancelled, categorize_results, leaderboard, results_summary
+from seg_export import export_category_files, EXPORT_MODES, ARCHIVE_FORMATS
+from seg_results import ResultStore
+from seg_metrics import save_metrics_csv, save_confusion_csv
+from seg_spans import SpanStore, SPANS_FILENAME
+from seg_align import ALIGN_BAND
+from seg_bins import Binning, BinningError, DEFAULT_BINNING
+from seg_profile import timed, STAGE_NAMES
+from seg_adjacency import adjacency_summary
+from seg_merge import merge_results_files, DirectoryMismatchError
+from seg_session import save_session, load_session, SESSION_SUFFIX
+from seg_diff import ResultsDiff, load_run, DIFF_STATUSES, STATUS_NAMES
+
 
 class ModernButton(QPushButton):
     def __init__(self, text, parent=None, primary=False):
@@ -135,83 +152,436 @@ class DirectoryInput(QWidget):
 
 class ComparisonWorker(QThread):
     progress = pyqtSignal(int)
-    finished = pyqtSignal(dict)
+    finished = pyqtSignal(object)
+    models_finished = pyqtSignal(object)
+    partial_results = pyqtSignal(object)
+    cancelled = pyqtSignal(object)
     error = pyqtSignal(str)
     file_processed = pyqtSignal(str)
 
-    def __init__(self, true_dir, pred_dir):
+    def __init__(self, true_dir, pred_dir, workers=1, streaming=False, cache=False, metrics=False,
+                 extra_pred_dirs=(), recursive=False, checkpoint=False, resume=False, spans=False,
+                 align=False, align_band=ALIGN_BAND, profile=False, adjacency=False):
         super().__init__()
         self.true_dir = true_dir
         self.pred_dir = pred_dir
+        self.extra_pred_dirs = list(extra_pred_dirs)
+        self.engine = SegComparisonEngine(progress_callback=self.progress.emit,
+                                          file_callback=self.file_processed.emit,
+                                          workers=workers, streaming=streaming, cache=cache,
+                                          metrics=metrics, recursive=recursive,
+                                          checkpoint=checkpoint, resume=resume, spans=spans,
+                                          align=align, align_band=align_band, profile=profile,
+                                          adjacency=adjacency)
+        # 多模型对比时各目录的结果交替完成，只在单目录模式下逐批显示
+        if not self.extra_pred_dirs:
+            self.engine.results_callback = self.partial_results.emit
 
     def run(self):
         try:
-            results = self.compare_seg_directories(self.true_dir, self.pred_dir)
-            self.finished.emit(results)
+            if self.extra_pred_dirs:
+                results_by_model = self.engine.compare_multi(self.true_dir, [self.pred_dir] + self.extra_pred_dirs)
+                self.models_finished.emit(results_by_model)
+            else:
+                results = self.engine.compare_seg_directories(self.true_dir, self.pred_dir)
+                self.finished.emit(results)
+        except SegComparisonCancelled as e:
+            self.cancelled.emit(e.results)
         except Exception as e:
             self.error.emit(str(e))
 
-    def get_seg_files(self, directory):
-        return {f for f in os.listdir(directory) if f.lower().endswith('.seg')}
+    def cancel(self):
+        self.engine.cancel()
 
-    def read_labels(self, filepath):
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            return [line.strip() for line in f if line.strip()]
+    def pause(self):
+        self.engine.pause()
 
-    def compare_labels(self, true_labels, pred_labels):
-        mismatches = []
-        min_len = min(len(true_labels), len(pred_labels))
+    def unpause(self):
+        self.engine.unpause()
 
-        for i in range(min_len):
-            if true_labels[i] != pred_labels[i]:
-                mismatches.append(i)
 
-        length_diff = len(true_labels) - len(pred_labels)
-        return mismatches, abs(length_diff)
+class ExportWorker(QThread):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
 
-    def compare_seg_directories(self, true_dir, pred_dir):
-        true_files = self.get_seg_files(true_dir)
-        pred_files = self.get_seg_files(pred_dir)
+    def __init__(self, results, files, category_dir, copy_ref, copy_pred, mode="copy", archive=None):
+        super().__init__()
+        self.results = results
+        self.files = files
+        self.category_dir = category_dir
+        self.copy_ref = copy_ref
+        self.copy_pred = copy_pred
+        self.mode = mode
+        self.archive = archive
+        self.cancel_event = threading.Event()
 
-        common_files = true_files & pred_files
-        if not common_files:
-            self.error.emit("两个目录下没有相同名称的.seg文件")
-            return {}
+    def cancel(self):
+        self.cancel_event.set()
 
-        results = {}
-        total_files = len(common_files)
+    def run(self):
+        try:
+            report = export_category_files(self.results, self.files, self.category_dir,
+                                           copy_ref=self.copy_ref, copy_pred=self.copy_pred,
+                                           mode=self.mode, archive=self.archive,
+                                           progress_callback=self.progress.emit,
+                                           cancel_event=self.cancel_event)
+            self.finished.emit(report)
+        except Exception as e:
+            self.error.emit(str(e))
 
-        for i, filename in enumerate(sorted(common_files)):
-            true_path = os.path.join(true_dir, filename)
-            pred_path = os.path.join(pred_dir, filename)
 
-            try:
-                true_labels = self.read_labels(true_path)
-                pred_labels = self.read_labels(pred_path)
-            except Exception as e:
-                continue
+def error_rate_color(error_rate):
+    if error_rate > 50:
+        return QColor(220, 53, 69)
+    elif error_rate > 30:
+        return QColor(255, 99, 132)
+    elif error_rate > 20:
+        return QColor(255, 159, 67)
+    elif error_rate > 10:
+        return QColor(255, 205, 86)
+    elif error_rate > 5:
+        return QColor(72, 187, 120)
+    elif error_rate > 0:
+        return QColor(54, 162, 235)
+    return None
 
-            mismatches, length_diff = self.compare_labels(true_labels, pred_labels)
-            total_labels = len(true_labels)
-            error_rate = (len(mismatches) / total_labels) * 100 if total_labels > 0 else 0
-
-            results[filename] = {
-                'total_labels': total_labels,
-                'mismatches': len(mismatches),
-                'length_diff': length_diff,
-                'error_rate': error_rate,
-                'mismatch_indices': mismatches,
-                'true_path': true_path,
-                'pred_path': pred_path,
-                'true_filename': os.path.basename(true_path),
-                'pred_filename': os.path.basename(pred_path)
-            }
 
-            self.file_processed.emit(filename)
-            progress = int((i + 1) / total_files * 100)
-            self.progress.emit(progress)
+class ResultTableModel(QAbstractTableModel):
+    HEADERS = ["参考文件", "预测文件", "总标签数", "不匹配数", "长度差异", "错误率", "状态"]
+    SORT_KEYS = [None, None, 'total_labels', 'mismatches', 'length_diff', 'error_rate', 'error_rate']
+    COLORED_COLUMNS = (3, 4, 5)
 
-        return results
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.results = ResultStore()
+        self.names = []
+        # 当前显示的行（names中的下标），排序和筛选只重排这个列表
+        self.rows = []
+        self.min_error = None
+        self.max_error = None
+        self.name_filter = ""
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+
+    def set_results(self, results):
+        self.beginResetModel()
+        self.results = results
+        self.names = list(results)
+        self.rows = self.filtered_rows()
+        self.sort_rows()
+        self.endResetModel()
+
+    def set_filter(self, min_error=None, max_error=None, name_filter=""):
+        self.beginResetModel()
+        self.min_error = min_error
+        self.max_error = max_error
+        self.name_filter = name_filter.lower()
+        self.rows = self.filtered_rows()
+        self.sort_rows()
+        self.endResetModel()
+
+    def column_values(self, key):
+        if isinstance(self.results, ResultStore):
+            return self.results.column(key)
+        return [self.results[name][key] for name in self.names]
+
+    def append_results(self, names):
+        # 比较进行中追加的结果：未排序时直接插入到末尾，否则整体重新排序
+        start = len(self.names)
+        self.names.extend(names)
+        rows = self.filtered_rows(range(start, len(self.names)))
+        if not rows:
+            return
+        if self.sort_column is None:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+        else:
+            self.layoutAboutToBeChanged.emit()
+            self.rows.extend(rows)
+            self.sort_rows()
+            self.layoutChanged.emit()
+
+    def filtered_rows(self, rows=None):
+        if rows is None:
+            rows = range(len(self.names))
+        if self.min_error is not None or self.max_error is not None:
+            rates = self.column_values('error_rate')
+            low = self.min_error if self.min_error is not None else float('-inf')
+            high = self.max_error if self.max_error is not None else float('inf')
+            rows = [row for row in rows if low <= rates[row] <= high]
+        if self.name_filter:
+            rows = [row for row in rows if self.name_filter in self.names[row].lower()]
+        return list(rows)
+
+    def sort_rows(self):
+        if self.sort_column is None:
+            return
+        reverse = self.sort_order == Qt.DescendingOrder
+        key = self.SORT_KEYS[self.sort_column]
+        if key is None:
+            names = self.names
+            if self.sort_column == 1:
+                names = self.column_values('pred_filename')
+            self.rows.sort(key=names.__getitem__, reverse=reverse)
+        else:
+            values = self.column_values(key)
+            self.rows.sort(key=values.__getitem__, reverse=reverse)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        self.sort_rows()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def filename(self, index):
+        return self.names[self.rows[index.row()]]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            data = self.results[self.filename(index)]
+            if column == 0:
+                # 递归比较时显示相对路径
+                return self.filename(index)
+            elif column == 1:
+                return data['pred_filename']
+            elif column == 2:
+                return str(data['total_labels'])
+            elif column == 3:
+                return str(data['mismatches'])
+            elif column == 4:
+                return str(data['length_diff'])
+            elif column == 5:
+                return f"{data['error_rate']:.2f}%"
+            return "✅" if data['error_rate'] == 0 else "⚠️" if data['error_rate'] < 5 else "❌"
+
+        if role == Qt.ForegroundRole and column in self.COLORED_COLUMNS:
+            color = error_rate_color(self.results[self.filename(index)]['error_rate'])
+            return QBrush(color) if color is not None else None
+
+        return None
+
+
+class DiffTableModel(QAbstractTableModel):
+    HEADERS = ["文件名", "状态", "基准错误率", "新错误率", "变化", "基准分类", "新分类"]
+    SORT_KEYS = ['filename', 'status', 'base_error_rate', 'new_error_rate', 'delta', 'base_category', 'new_category']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.diff = None
+        self.rows = []
+        self.status = None
+        self.sort_column = 4
+        self.sort_order = Qt.DescendingOrder
+
+    def set_diff(self, diff):
+        self.beginResetModel()
+        self.diff = diff
+        self.rows = self.filtered_rows()
+        self.sort_rows()
+        self.endResetModel()
+
+    def set_status(self, status):
+        self.beginResetModel()
+        self.status = status
+        self.rows = self.filtered_rows()
+        self.sort_rows()
+        self.endResetModel()
+
+    def filtered_rows(self):
+        if self.diff is None:
+            return []
+        if self.status is None:
+            return list(range(len(self.diff)))
+        code = DIFF_STATUSES.index(self.status)
+        return [row for row, status in enumerate(self.diff.status) if status == code]
+
+    def sort_rows(self):
+        if self.diff is None:
+            return
+        values = self.diff.column(self.SORT_KEYS[self.sort_column])
+        self.rows.sort(key=values.__getitem__, reverse=self.sort_order == Qt.DescendingOrder)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        self.sort_rows()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            diff = self.diff
+            if column == 0:
+                return diff.names[row]
+            elif column == 1:
+                return STATUS_NAMES[diff.status_name(row)]
+            elif column == 2:
+                return f"{diff.base_error_rate[row]:.2f}%"
+            elif column == 3:
+                return f"{diff.new_error_rate[row]:.2f}%"
+            elif column == 4:
+                return f"{diff.delta[row]:+.2f}%"
+            elif column == 5:
+                return diff.category(diff.base_category[row])
+            return diff.category(diff.new_category[row])
+
+        if role == Qt.ForegroundRole and column in (1, 4):
+            status = self.diff.status_name(row)
+            if status in ('newly_broken', 'regressed'):
+                return QBrush(QColor(220, 53, 69))
+            if status in ('fixed', 'improved'):
+                return QBrush(QColor(40, 167, 69))
+
+        return None
+
+
+class SpanTableModel(QAbstractTableModel):
+    HEADERS = ["起始位置", "结束位置", "长度", "参考标签", "预测标签"]
+    PAGE_SIZE = 500
+    CACHED_PAGES = 8
+
+    def __init__(self, store, filename, true_path, count, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.filename = filename
+        self.true_path = true_path
+        self.count = count
+        # 只缓存最近访问的几页，视图滚动到哪里就从文件中读取哪一页
+        self.pages = OrderedDict()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def span(self, row):
+        page_number, offset = divmod(row, self.PAGE_SIZE)
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self.store.page(self.filename, self.true_path, page_number * self.PAGE_SIZE, self.PAGE_SIZE)
+            self.pages[page_number] = page
+            if len(self.pages) > self.CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_number)
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        span = self.span(index.row())
+        if span is None:
+            return None
+        start, length, true_label, pred_label = span
+        return [str(start), str(start + length - 1), str(length), true_label, pred_label][index.column()]
+
+
+class DiffViewerDialog(QDialog):
+    def __init__(self, store, filename, data, count, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.filename = filename
+        self.data = data
+        self.setWindowTitle(f"差异查看 - {filename}")
+        self.resize(640, 560)
+
+        layout = QVBoxLayout(self)
+        info = QLabel(f"参考文件: {data['true_path']}\n预测文件: {data['pred_path']}\n"
+                      f"总标签数: {data['total_labels']}    不匹配标签数: {data['mismatches']}    "
+                      f"长度差异: {data['length_diff']}    错误率: {data['error_rate']:.2f}%    "
+                      f"不匹配段: {count}" +
+                      (f"    对齐后错误率: {data['aligned_error_rate']:.2f}%（编辑距离 {data['aligned_mismatches']}）"
+                       if 'aligned_error_rate' in data else "") +
+                      (f"\n边界面错误率: {data['boundary_error_rate']:.2f}%（{data['boundary_faces']} 个面）    "
+                       f"内部面错误率: {data['interior_error_rate']:.2f}%    "
+                       f"邻居容差准确率: {data['tolerant_accuracy']:.2f}%"
+                       if 'boundary_error_rate' in data else ""))
+        info.setWordWrap(True)
+        layout.addWidget(info)
+
+        jump_layout = QHBoxLayout()
+        jump_layout.addWidget(QLabel("跳转到位置"))
+        self.position_spin = QSpinBox()
+        self.position_spin.setRange(0, max(0, data['total_labels'] - 1))
+        jump_layout.addWidget(self.position_spin)
+        jump_btn = QPushButton("跳转")
+        jump_btn.clicked.connect(self.jump_to_position)
+        jump_layout.addWidget(jump_btn)
+        jump_layout.addStretch()
+        export_btn = QPushButton("导出CSV")
+        export_btn.clicked.connect(self.export_spans)
+        jump_layout.addWidget(export_btn)
+        layout.addLayout(jump_layout)
+
+        self.model = SpanTableModel(store, filename, data['true_path'], count, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setAlternatingRowColors(True)
+        self.view.setSelectionBehavior(QTableView.SelectRows)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.view)
+
+    def jump_to_position(self):
+        row = self.store.find(self.filename, self.data['true_path'], self.position_spin.value())
+        if row is None:
+            QMessageBox.information(self, "提示", "该位置之后没有不匹配的标签")
+            return
+        index = self.model.index(row, 0)
+        self.view.scrollTo(index, QTableView.PositionAtTop)
+        self.view.selectRow(row)
+
+    def export_spans(self):
+        base = os.path.splitext(os.path.basename(self.filename))[0]
+        path, _ = QFileDialog.getSaveFileName(self, "导出不匹配段", f"{base}_spans.csv", "CSV文件 (*.csv)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                self.store.save_csv(self.filename, self.data['true_path'], f)
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"导出失败: {e}")
 
 
 class StatisticsPanel(QFrame):
@@ -236,7 +606,8 @@ class StatisticsPanel(QFrame):
             ("📊", "文件总数", "total_files", "0"),
             ("🔢", "总标签数", "total_labels", "0"),
             ("❌", "不匹配数", "mismatches", "0"),
-            ("📈", "错误率", "error_rate", "0%")
+            ("📈", "错误率", "error_rate", "0%"),
+            ("🎯", "平均IoU", "mean_iou", "-")
         ]
 
         for i, (icon, title, obj_name, value) in enumerate(stats):
@@ -268,24 +639,22 @@ class StatisticsPanel(QFrame):
 
         return widget
 
-    def update_stats(self, results):
-        if not results:
+    def update_stats(self, summary, confusion=None):
+        # summary为results_summary的结果或比较过程中累加的计数，不再遍历全部结果
+        if not summary:
             return
 
-        total_files = len(results)
-        total_labels = sum(data['total_labels'] for data in results.values())
-        total_mismatches = sum(data['mismatches'] for data in results.values())
-        overall_error_rate = (total_mismatches / total_labels) * 100 if total_labels > 0 else 0
-
-        self.total_files.setText(str(total_files))
-        self.total_labels.setText(str(total_labels))
-        self.mismatches.setText(str(total_mismatches))
-        self.error_rate.setText(f"{overall_error_rate:.1f}%")
+        self.total_files.setText(str(summary['files']))
+        self.total_labels.setText(str(summary['total_labels']))
+        self.mismatches.setText(str(summary['total_mismatches']))
+        self.error_rate.setText(f"{summary['error_rate']:.1f}%")
+        self.mean_iou.setText(f"{confusion.mean_iou() * 100:.1f}%" if confusion else "-")
 
 
 class HelpDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, binning=None):
         super().__init__(parent)
+        self.binning = binning or DEFAULT_BINNING
         self.setWindowTitle("使用说明")
         self.setFixedSize(500, 400)
         self.setStyleSheet("""
@@ -323,13 +692,7 @@ class HelpDialog(QDialog):
 
 📊 错误分类
 
-• 完美匹配(0%)
-• 极轻微错误(0-1%)
-• 轻微错误(1-3%)
-• 中等错误(3-10%)
-• 严重错误(10%+)
-• 长度不一致
-        """)
+""" + self.binning_text())
         layout.addWidget(content)
 
         ok_btn = ModernButton("确定", primary=True)
@@ -337,6 +700,23 @@ class HelpDialog(QDialog):
         ok_btn.clicked.connect(self.accept)
         layout.addWidget(ok_btn)
 
+    def binning_text(self):
+        # 按当前分箱方案列出各分类及其错误率范围
+        edges = self.binning.edges
+        lines = []
+        for k, label in enumerate(self.binning.labels):
+            if not edges:
+                rule = "所有文件"
+            elif k == 0:
+                rule = "错误率为 0%" if edges[0] == 0 else f"错误率 ≤ {edges[0]:g}%"
+            elif k < len(edges):
+                rule = f"{edges[k - 1]:g}% < 错误率 ≤ {edges[k]:g}%"
+            else:
+                rule = f"错误率 > {edges[-1]:g}%"
+            lines.append(f"• {label}：{rule}")
+        lines.append(f"• {self.binning.length_mismatch_label}：两个文件标签数不同")
+        return "\n".join(lines) + "\n"
+
 
 class SegComparisonTool(QMainWindow):
     def __init__(self):
@@ -347,8 +727,15 @@ class SegComparisonTool(QMainWindow):
 
         self.true_dir = ""
         self.pred_dir = ""
-        self.results = {}
+        self.results = ResultStore()
         self.categories = {}
+        self.model_results = {}
+        self.binning = DEFAULT_BINNING
+        # 运行对比的基准结果（ResultStore）及对比结果
+        self.diff_base = None
+        self.diff = None
+        # 比较结果尚未保存为会话文件，关闭窗口前提示
+        self.unsaved = False
 
         self.setup_styles()
         self.init_ui()
@@ -374,7 +761,7 @@ class SegComparisonTool(QMainWindow):
                 font-weight: 600;
                 border-bottom: 2px solid #0084FF;
             }
-            QTreeWidget {
+            QTreeWidget, QTreeView {
                 border: 1px solid #E0E0E0;
                 border-radius: 6px;
                 background-color: white;
@@ -463,6 +850,18 @@ class SegComparisonTool(QMainWindow):
         layout.addWidget(self.toolbar_title)
         layout.addStretch()
 
+        open_session_btn = ModernButton("打开会话")
+        open_session_btn.clicked.connect(self.open_session)
+        layout.addWidget(open_session_btn)
+
+        save_session_btn = ModernButton("保存会话")
+        save_session_btn.clicked.connect(self.save_session)
+        layout.addWidget(save_session_btn)
+
+        load_btn = ModernButton("加载结果文件")
+        load_btn.clicked.connect(self.load_results_files)
+        layout.addWidget(load_btn)
+
         clear_btn = ModernButton("清空结果")
         clear_btn.clicked.connect(self.clear_results)
         layout.addWidget(clear_btn)
@@ -511,11 +910,55 @@ class SegComparisonTool(QMainWindow):
         # 预测目录
         pred_layout = QVBoxLayout()
         pred_layout.addWidget(QLabel("预测目录"))
-        self.pred_dir_input = DirectoryInput("选择预测标签目录...")
+        self.pred_dir_input = DirectoryInput("选择预测标签目录（多个模型目录用 ; 分隔）...")
         self.pred_dir_input.browse_btn.clicked.connect(self.browse_pred_dir)
         pred_layout.addWidget(self.pred_dir_input)
         content_layout.addLayout(pred_layout)
 
+        # 并行进程数
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("并行进程数"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_spin.setValue(max(1, (os.cpu_count() or 1) // 2))
+        workers_layout.addWidget(self.workers_spin)
+        self.streaming_check = QCheckBox("流式比较（低内存）")
+        workers_layout.addWidget(self.streaming_check)
+        self.cache_check = QCheckBox("复用缓存结果")
+        self.cache_check.setChecked(True)
+        workers_layout.addWidget(self.cache_check)
+        self.metrics_check = QCheckBox("计算类别指标")
+        self.metrics_check.setChecked(True)
+        workers_layout.addWidget(self.metrics_check)
+        self.recursive_check = QCheckBox("包含子目录")
+        workers_layout.addWidget(self.recursive_check)
+        self.align_check = QCheckBox("对齐长度不一致的文件")
+        self.align_check.setToolTip("计算带状编辑距离，按对齐后的错误率分类，而不是归入“长度不一致”")
+        workers_layout.addWidget(self.align_check)
+        self.align_band_spin = QSpinBox()
+        self.align_band_spin.setRange(1, 100000)
+        self.align_band_spin.setValue(ALIGN_BAND)
+        self.align_band_spin.setPrefix("带宽 ")
+        self.align_band_spin.setEnabled(False)
+        self.align_check.toggled.connect(self.align_band_spin.setEnabled)
+        workers_layout.addWidget(self.align_band_spin)
+        self.adjacency_check = QCheckBox("邻接指标")
+        self.adjacency_check.setToolTip("读取参考文件旁的.adj面邻接文件，计算边界/内部错误率和邻居容差准确率")
+        workers_layout.addWidget(self.adjacency_check)
+        self.spans_check = QCheckBox("保存不匹配段")
+        self.spans_check.setToolTip("比较时把每个文件的不匹配段写入预测目录，差异查看器直接读取；"
+                                    "不勾选时在查看某个文件时再计算")
+        workers_layout.addWidget(self.spans_check)
+        self.resume_check = QCheckBox("从检查点继续")
+        self.resume_check.setToolTip("比较过程中定期在预测目录下保存检查点，中断后再次比较时跳过已完成的文件")
+        workers_layout.addWidget(self.resume_check)
+        self.profile_check = QCheckBox("记录性能数据")
+        self.profile_check.setChecked(False)
+        self.profile_check.setToolTip("记录各阶段和每个文件的耗时、读取量和标签数，在“性能分析”页查看")
+        workers_layout.addWidget(self.profile_check)
+        workers_layout.addStretch()
+        content_layout.addLayout(workers_layout)
+
         dir_layout.addWidget(content)
         layout.addWidget(dir_card)
 
@@ -523,7 +966,17 @@ class SegComparisonTool(QMainWindow):
         self.compare_btn = ModernButton("开始比较SEG文件", primary=True)
         self.compare_btn.set_style("#0084FF")
         self.compare_btn.clicked.connect(self.compare_seg_files)
-        layout.addWidget(self.compare_btn)
+        compare_layout = QHBoxLayout()
+        compare_layout.addWidget(self.compare_btn, 1)
+        self.pause_btn = ModernButton("暂停")
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        compare_layout.addWidget(self.pause_btn)
+        self.cancel_compare_btn = ModernButton("取消")
+        self.cancel_compare_btn.setEnabled(False)
+        self.cancel_compare_btn.clicked.connect(self.cancel_comparison)
+        compare_layout.addWidget(self.cancel_compare_btn)
+        layout.addLayout(compare_layout)
 
         # 进度区域
         self.progress_bar = QProgressBar()
@@ -554,15 +1007,172 @@ class SegComparisonTool(QMainWindow):
         self.summary_text.setReadOnly(True)
         self.tab_widget.addTab(self.summary_text, "汇总统计")
 
-        self.details_tree = QTreeWidget()
-        self.details_tree.setHeaderLabels(["参考文件", "预测文件", "总标签数", "不匹配数", "长度差异", "错误率", "状态"])
-        self.details_tree.itemDoubleClicked.connect(self.show_mismatch_details)
-        self.tab_widget.addTab(self.details_tree, "详细结果")
+        details_widget = QWidget()
+        details_layout = QVBoxLayout(details_widget)
+        details_layout.setContentsMargins(0, 8, 0, 0)
+
+        # 按文件名和错误率筛选
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("文件名"))
+        self.name_filter_input = QLineEdit()
+        self.name_filter_input.setPlaceholderText("筛选文件名...")
+        self.name_filter_input.textChanged.connect(self.apply_details_filter)
+        filter_layout.addWidget(self.name_filter_input, 1)
+        filter_layout.addWidget(QLabel("错误率"))
+        self.min_error_spin = QDoubleSpinBox()
+        self.min_error_spin.setRange(0, 100)
+        self.min_error_spin.setSuffix("%")
+        self.min_error_spin.valueChanged.connect(self.apply_details_filter)
+        filter_layout.addWidget(self.min_error_spin)
+        filter_layout.addWidget(QLabel("-"))
+        self.max_error_spin = QDoubleSpinBox()
+        self.max_error_spin.setRange(0, 100)
+        self.max_error_spin.setValue(100)
+        self.max_error_spin.setSuffix("%")
+        self.max_error_spin.valueChanged.connect(self.apply_details_filter)
+        filter_layout.addWidget(self.max_error_spin)
+        details_layout.addLayout(filter_layout)
+
+        # 只渲染可见行，颜色在data()中按需计算
+        self.details_model = ResultTableModel(self)
+        self.details_view = QTreeView()
+        self.details_view.setRootIsDecorated(False)
+        self.details_view.setUniformRowHeights(True)
+        self.details_view.setSortingEnabled(True)
+        self.details_view.setModel(self.details_model)
+        self.details_view.sortByColumn(0, Qt.AscendingOrder)
+        self.details_view.doubleClicked.connect(self.show_mismatch_details)
+        details_layout.addWidget(self.details_view, 1)
+
+        self.tab_widget.addTab(details_widget, "详细结果")
+
+        category_widget = QWidget()
+        category_layout = QVBoxLayout(category_widget)
+        bins_layout = QHBoxLayout()
+        self.binning_label = QLabel("分箱方案: 默认")
+        bins_layout.addWidget(self.binning_label, 1)
+        load_bins_btn = QPushButton("加载分箱配置...")
+        load_bins_btn.clicked.connect(self.load_binning)
+        bins_layout.addWidget(load_bins_btn)
+        default_bins_btn = QPushButton("恢复默认")
+        default_bins_btn.clicked.connect(lambda: self.set_binning(DEFAULT_BINNING, "默认"))
+        bins_layout.addWidget(default_bins_btn)
+        category_layout.addLayout(bins_layout)
 
         self.category_tree = QTreeWidget()
         self.category_tree.setHeaderLabels(["错误分类", "文件数量", "总标签数", "总不匹配数", "平均错误率"])
         self.category_tree.itemDoubleClicked.connect(self.show_category_files)
-        self.tab_widget.addTab(self.category_tree, "分类分析")
+        category_layout.addWidget(self.category_tree, 1)
+        self.tab_widget.addTab(category_widget, "分类分析")
+
+        metrics_widget = QWidget()
+        metrics_layout = QVBoxLayout(metrics_widget)
+        metrics_layout.setContentsMargins(0, 8, 0, 0)
+
+        self.metrics_summary = QLabel("未计算类别指标")
+        self.metrics_summary.setStyleSheet("font-weight: 600;")
+        metrics_layout.addWidget(self.metrics_summary)
+
+        self.metrics_tree = QTreeWidget()
+        self.metrics_tree.setHeaderLabels(["类别", "真实数量", "预测数量", "IoU", "精确率", "召回率", "F1"])
+        self.metrics_tree.setRootIsDecorated(False)
+        metrics_layout.addWidget(self.metrics_tree, 1)
+
+        export_layout = QHBoxLayout()
+        export_layout.addStretch()
+        export_metrics_btn = ModernButton("导出类别指标")
+        export_metrics_btn.clicked.connect(lambda: self.export_metrics(save_metrics_csv, "导出类别指标"))
+        export_layout.addWidget(export_metrics_btn)
+        export_confusion_btn = ModernButton("导出混淆矩阵")
+        export_confusion_btn.clicked.connect(lambda: self.export_metrics(save_confusion_csv, "导出混淆矩阵"))
+        export_layout.addWidget(export_confusion_btn)
+        metrics_layout.addLayout(export_layout)
+
+        self.tab_widget.addTab(metrics_widget, "类别指标")
+
+        self.leaderboard_tree = QTreeWidget()
+        self.leaderboard_tree.setHeaderLabels(self.leaderboard_headers())
+        self.leaderboard_tree.setRootIsDecorated(False)
+        self.leaderboard_tree.itemDoubleClicked.connect(self.show_model_results)
+        self.tab_widget.addTab(self.leaderboard_tree, "模型排行")
+
+        profile_widget = QWidget()
+        profile_layout = QVBoxLayout(profile_widget)
+        profile_layout.setContentsMargins(0, 8, 0, 0)
+
+        self.profile_summary = QLabel("未记录性能数据")
+        self.profile_summary.setStyleSheet("font-weight: 600;")
+        profile_layout.addWidget(self.profile_summary)
+
+        self.profile_tree = QTreeWidget()
+        self.profile_tree.setHeaderLabels(["阶段", "耗时", "占比", "次数", "读取量", "读取速度", "标签/秒"])
+        self.profile_tree.setRootIsDecorated(False)
+        profile_layout.addWidget(self.profile_tree, 1)
+
+        profile_layout.addWidget(QLabel("耗时最长的文件"))
+        self.slowest_tree = QTreeWidget()
+        self.slowest_tree.setHeaderLabels(["文件名", "耗时", "读取量", "标签数", "最慢阶段"])
+        self.slowest_tree.setRootIsDecorated(False)
+        profile_layout.addWidget(self.slowest_tree, 1)
+
+        export_profile_layout = QHBoxLayout()
+        export_profile_layout.addStretch()
+        export_profile_btn = ModernButton("导出性能数据")
+        export_profile_btn.clicked.connect(self.export_profile)
+        export_profile_layout.addWidget(export_profile_btn)
+        profile_layout.addLayout(export_profile_layout)
+
+        self.tab_widget.addTab(profile_widget, "性能分析")
+
+        # 当前结果与另一次比较结果（会话或结果文件）按文件名逐个对比
+        diff_widget = QWidget()
+        diff_layout = QVBoxLayout(diff_widget)
+        diff_layout.setContentsMargins(0, 8, 0, 0)
+
+        diff_controls = QHBoxLayout()
+        load_base_btn = QPushButton("选择基准结果...")
+        load_base_btn.clicked.connect(self.load_diff_base)
+        diff_controls.addWidget(load_base_btn)
+        self.diff_base_label = QLabel("未选择基准结果")
+        diff_controls.addWidget(self.diff_base_label, 1)
+        diff_controls.addWidget(QLabel("状态"))
+        self.diff_status_combo = QComboBox()
+        self.diff_status_combo.addItem("全部", None)
+        for status in DIFF_STATUSES:
+            self.diff_status_combo.addItem(STATUS_NAMES[status], status)
+        self.diff_status_combo.currentIndexChanged.connect(
+            lambda: self.diff_model.set_status(self.diff_status_combo.currentData()))
+        diff_controls.addWidget(self.diff_status_combo)
+        diff_layout.addLayout(diff_controls)
+
+        self.diff_summary = QLabel("")
+        self.diff_summary.setStyleSheet("font-weight: 600;")
+        self.diff_summary.setWordWrap(True)
+        diff_layout.addWidget(self.diff_summary)
+
+        self.category_changes_tree = QTreeWidget()
+        self.category_changes_tree.setHeaderLabels(["基准分类", "新分类", "文件数量"])
+        self.category_changes_tree.setRootIsDecorated(False)
+        self.category_changes_tree.setMaximumHeight(160)
+        diff_layout.addWidget(self.category_changes_tree)
+
+        self.diff_model = DiffTableModel(self)
+        self.diff_view = QTreeView()
+        self.diff_view.setRootIsDecorated(False)
+        self.diff_view.setUniformRowHeights(True)
+        self.diff_view.setSortingEnabled(True)
+        self.diff_view.setModel(self.diff_model)
+        self.diff_view.sortByColumn(4, Qt.DescendingOrder)
+        diff_layout.addWidget(self.diff_view, 1)
+
+        export_diff_layout = QHBoxLayout()
+        export_diff_layout.addStretch()
+        export_diff_btn = ModernButton("导出对比结果")
+        export_diff_btn.clicked.connect(self.export_diff)
+        export_diff_layout.addWidget(export_diff_btn)
+        diff_layout.addLayout(export_diff_layout)
+
+        self.tab_widget.addTab(diff_widget, "运行对比")
 
         layout.addWidget(self.tab_widget, 1)
 
@@ -601,12 +1211,7 @@ class SegComparisonTool(QMainWindow):
         category_layout = QHBoxLayout()
         category_layout.addWidget(QLabel("选择分类"))
         self.category_combo = QComboBox()
-        self.category_combo.addItems([
-            "完美匹配(0%)", "极轻微错误(0-1%)", "轻微错误(1-3%)",
-            "中等偏轻错误(3-5%)", "中等错误(5-10%)", "中等偏重错误(10-15%)",
-            "显著错误(15-20%)", "严重错误(20-30%)", "非常严重错误(30-50%)",
-            "极端严重错误(>50%)", "长度不一致"
-        ])
+        self.category_combo.addItems(self.binning.names())
         category_layout.addWidget(self.category_combo, 1)
         op_layout.addLayout(category_layout)
 
@@ -618,12 +1223,36 @@ class SegComparisonTool(QMainWindow):
         target_layout.addWidget(self.target_dir_input, 1)
         op_layout.addLayout(target_layout)
 
+        # 导出方式
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("导出方式"))
+        self.export_mode_combo = QComboBox()
+        for mode, title in EXPORT_MODES.items():
+            self.export_mode_combo.addItem(title, mode)
+        mode_layout.addWidget(self.export_mode_combo, 1)
+        mode_layout.addWidget(QLabel("打包"))
+        self.archive_combo = QComboBox()
+        for archive, title in ARCHIVE_FORMATS.items():
+            self.archive_combo.addItem(title, archive)
+        mode_layout.addWidget(self.archive_combo, 1)
+        op_layout.addLayout(mode_layout)
+
         layout.addWidget(op_card)
 
-        copy_btn = ModernButton("复制选定文件", primary=True)
-        copy_btn.set_style("#0084FF")
-        copy_btn.clicked.connect(self.copy_selected_files)
-        layout.addWidget(copy_btn)
+        button_layout = QHBoxLayout()
+        self.copy_btn = ModernButton("复制选定文件", primary=True)
+        self.copy_btn.set_style("#0084FF")
+        self.copy_btn.clicked.connect(self.copy_selected_files)
+        button_layout.addWidget(self.copy_btn, 1)
+        self.cancel_export_btn = ModernButton("取消")
+        self.cancel_export_btn.setEnabled(False)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        button_layout.addWidget(self.cancel_export_btn)
+        layout.addLayout(button_layout)
+
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setVisible(False)
+        layout.addWidget(self.export_progress_bar)
         layout.addStretch()
 
         self.operations_tab = widget
@@ -647,16 +1276,104 @@ class SegComparisonTool(QMainWindow):
         self.operations_btn.setChecked(tab_name == "operations")
 
     def clear_results(self):
-        self.results.clear()
+        self.results = ResultStore()
         self.categories.clear()
+        self.model_results = {}
+        self.leaderboard_tree.clear()
         self.summary_text.clear()
-        self.details_tree.clear()
+        self.details_model.set_results(self.results)
         self.category_tree.clear()
+        self.display_metrics()
+        self.display_profile()
+        self.display_diff()
         self.stats_panel.update_stats({})
+        self.unsaved = False
         self.statusBar().showMessage("结果已清空")
 
+    def load_results_files(self):
+        # 选择多个文件时按分片合并（命令行 compare --shard --results-file 的输出）
+        paths, _ = QFileDialog.getOpenFileNames(self, "加载结果文件", "", "JSON文件 (*.json)")
+        if not paths:
+            return
+        try:
+            try:
+                header, results = merge_results_files(paths, allow_missing=True)
+            except DirectoryMismatchError as e:
+                answer = QMessageBox.question(self, "目录不一致", f"{e}\n\n仍然合并这些结果文件吗？",
+                                              QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if answer != QMessageBox.Yes:
+                    return
+                header, results = merge_results_files(paths, allow_missing=True, allow_dir_mismatch=True)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法加载结果文件: {e}")
+            return
+        self.model_results = {}
+        self.leaderboard_tree.clear()
+        self.results = results
+        self.unsaved = False
+        self.display_results()
+        self.switch_tab("results")
+        if header.get('missing_shards'):
+            QMessageBox.warning(self, "分片不完整", f"缺少分片: {', '.join(map(str, header['missing_shards']))}"
+                                                f"（共 {header['shard_count']} 个），结果只包含已加载的分片")
+        self.statusBar().showMessage(f"已加载 {len(paths)} 个结果文件，共 {len(results)} 个文件")
+
+    def save_session(self):
+        if not self.results:
+            QMessageBox.information(self, "提示", "没有可保存的比较结果")
+            return False
+        path, _ = QFileDialog.getSaveFileName(self, "保存会话", f"results{SESSION_SUFFIX}",
+                                              f"会话文件 (*{SESSION_SUFFIX})")
+        if not path:
+            return False
+        if not path.endswith(SESSION_SUFFIX):
+            path += SESSION_SUFFIX
+        info = {'true_dir': self.true_dir_input.text(), 'pred_dir': self.pred_dir_input.text()}
+        try:
+            save_session(self.results, path, info, self.binning)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法保存会话: {e}")
+            return False
+        self.unsaved = False
+        self.statusBar().showMessage(f"会话已保存: {path}")
+        return True
+
+    def open_session(self):
+        # 只读入各列和汇总信息，查看某个文件的不匹配位置时才从会话文件读取
+        path, _ = QFileDialog.getOpenFileName(self, "打开会话", "", f"会话文件 (*{SESSION_SUFFIX})")
+        if not path:
+            return
+        try:
+            manifest, results = load_session(path)
+            binning = Binning.from_dict(manifest['binning']) if manifest['binning'] else None
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法打开会话: {e}")
+            return
+        self.model_results = {}
+        self.leaderboard_tree.clear()
+        self.results = results
+        self.unsaved = False
+        info = manifest['info']
+        self.true_dir_input.setText(info.get('true_dir', ""))
+        self.pred_dir_input.setText(info.get('pred_dir', ""))
+        if binning is not None:
+            name = "默认" if binning.to_dict() == DEFAULT_BINNING.to_dict() else os.path.basename(path)
+            self.set_binning(binning, name)
+        self.display_results()
+        self.switch_tab("results")
+        self.statusBar().showMessage(f"已打开会话: {path}（{len(results)} 个文件）")
+
+    def closeEvent(self, event):
+        if self.unsaved and self.results:
+            reply = QMessageBox.question(self, "保存会话", "当前比较结果尚未保存，是否保存为会话文件？",
+                                         QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Yes and not self.save_session()):
+                event.ignore()
+                return
+        event.accept()
+
     def show_help(self):
-        help_dialog = HelpDialog(self)
+        help_dialog = HelpDialog(self, self.binning)
         help_dialog.exec_()
 
     def browse_true_dir(self):
@@ -676,84 +1393,179 @@ class SegComparisonTool(QMainWindow):
 
     def compare_seg_files(self):
         true_dir = self.true_dir_input.text()
-        pred_dir = self.pred_dir_input.text()
+        pred_dirs = [d.strip() for d in self.pred_dir_input.text().split(';') if d.strip()]
 
         if not true_dir or not os.path.isdir(true_dir):
             QMessageBox.warning(self, "错误", "请选择有效的参考标签目录")
             return
 
-        if not pred_dir or not os.path.isdir(pred_dir):
+        if not pred_dirs or not all(os.path.isdir(d) for d in pred_dirs):
             QMessageBox.warning(self, "错误", "请选择有效的预测标签目录")
             return
 
         self.compare_btn.setEnabled(False)
+        self.pause_btn.setEnabled(True)
+        self.pause_btn.setText("暂停")
+        self.cancel_compare_btn.setEnabled(True)
         self.progress_bar.setVisible(True)
         self.current_file_label.setText("开始比较...")
-
-        self.worker = ComparisonWorker(true_dir, pred_dir)
+        self.results = ResultStore()
+        self.details_model.set_results(self.results)
+        # 比较过程中的汇总按批累加，不每批都重新遍历全部结果
+        self.partial_totals = {'files': 0, 'total_labels': 0, 'total_mismatches': 0, 'total_length_diff': 0}
+
+        self.worker = ComparisonWorker(true_dir, pred_dirs[0], workers=self.workers_spin.value(),
+                                       streaming=self.streaming_check.isChecked(),
+                                       cache=self.cache_check.isChecked(),
+                                       metrics=self.metrics_check.isChecked(),
+                                       extra_pred_dirs=pred_dirs[1:],
+                                       recursive=self.recursive_check.isChecked(),
+                                       resume=self.resume_check.isChecked(), spans=self.spans_check.isChecked(),
+                                       align=self.align_check.isChecked(), align_band=self.align_band_spin.value(),
+                                       profile=self.profile_check.isChecked(),
+                                       adjacency=self.adjacency_check.isChecked())
         self.worker.progress.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.on_comparison_finished)
+        self.worker.models_finished.connect(self.on_models_finished)
+        self.worker.partial_results.connect(self.on_partial_results)
+        self.worker.cancelled.connect(self.on_comparison_cancelled)
         self.worker.error.connect(self.on_comparison_error)
         self.worker.file_processed.connect(self.on_file_processed)
         self.worker.start()
 
+    def toggle_pause(self):
+        if getattr(self, 'worker', None) is None:
+            return
+        if self.worker.engine.is_paused():
+            self.worker.unpause()
+            self.pause_btn.setText("暂停")
+            self.current_file_label.setText("继续比较...")
+        else:
+            self.worker.pause()
+            self.pause_btn.setText("继续")
+            self.current_file_label.setText("已暂停（进行中的文件完成后停止）")
+
+    def cancel_comparison(self):
+        if getattr(self, 'worker', None) is not None:
+            self.worker.cancel()
+            self.pause_btn.setEnabled(False)
+            self.cancel_compare_btn.setEnabled(False)
+            self.current_file_label.setText("正在取消...")
+
+    def reset_compare_controls(self):
+        self.compare_btn.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.setText("暂停")
+        self.cancel_compare_btn.setEnabled(False)
+        self.progress_bar.setVisible(False)
+
+    def on_comparison_cancelled(self, results):
+        self.results = results
+        self.unsaved = bool(results)
+        self.reset_compare_controls()
+        self.current_file_label.setText(f"比较已取消，已完成 {len(results)} 个文件")
+        if self.results:
+            self.display_results(self.finished_totals(results))
+        hint = "\n再次比较将跳过这些文件。" if self.resume_check.isChecked() else ""
+        QMessageBox.information(self, "已取消", f"比较已取消，已完成 {len(results)} 个文件。"
+                                             f"{hint}{self.worker_warnings()}")
+
     def on_file_processed(self, filename):
         self.current_file_label.setText(f"正在处理: {filename}")
 
+    def on_partial_results(self, batch):
+        names = []
+        totals = self.partial_totals
+        for filename, data in batch:
+            if filename in self.results:
+                # 重新比较的文件先减去上一次的结果
+                old = self.results[filename]
+                totals['total_labels'] -= old['total_labels']
+                totals['total_mismatches'] -= old['mismatches']
+                totals['total_length_diff'] -= old['length_diff']
+            else:
+                names.append(filename)
+                totals['files'] += 1
+            totals['total_labels'] += data['total_labels']
+            totals['total_mismatches'] += data['mismatches']
+            totals['total_length_diff'] += data['length_diff']
+            self.results[filename] = data
+        self.details_model.append_results(names)
+        self.show_summary(totals, running=True)
+
+    def finished_totals(self, results):
+        # 单目录比较时每个结果都经过on_partial_results，累加的计数即为最终汇总
+        totals = self.partial_totals
+        return totals if totals['files'] == len(results) else None
+
     def on_comparison_finished(self, results):
         self.results = results
-        self.compare_btn.setEnabled(True)
-        self.progress_bar.setVisible(False)
+        self.unsaved = bool(results)
+        self.reset_compare_controls()
         self.current_file_label.setText("比较完成")
 
         if self.results:
-            self.display_results()
-            self.stats_panel.update_stats(self.results)
+            self.display_results(self.finished_totals(results))
             self.switch_tab("results")
-            QMessageBox.information(self, "完成", f"比较完成！共处理 {len(self.results)} 个文件")
+            QMessageBox.information(self, "完成", f"比较完成！共处理 {len(self.results)} 个文件"
+                                                  f"{self.worker_warnings()}")
+
+    def worker_warnings(self):
+        # 检查点等辅助文件写入失败的说明，附在完成提示之后
+        worker = getattr(self, 'worker', None)
+        warnings = worker.engine.warnings if worker is not None else []
+        return "".join(f"\n\n{warning}" for warning in warnings)
+
+    def on_models_finished(self, results_by_model):
+        self.model_results = results_by_model
+        self.display_leaderboard()
+        # 默认显示排名第一的模型的详细结果
+        rows = leaderboard(results_by_model, self.binning)
+        self.on_comparison_finished(results_by_model[rows[0]['model']] if rows else ResultStore())
+        self.tab_widget.setCurrentWidget(self.leaderboard_tree)
+
+    def display_leaderboard(self):
+        self.leaderboard_tree.clear()
+        for rank, row in enumerate(leaderboard(self.model_results, self.binning), 1):
+            item = QTreeWidgetItem([
+                str(rank),
+                row['model'],
+                str(row['files']),
+                str(row['total_labels']),
+                str(row['mismatches']),
+                f"{row['error_rate']:.2f}%",
+                f"{row['mean_iou'] * 100:.2f}%" if row['mean_iou'] is not None else "-"
+            ] + [str(row[name]) for name in self.binning.names()])
+            item.setData(1, Qt.UserRole, row['model'])
+            color = error_rate_color(row['error_rate'])
+            if color is not None:
+                item.setForeground(5, QBrush(color))
+            self.leaderboard_tree.addTopLevelItem(item)
+
+    def show_model_results(self, item, column):
+        model = item.data(1, Qt.UserRole)
+        self.results = self.model_results[model]
+        self.display_results()
+        self.statusBar().showMessage(f"当前显示模型: {model}")
 
     def on_comparison_error(self, error_message):
-        self.compare_btn.setEnabled(True)
-        self.progress_bar.setVisible(False)
+        self.reset_compare_controls()
         self.current_file_label.setText("比较出错")
         QMessageBox.warning(self, "错误", error_message)
 
-    def display_results(self):
-        self.summary_text.clear()
-        self.details_tree.clear()
-        self.category_tree.clear()
+    def display_results(self, totals=None):
+        with timed(getattr(self.results, 'profile', None), 'display_results'):
+            self.show_summary(totals)
 
-        total_files = len(self.results)
-        total_labels = sum(data['total_labels'] for data in self.results.values())
-        total_mismatches = sum(data['mismatches'] for data in self.results.values())
-        total_diff = sum(data['length_diff'] for data in self.results.values())
-        overall_error_rate = (total_mismatches / total_labels) * 100 if total_labels > 0 else 0
-
-        summary_text = f"""SEG文件标签对比结果
-
-📊 比较文件总数: {total_files}
-🔢 总标签数: {total_labels}
-❌ 总不匹配标签数: {total_mismatches}
-📏 总长度差异: {total_diff}
-📈 总体错误率: {overall_error_rate:.2f}%
-
-"""
-        self.summary_text.setPlainText(summary_text)
+            self.details_model.set_results(self.results)
+            self.display_metrics()
 
-        for filename, data in self.results.items():
-            status_icon = "✅" if data['error_rate'] == 0 else "⚠️" if data['error_rate'] < 5 else "❌"
-            item = QTreeWidgetItem([
-                data['true_filename'],
-                data['pred_filename'],
-                str(data['total_labels']),
-                str(data['mismatches']),
-                str(data['length_diff']),
-                f"{data['error_rate']:.2f}%",
-                status_icon
-            ])
-            self.set_error_rate_color(item, data['error_rate'])
-            self.details_tree.addTopLevelItem(item)
+            self.display_categories()
+        self.display_profile()
+        self.display_diff()
 
+    def display_categories(self):
+        self.category_tree.clear()
         self.categorize_results()
         for category, data in self.categories.items():
             if data["count"] > 0:
@@ -768,108 +1580,257 @@ class SegComparisonTool(QMainWindow):
                 self.set_category_color(item, category)
                 self.category_tree.addTopLevelItem(item)
 
-    def set_error_rate_color(self, item, error_rate):
-        color_cols = [3, 4, 5]
-        for col in color_cols:
-            if error_rate > 50:
-                item.setForeground(col, QBrush(QColor(220, 53, 69)))
-            elif error_rate > 30:
-                item.setForeground(col, QBrush(QColor(255, 99, 132)))
-            elif error_rate > 20:
-                item.setForeground(col, QBrush(QColor(255, 159, 67)))
-            elif error_rate > 10:
-                item.setForeground(col, QBrush(QColor(255, 205, 86)))
-            elif error_rate > 5:
-                item.setForeground(col, QBrush(QColor(72, 187, 120)))
-            elif error_rate > 0:
-                item.setForeground(col, QBrush(QColor(54, 162, 235)))
-
-    def set_category_color(self, item, category):
-        if "极端" in category:
-            item.setForeground(0, QBrush(QColor(220, 53, 69)))
-        elif "非常严重" in category:
-            item.setForeground(0, QBrush(QColor(255, 99, 132)))
-        elif "严重" in category:
-            item.setForeground(0, QBrush(QColor(255, 159, 67)))
-        elif "显著" in category:
-            item.setForeground(0, QBrush(QColor(255, 205, 86)))
-        elif "中等" in category:
-            item.setForeground(0, QBrush(QColor(72, 187, 120)))
-        elif "轻微" in category:
-            item.setForeground(0, QBrush(QColor(54, 162, 235)))
-        elif "完美" in category:
-            item.setForeground(0, QBrush(QColor(40, 167, 69)))
-        elif "长度" in category:
-            item.setForeground(0, QBrush(QColor(111, 66, 193)))
+    def leaderboard_headers(self):
+        return ["排名", "模型", "文件数量", "总标签数", "不匹配数", "错误率", "平均IoU"] + self.binning.names()
 
-    def categorize_results(self):
-        self.categories = {
-            "完美匹配(0%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "极轻微错误(0-1%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "轻微错误(1-3%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "中等偏轻错误(3-5%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "中等错误(5-10%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "中等偏重错误(10-15%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "显著错误(15-20%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "严重错误(20-30%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "非常严重错误(30-50%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "极端严重错误(>50%)": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []},
-            "长度不一致": {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []}
-        }
+    def load_binning(self):
+        path, _ = QFileDialog.getOpenFileName(self, "加载分箱配置", "", "JSON文件 (*.json)")
+        if not path:
+            return
+        try:
+            binning = Binning.load(path)
+        except BinningError as e:
+            QMessageBox.warning(self, "错误", f"分箱配置无效: {e}")
+            return
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法加载分箱配置: {e}")
+            return
+        self.set_binning(binning, os.path.basename(path))
+
+    def set_binning(self, binning, name):
+        # 只按已有结果重新分箱，不需要重新比较
+        self.binning = binning
+        self.binning_label.setText(f"分箱方案: {name}")
+        self.category_combo.clear()
+        self.category_combo.addItems(binning.names())
+        self.leaderboard_tree.setHeaderLabels(self.leaderboard_headers())
+        self.display_categories()
+        self.display_diff()
+        if self.model_results:
+            self.display_leaderboard()
+
+    def show_summary(self, totals=None, running=False):
+        # totals为比较过程中累加的计数，给出时不再遍历全部结果求和；
+        # 比较进行中不统计需要遍历全部结果的邻接面错误率
+        if totals is None:
+            summary = results_summary(self.results)
+        else:
+            summary = dict(totals, error_rate=totals['total_mismatches'] / totals['total_labels'] * 100
+                           if totals['total_labels'] > 0 else 0)
+        summary_text = f"""SEG文件标签对比结果
 
-        for filename, data in self.results.items():
-            if data['length_diff'] > 0:
-                category = "长度不一致"
-            elif data['error_rate'] == 0:
-                category = "完美匹配(0%)"
-            elif data['error_rate'] <= 1:
-                category = "极轻微错误(0-1%)"
-            elif data['error_rate'] <= 3:
-                category = "轻微错误(1-3%)"
-            elif data['error_rate'] <= 5:
-                category = "中等偏轻错误(3-5%)"
-            elif data['error_rate'] <= 10:
-                category = "中等错误(5-10%)"
-            elif data['error_rate'] <= 15:
-                category = "中等偏重错误(10-15%)"
-            elif data['error_rate'] <= 20:
-                category = "显著错误(15-20%)"
-            elif data['error_rate'] <= 30:
-                category = "严重错误(20-30%)"
-            elif data['error_rate'] <= 50:
-                category = "非常严重错误(30-50%)"
-            else:
-                category = "极端严重错误(>50%)"
+📊 比较文件总数: {summary['files']}
+🔢 总标签数: {summary['total_labels']}
+❌ 总不匹配标签数: {summary['total_mismatches']}
+📏 总长度差异: {summary['total_length_diff']}
+📈 总体错误率: {summary['error_rate']:.2f}%
 
-            self.categories[category]["count"] += 1
-            self.categories[category]["total_labels"] += data['total_labels']
-            self.categories[category]["total_mismatches"] += data['mismatches']
-            self.categories[category]["files"].append(filename)
+"""
+        if not running:
+            summary_text += self.adjacency_summary()
+        summary_text += self.orphans_summary()
+        self.summary_text.setPlainText(summary_text)
+        self.stats_panel.update_stats(summary, getattr(self.results, 'confusion', None))
 
-    def show_mismatch_details(self, item, column):
-        filename = item.text(0)
-        for key, data in self.results.items():
-            if data['true_filename'] == filename:
-                details = f"""文件比较详情
+    def display_metrics(self):
+        self.metrics_tree.clear()
+        confusion = getattr(self.results, 'confusion', None)
+        if not confusion:
+            self.metrics_summary.setText("未计算类别指标")
+            return
 
-参考文件: {data['true_filename']}
-预测文件: {data['pred_filename']}
+        self.metrics_summary.setText(f"平均IoU: {confusion.mean_iou() * 100:.2f}%    "
+                                     f"总体准确率: {confusion.accuracy():.2f}%")
+        for row in confusion.per_class():
+            item = QTreeWidgetItem([
+                row['class'],
+                str(row['support']),
+                str(row['predicted']),
+                f"{row['iou'] * 100:.2f}%",
+                f"{row['precision'] * 100:.2f}%",
+                f"{row['recall'] * 100:.2f}%",
+                f"{row['f1'] * 100:.2f}%"
+            ])
+            color = error_rate_color((1 - row['iou']) * 100)
+            if color is not None:
+                item.setForeground(3, QBrush(color))
+            self.metrics_tree.addTopLevelItem(item)
+
+    def display_profile(self):
+        self.profile_tree.clear()
+        self.slowest_tree.clear()
+        profile = getattr(self.results, 'profile', None)
+        if profile is None:
+            self.profile_summary.setText("未记录性能数据")
+            return
 
-总标签数: {data['total_labels']}
-不匹配标签数: {data['mismatches']}
-长度差异: {data['length_diff']}
-错误率: {data['error_rate']:.2f}%
+        wall = profile.wall_seconds()
+        self.profile_summary.setText(f"总耗时: {wall:.3f}s    比较文件: {len(profile.files)}    "
+                                     f"（子进程中的阶段按文件累加，多进程时可能超过总耗时）")
+        for row in profile.summary():
+            self.profile_tree.addTopLevelItem(QTreeWidgetItem([
+                row['name'],
+                f"{row['seconds']:.3f}s",
+                f"{row['share']:.1f}%",
+                str(row['calls']),
+                f"{row['bytes'] / 1e6:.1f} MB" if row['bytes'] else "-",
+                f"{row['bytes_per_s'] / 1e6:.1f} MB/s" if row['bytes_per_s'] else "-",
+                f"{row['labels_per_s']:.0f}" if row['labels_per_s'] else "-"
+            ]))
+        for row in profile.slowest():
+            self.slowest_tree.addTopLevelItem(QTreeWidgetItem([
+                row['filename'],
+                f"{row['seconds']:.3f}s",
+                f"{row['bytes'] / 1e6:.2f} MB",
+                str(row['labels']),
+                STAGE_NAMES.get(row['slowest_stage'], row['slowest_stage'] or "-")
+            ]))
+
+    def load_diff_base(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择基准结果", "",
+                                              f"比较结果 (*{SESSION_SUFFIX} *.json)")
+        if not path:
+            return
+        try:
+            self.diff_base = load_run(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法加载基准结果: {e}")
+            return
+        self.diff_base_label.setText(f"基准: {path}（{len(self.diff_base)} 个文件）")
+        self.display_diff()
+
+    def display_diff(self):
+        self.category_changes_tree.clear()
+        if self.diff_base is None or not self.results:
+            self.diff = None
+            self.diff_model.set_diff(None)
+            self.diff_summary.setText("选择基准结果后显示当前结果相对基准的逐文件变化" if self.diff_base is None
+                                      else "没有当前结果")
+            return
 
-"""
-                if data['mismatch_indices']:
-                    details += f"前10个不匹配位置: {data['mismatch_indices'][:10]}"
-                    if len(data['mismatch_indices']) > 10:
-                        details += f" ... (共{len(data['mismatch_indices'])}个)"
+        self.diff = ResultsDiff(self.diff_base, self.results, self.binning)
+        self.diff_model.set_diff(self.diff)
+        summary = self.diff.summary()
+        text = (f"共同文件 {summary['files']} 个    总体错误率 {summary['base_error_rate']:.2f}% → "
+                f"{summary['new_error_rate']:.2f}%（{summary['delta']:+.2f}%）\n" +
+                "    ".join(f"{STATUS_NAMES[name]}: {summary[name]}" for name in DIFF_STATUSES))
+        if summary['base_only'] or summary['new_only']:
+            text += f"\n仅基准结果中存在 {summary['base_only']} 个文件，仅当前结果中存在 {summary['new_only']} 个文件"
+        if summary['reference_changed']:
+            text += f"\n⚠️ 抽查的文件中有 {summary['reference_changed']} 个参考文件路径不同，可能不是同一参考目录"
+        self.diff_summary.setText(text)
+        for before, after, count in self.diff.category_changes():
+            item = QTreeWidgetItem([before, after, str(count)])
+            self.set_category_color(item, after)
+            self.category_changes_tree.addTopLevelItem(item)
+
+    def export_diff(self):
+        if self.diff is None:
+            QMessageBox.information(self, "提示", "没有可导出的对比结果，请先选择基准结果")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出对比结果", "", "CSV文件 (*.csv);;JSON文件 (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8-sig' if not path.endswith('.json') else 'utf-8', newline='') as f:
+                if path.endswith('.json'):
+                    self.diff.save_json(f)
                 else:
-                    details += "没有不匹配的标签"
+                    # 按当前的筛选和排序导出
+                    self.diff.save_csv(f, self.diff_model.rows)
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"导出失败: {e}")
+            return
+        self.statusBar().showMessage(f"已导出: {path}")
+
+    def export_profile(self):
+        profile = getattr(self.results, 'profile', None)
+        if profile is None:
+            QMessageBox.information(self, "提示", "没有可导出的性能数据，请勾选“记录性能数据”后重新比较")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "", "JSON文件 (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                profile.save_json(f)
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"导出失败: {e}")
+            return
+        self.statusBar().showMessage(f"已导出: {path}")
+
+    def export_metrics(self, writer, title):
+        confusion = getattr(self.results, 'confusion', None)
+        if not confusion:
+            QMessageBox.information(self, "提示", "没有可导出的类别指标，请勾选“计算类别指标”后重新比较")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, title, "", "CSV文件 (*.csv)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer(confusion, f)
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"导出失败: {e}")
+            return
+        self.statusBar().showMessage(f"已导出: {path}")
+
+    def set_category_color(self, item, category):
+        color = self.binning.color(category)
+        if color:
+            item.setForeground(0, QBrush(QColor(color)))
+
+    def categorize_results(self):
+        self.categories = categorize_results(self.results, self.binning)
+
+    def adjacency_summary(self):
+        summary = adjacency_summary(self.results)
+        if not summary:
+            return ""
+        return (f"🧩 边界面错误率: {summary['boundary_error_rate']:.2f}%（{summary['boundary_faces']} 个面）\n"
+                f"🧩 内部面错误率: {summary['interior_error_rate']:.2f}%（{summary['interior_faces']} 个面）\n"
+                f"🧩 邻居容差准确率: {summary['tolerant_accuracy']:.2f}%（{summary['files']} 个文件有邻接数据）\n\n")
+
+    def orphans_summary(self, limit=50):
+        orphans = dict(getattr(self.results, 'orphans', None) or {})
+        orphans['failed'] = getattr(self.results, 'failed', [])
+        text = ""
+        for side, title in (('true_only', "仅参考目录存在"), ('pred_only', "仅预测目录存在"),
+                            ('failed', "读取失败")):
+            files = orphans.get(side)
+            if not files:
+                continue
+            text += f"⚠️ {title}的文件: {len(files)}\n"
+            text += "".join(f"    {filename}\n" for filename in files[:limit])
+            if len(files) > limit:
+                text += f"    ... 另有 {len(files) - limit} 个文件\n"
+            text += "\n"
+        return text
+
+    def apply_details_filter(self):
+        self.details_model.set_filter(self.min_error_spin.value(), self.max_error_spin.value(),
+                                      self.name_filter_input.text())
+
+    def show_mismatch_details(self, index):
+        filename = self.details_model.filename(index)
+        data = self.results[filename]
+        spans_path = getattr(self.results, 'spans_path', None) or os.path.join(tempfile.gettempdir(), SPANS_FILENAME)
+        try:
+            store = SpanStore(spans_path)
+            count = store.count(filename, data['true_path'], data['pred_path'])
+            if count is None:
+                # 缓存命中或旧结果没有不匹配段记录时，重新读取两个文件计算
+                spans = SegComparisonEngine().file_spans(data['true_path'], data['pred_path'])
+                store.put(filename, data['true_path'], data['pred_path'], spans)
+                store.commit()
+                count = len(spans)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"无法读取不匹配段: {e}")
+            return
 
-                QMessageBox.information(self, "文件比较详情", details)
-                break
+        dialog = DiffViewerDialog(store, filename, data, count, self)
+        dialog.finished.connect(lambda result: store.close())
+        dialog.show()
 
     def show_category_files(self, item, column):
         category = item.text(0)
@@ -892,50 +1853,73 @@ class SegComparisonTool(QMainWindow):
             return
 
         category_dir = os.path.join(target_dir, category.replace('/', '_'))
-        os.makedirs(category_dir, exist_ok=True)
-
-        ref_dir = os.path.join(category_dir, "ref")
-        pred_dir = os.path.join(category_dir, "pred")
-        if self.source_radio_ref.isChecked() or self.source_radio_both.isChecked():
-            os.makedirs(ref_dir, exist_ok=True)
-        if self.source_radio_pred.isChecked() or self.source_radio_both.isChecked():
-            os.makedirs(pred_dir, exist_ok=True)
-
-        copied_ref_count = 0
-        copied_pred_count = 0
-
-        for filename in files:
-            try:
-                if self.source_radio_ref.isChecked() or self.source_radio_both.isChecked():
-                    src_path = self.results[filename]['true_path']
-                    dst_path = os.path.join(ref_dir, filename)
-                    shutil.copy2(src_path, dst_path)
-                    copied_ref_count += 1
-
-                if self.source_radio_pred.isChecked() or self.source_radio_both.isChecked():
-                    src_path = self.results[filename]['pred_path']
-                    dst_path = os.path.join(pred_dir, filename)
-                    shutil.copy2(src_path, dst_path)
-                    copied_pred_count += 1
-            except Exception as e:
-                print(f"复制文件 {filename} 时出错: {e}")
-
-        message = f"""文件复制完成！
-
-目标位置: {category_dir}
-分类: {category}
+        copy_ref = self.source_radio_ref.isChecked() or self.source_radio_both.isChecked()
+        copy_pred = self.source_radio_pred.isChecked() or self.source_radio_both.isChecked()
+
+        self.copy_btn.setEnabled(False)
+        self.cancel_export_btn.setEnabled(True)
+        self.export_progress_bar.setValue(0)
+        self.export_progress_bar.setVisible(True)
+        self.statusBar().showMessage(f"正在导出: {category}")
+
+        self.export_category = category
+        self.export_worker = ExportWorker(self.results, list(files), category_dir, copy_ref, copy_pred,
+                                          mode=self.export_mode_combo.currentData(),
+                                          archive=self.archive_combo.currentData())
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.error.connect(self.on_export_error)
+        self.export_worker.start()
+
+    def cancel_export(self):
+        if getattr(self, 'export_worker', None) is not None:
+            self.export_worker.cancel()
+            self.cancel_export_btn.setEnabled(False)
+
+    def on_export_progress(self, done, total):
+        self.export_progress_bar.setMaximum(max(1, total))
+        self.export_progress_bar.setValue(done)
+
+    def reset_export_controls(self):
+        self.copy_btn.setEnabled(True)
+        self.cancel_export_btn.setEnabled(False)
+        self.export_progress_bar.setVisible(False)
+
+    def on_export_finished(self, report):
+        self.reset_export_controls()
+        title = "复制已取消" if report['cancelled'] else "复制完成"
+        self.statusBar().showMessage(title)
+
+        message = f"""文件{title}！
+
+目标位置: {report['target']}
+分类: {self.export_category}
 
 """
         if self.source_radio_ref.isChecked() or self.source_radio_both.isChecked():
-            message += f"参考文件 → ref/ 目录 ({copied_ref_count}个)\n"
+            message += f"参考文件 → ref/ 目录 ({report['ref']}个)\n"
         if self.source_radio_pred.isChecked() or self.source_radio_both.isChecked():
-            message += f"预测文件 → pred/ 目录 ({copied_pred_count}个)\n"
-        message += f"\n总计复制: {copied_ref_count + copied_pred_count} 个文件"
-
-        QMessageBox.information(self, "复制完成", message)
+            message += f"预测文件 → pred/ 目录 ({report['pred']}个)\n"
+        message += f"\n总计复制: {report['ref'] + report['pred']} / {report['total']} 个文件"
+
+        if report['errors']:
+            message += f"\n\n失败 {len(report['errors'])} 个文件:\n"
+            message += "\n".join(f"{name}: {error}" for name, error in report['errors'][:10])
+            if len(report['errors']) > 10:
+                message += "\n..."
+            QMessageBox.warning(self, title, message)
+        else:
+            QMessageBox.information(self, title, message)
 
+    def on_export_error(self, error_message):
+        self.reset_export_controls()
+        self.statusBar().showMessage("复制出错")
+        QMessageBox.warning(self, "错误", error_message)
 
 if __name__ == "__main__":
+    # 打包为exe后多进程比较需要
+    multiprocessing.freeze_support()
+
     # 设置高DPI支持
     if hasattr(Qt, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -0,0 +1,245 @@
+import os
+import sys
+import struct
+from array import array
+
+from seg_compress import seg_key
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 面邻接关系：参考文件 m.seg 对应的邻接文件为 m.adj，每行一条边"面序号 面序号"（从0开始，#开头为注释）。
+# 首次读取后转换为CSR格式的 m.adjb（24字节文件头 + int64行偏移 + int32邻居序号），之后直接内存映射
+ADJACENCY_SUFFIX = '.adj'
+ADJACENCY_CACHE_SUFFIX = '.adjb'
+ADJACENCY_MAGIC = b'SEGA'
+ADJACENCY_VERSION = 1
+ADJACENCY_HEADER = struct.Struct('<4sBxxxQQ')
+ADJACENCY_FIELDS = ['boundary_faces', 'boundary_mismatches', 'interior_faces', 'interior_mismatches',
+                    'tolerant_mismatches', 'boundary_error_rate', 'interior_error_rate', 'tolerant_accuracy']
+
+
+def adjacency_sidecar(true_path, filename=None, adjacency_dir=None):
+    # 默认与参考文件放在一起；指定adjacency_dir时按相对路径在该目录下查找
+    if adjacency_dir:
+        base = os.path.join(adjacency_dir, *seg_key(filename).split("/"))
+    else:
+        base = seg_key(true_path)
+    return os.path.splitext(base)[0] + ADJACENCY_SUFFIX
+
+
+def adjacency_signature(sidecar_path):
+    # 邻接文件（没有时为CSR缓存）的大小和修改时间，邻接文件变化后结果缓存随之失效
+    for path in (sidecar_path, os.path.splitext(sidecar_path)[0] + ADJACENCY_CACHE_SUFFIX):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        return f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return ""
+
+
+def read_edges(path):
+    edges = array('q')
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split('#', 1)[0].split()
+            if not line:
+                continue
+            if len(line) != 2:
+                raise ValueError(f"邻接文件格式错误: {line}")
+            a, b = int(line[0]), int(line[1])
+            if a < 0 or b < 0:
+                raise ValueError(f"面序号不能为负数: {a} {b}")
+            edges.append(a)
+            edges.append(b)
+    return edges
+
+
+class Adjacency:
+    # CSR格式的无向面邻接图：面i的邻居为 indices[indptr[i]:indptr[i + 1]]
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def faces(self):
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_edges(cls, edges):
+        # edges为扁平的(a, b, a, b, ...)序列；双向加入，去掉自环
+        if np is not None:
+            pairs = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+            # 面数按去掉自环之前的最大序号计算，与纯Python实现一致
+            faces = int(pairs.max()) + 1 if len(pairs) else 0
+            pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+            src = np.concatenate((pairs[:, 0], pairs[:, 1]))
+            dst = np.concatenate((pairs[:, 1], pairs[:, 0]))
+            order = np.argsort(src, kind='stable')
+            indptr = np.zeros(faces + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=faces), out=indptr[1:])
+            return cls(indptr, dst[order].astype(np.int32))
+
+        faces = max(edges, default=-1) + 1
+        neighbors = [[] for _ in range(faces)]
+        for k in range(0, len(edges), 2):
+            a, b = edges[k], edges[k + 1]
+            if a != b:
+                neighbors[a].append(b)
+                neighbors[b].append(a)
+        indptr = array('q', [0])
+        indices = array('i')
+        for row in neighbors:
+            indices.extend(row)
+            indptr.append(len(indices))
+        return cls(indptr, indices)
+
+    def neighbors(self, face):
+        return self.indices[self.indptr[face]:self.indptr[face + 1]]
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(ADJACENCY_HEADER.pack(ADJACENCY_MAGIC, ADJACENCY_VERSION, self.faces, len(self.indices)))
+            if np is not None:
+                np.asarray(self.indptr, dtype='<i8').tofile(f)
+                np.asarray(self.indices, dtype='<i4').tofile(f)
+            else:
+                for values, typecode, itemsize in ((self.indptr, 'q', 8), (self.indices, 'i', 4)):
+                    values = array(typecode, values)
+                    if values.itemsize != itemsize:
+                        raise ValueError(f"平台不支持{typecode}类型的定长整数")
+                    if sys.byteorder == 'big':
+                        values.byteswap()
+                    values.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_binary(cls, path):
+        with open(path, 'rb') as f:
+            magic, version, faces, count = ADJACENCY_HEADER.unpack(f.read(ADJACENCY_HEADER.size))
+            if magic != ADJACENCY_MAGIC or version != ADJACENCY_VERSION:
+                raise ValueError(f"不是有效的邻接缓存文件: {path}")
+            if np is None:
+                indptr = array('q')
+                indptr.fromfile(f, faces + 1)
+                indices = array('i')
+                indices.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    indptr.byteswap()
+                    indices.byteswap()
+                return cls(indptr, indices)
+        indptr = np.memmap(path, dtype='<i8', mode='r', offset=ADJACENCY_HEADER.size, shape=(faces + 1,))
+        indices = (np.memmap(path, dtype='<i4', mode='r', offset=ADJACENCY_HEADER.size + 8 * (faces + 1),
+                             shape=(count,)) if count else np.empty(0, dtype='<i4'))
+        return cls(indptr, indices)
+
+
+def load_adjacency(sidecar_path):
+    # 优先使用不比邻接文件旧的CSR缓存；只有缓存没有邻接文件时也可直接使用缓存。
+    # 缓存写入失败（例如目录只读）时只在内存中使用
+    cache_path = os.path.splitext(sidecar_path)[0] + ADJACENCY_CACHE_SUFFIX
+    try:
+        source_mtime = os.stat(sidecar_path).st_mtime_ns
+    except OSError:
+        source_mtime = None
+    try:
+        if source_mtime is None or os.stat(cache_path).st_mtime_ns >= source_mtime:
+            return Adjacency.load_binary(cache_path)
+    except (OSError, ValueError, struct.error):
+        pass
+    if source_mtime is None:
+        return None
+
+    adjacency = Adjacency.from_edges(read_edges(sidecar_path))
+    try:
+        adjacency.save(cache_path)
+    except OSError:
+        pass
+    return adjacency
+
+
+def adjacency_metrics(adjacency, true_labels, pred_labels):
+    # 边界面：至少有一个邻居的参考标签与自身不同；其余为内部面。
+    # 容差匹配：预测标签等于自身或任一邻居的参考标签即视为正确。只统计两侧都存在的面
+    n = min(len(true_labels), len(pred_labels))
+    # 序号超出邻接图的面没有邻居
+    rows = min(n, adjacency.faces)
+    if np is not None:
+        if not (hasattr(true_labels, 'dtype') and hasattr(pred_labels, 'dtype')):
+            codes = {}
+            true_labels = np.array([codes.setdefault(label, len(codes)) for label in true_labels[:n]])
+            pred_labels = np.array([codes.setdefault(label, len(codes)) for label in pred_labels[:n]])
+        true_labels = np.asarray(true_labels[:n])
+        pred_labels = np.asarray(pred_labels[:n])
+        indptr = np.asarray(adjacency.indptr[:rows + 1])
+        row = np.repeat(np.arange(rows), np.diff(indptr))
+        col = np.asarray(adjacency.indices[:indptr[-1]])
+        inside = col < n
+        row = row[inside]
+        col = col[inside]
+
+        boundary = np.zeros(n, dtype=bool)
+        boundary[row[true_labels[row] != true_labels[col]]] = True
+        wrong = true_labels != pred_labels
+        tolerated = np.zeros(n, dtype=bool)
+        tolerated[row[pred_labels[row] == true_labels[col]]] = True
+        boundary_faces = int(boundary.sum())
+        boundary_mismatches = int((wrong & boundary).sum())
+        mismatches = int(wrong.sum())
+        tolerant_mismatches = int((wrong & ~tolerated).sum())
+    else:
+        boundary_faces = boundary_mismatches = mismatches = tolerant_mismatches = 0
+        for face in range(n):
+            true_label = true_labels[face]
+            pred_label = pred_labels[face]
+            is_boundary = tolerated = False
+            for neighbor in (adjacency.neighbors(face) if face < rows else ()):
+                if neighbor >= n:
+                    continue
+                if true_labels[neighbor] != true_label:
+                    is_boundary = True
+                if true_labels[neighbor] == pred_label:
+                    tolerated = True
+            boundary_faces += is_boundary
+            if true_label != pred_label:
+                mismatches += 1
+                boundary_mismatches += is_boundary
+                tolerant_mismatches += not tolerated
+
+    interior_faces = n - boundary_faces
+    interior_mismatches = mismatches - boundary_mismatches
+    return {
+        'boundary_faces': boundary_faces,
+        'boundary_mismatches': boundary_mismatches,
+        'interior_faces': interior_faces,
+        'interior_mismatches': interior_mismatches,
+        'tolerant_mismatches': tolerant_mismatches,
+        'boundary_error_rate': boundary_mismatches / boundary_faces * 100 if boundary_faces else 0,
+        'interior_error_rate': interior_mismatches / interior_faces * 100 if interior_faces else 0,
+        'tolerant_accuracy': (n - tolerant_mismatches) / n * 100 if n else 0
+    }
+
+
+def adjacency_summary(results):
+    # 数据集级别：按面数加权汇总各文件的边界/内部/容差统计
+    fields = ADJACENCY_FIELDS[:5]
+    if hasattr(results, 'column'):
+        columns = [results.column(key, None) for key in fields]
+    else:
+        columns = [[data.get(key) for data in results.values()] for key in fields]
+    rows = [row for row, value in enumerate(columns[0]) if value is not None]
+    if not rows:
+        return None
+    totals = {key: sum(column[row] for row in rows) for key, column in zip(fields, columns)}
+    faces = totals['boundary_faces'] + totals['interior_faces']
+    return dict(totals, files=len(rows),
+                boundary_error_rate=(totals['boundary_mismatches'] / totals['boundary_faces'] * 100
+                                     if totals['boundary_faces'] else 0),
+                interior_error_rate=(totals['interior_mismatches'] / totals['interior_faces'] * 100
+                                     if totals['interior_faces'] else 0),
+                tolerant_accuracy=(faces - totals['tolerant_mismatches']) / faces * 100 if faces else 0)
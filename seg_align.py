@@ -0,0 +1,145 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ALIGN_BAND = 32
+# 每个分块的DP单元数上限（对角线数 × 分块长度），控制内存占用
+ALIGN_BLOCK_CELLS = 1 << 22
+
+
+def trim_common(true_labels, pred_labels):
+    # 去掉相同的前缀和后缀，只对中间不一致的部分做对齐
+    n = min(len(true_labels), len(pred_labels))
+    if np is not None and hasattr(true_labels, 'dtype') and hasattr(pred_labels, 'dtype'):
+        diff = np.flatnonzero(true_labels[:n] != pred_labels[:n])
+        prefix = int(diff[0]) if len(diff) else n
+        rest = n - prefix
+        diff = np.flatnonzero(true_labels[::-1][:rest] != pred_labels[::-1][:rest])
+        suffix = int(diff[0]) if len(diff) else rest
+    else:
+        prefix = 0
+        while prefix < n and true_labels[prefix] == pred_labels[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < n - prefix and true_labels[-1 - suffix] == pred_labels[-1 - suffix]:
+            suffix += 1
+    return (true_labels[prefix:len(true_labels) - suffix], pred_labels[prefix:len(pred_labels) - suffix])
+
+
+def aligned_distance(true_labels, pred_labels, band=ALIGN_BAND):
+    # 带状编辑距离（替换、插入、删除代价均为1），对齐路径限制在两端所在对角线外扩band的范围内
+    true_labels, pred_labels = trim_common(true_labels, pred_labels)
+    if len(true_labels) == 0 or len(pred_labels) == 0:
+        return max(len(true_labels), len(pred_labels))
+    if np is None:
+        return banded_distance_python(true_labels, pred_labels, band)
+    if not (hasattr(true_labels, 'dtype') and hasattr(pred_labels, 'dtype')):
+        codes = {}
+        true_labels = np.array([codes.setdefault(label, len(codes)) for label in true_labels], dtype=np.int64)
+        pred_labels = np.array([codes.setdefault(label, len(codes)) for label in pred_labels], dtype=np.int64)
+    return banded_distance_numpy(np.asarray(true_labels), np.asarray(pred_labels), band)
+
+
+def banded_distance_python(a, b, band):
+    n, m = len(a), len(b)
+    low = min(0, m - n) - band
+    high = max(0, m - n) + band
+    inf = n + m + 1
+    prev = {j: j for j in range(0, min(m, high) + 1)}
+    for i in range(1, n + 1):
+        row = {}
+        for j in range(max(0, i + low), min(m, i + high) + 1):
+            best = prev.get(j, inf) + 1
+            if j > 0:
+                best = min(best, row.get(j - 1, inf) + 1, prev.get(j - 1, inf) + (a[i - 1] != b[j - 1]))
+            row[j] = best
+        prev = row
+    return prev[m]
+
+
+def banded_distance_numpy(a, b, band):
+    # 按对角线 d = j - i 组织DP，并沿i方向分块。块内每条对角线上
+    #   D[d][i] = min(X[i], D[d][i-1] + c[i])，X来自相邻对角线（删除/插入）
+    # 可写成前缀和与累计最小值，整条对角线一次向量化计算；相邻对角线之间
+    # 交替正向/反向扫描直到数值不再变化，结果与完整DP一致
+    n, m = len(a), len(b)
+    low = min(0, m - n) - band
+    high = max(0, m - n) + band
+    diagonals = high - low + 1
+    inf = n + m + 1
+    dtype = np.int32 if inf + band < 2 ** 31 else np.int64
+    block = max(256, ALIGN_BLOCK_CELLS // diagonals)
+    offsets = range(low, high + 1)
+
+    # b两侧补齐，使每条对角线在任意分块内都能直接切片；补齐部分的代价在下面统一置1
+    pad = n + high + 1
+    padded = np.zeros(m + 2 * pad, dtype=b.dtype)
+    padded[pad:pad + m] = b
+
+    # 上一块最后一行（i = start - 1）在各对角线上的值
+    last = np.full(diagonals, inf, dtype=dtype)
+    for start in range(0, n + 1, block):
+        stop = min(n + 1, start + block)
+        width = stop - start
+        i = np.arange(start, stop)
+        j = i[None, :] + np.arange(low, high + 1)[:, None]
+        valid = (j >= 0) & (j <= m)
+
+        # c[d][i]: 从(i-1, j-1)沿对角线走到(i, j)的代价
+        prev_a = a[max(0, start - 1):stop - 1]
+        if start == 0:
+            prev_a = np.concatenate((a[:1], prev_a))
+        cost = np.empty((diagonals, width), dtype=dtype)
+        for d, offset in enumerate(offsets):
+            begin = pad + start + offset - 1
+            np.not_equal(prev_a, padded[begin:begin + width], out=cost[d], casting='unsafe')
+        cost[~(valid & (i[None, :] >= 1) & (j >= 1))] = 1
+        first_cost = cost[:, 0].copy()
+
+        table = np.full(j.shape, inf, dtype=dtype)
+        cost[:, 0] = 0
+        prefix = np.cumsum(cost, axis=1, dtype=dtype)
+        masked = not valid.all()
+
+        def relax(d):
+            # 插入：来自(i, j-1)，即对角线d-1上的同一个i
+            if d > 0:
+                seed = table[d - 1] + 1
+            else:
+                seed = np.full(width, inf, dtype=dtype)
+            # 删除：来自(i-1, j)，即对角线d+1上的前一个i
+            if d + 1 < diagonals:
+                np.minimum(seed[1:], table[d + 1, :-1] + 1, out=seed[1:])
+                seed[0] = min(seed[0], last[d + 1] + 1)
+            seed[0] = min(seed[0], last[d] + first_cost[d])
+            if start == 0 and d == -low:
+                seed[0] = 0
+            seed -= prefix[d]
+            np.minimum.accumulate(seed, out=seed)
+            seed += prefix[d]
+            if masked:
+                seed[~valid[d]] = inf
+            if np.array_equal(seed, table[d]):
+                return False
+            table[d] = seed
+            return True
+
+        # 只重新计算相邻对角线有变化的对角线，正向和反向交替进行
+        dirty = [True] * diagonals
+        order = range(diagonals)
+        while any(dirty):
+            for d in order:
+                if not dirty[d]:
+                    continue
+                dirty[d] = False
+                if relax(d):
+                    if d > 0:
+                        dirty[d - 1] = True
+                    if d + 1 < diagonals:
+                        dirty[d + 1] = True
+            order = order[::-1]
+        last = table[:, -1].copy()
+
+    return int(last[m - n - low])
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from seg_engine import SegComparisonEngine, categorize_results
+from seg_export import export_category_files, EXPORT_MODES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def generate_corpus(out_dir, files=100, labels=10000, classes=8, error_rate=0.05,
+                    length_mismatch=0.1, seed=0):
+    # 生成参考/预测目录：预测标签按error_rate随机替换，
+    # length_mismatch比例的文件随机截断或追加若干标签
+    rng = random.Random(seed)
+    true_dir = os.path.join(out_dir, "ref")
+    pred_dir = os.path.join(out_dir, "pred")
+    os.makedirs(true_dir, exist_ok=True)
+    os.makedirs(pred_dir, exist_ok=True)
+
+    for k in range(files):
+        true_labels = [rng.randrange(classes) for _ in range(labels)]
+        pred_labels = [rng.randrange(classes) if rng.random() < error_rate else label
+                       for label in true_labels]
+        if rng.random() < length_mismatch:
+            delta = rng.randint(1, max(1, labels // 100))
+            if rng.random() < 0.5:
+                pred_labels = pred_labels[:-delta]
+            else:
+                pred_labels.extend(rng.randrange(classes) for _ in range(delta))
+
+        filename = f"model_{k:06d}.seg"
+        with open(os.path.join(true_dir, filename), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(map(str, true_labels)) + '\n')
+        with open(os.path.join(pred_dir, filename), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(map(str, pred_labels)) + '\n')
+
+    return true_dir, pred_dir
+
+
+def measure(name, func, track_memory=True):
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        files, labels, value = func()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if track_memory else None
+        if track_memory:
+            tracemalloc.stop()
+
+    return {
+        'stage': name,
+        'seconds': seconds,
+        'files': files,
+        'labels': labels,
+        'files_per_s': files / seconds if seconds > 0 else None,
+        'labels_per_s': labels / seconds if seconds > 0 else None,
+        'peak_memory_bytes': peak
+    }, value
+
+
+def run_benchmark(true_dir, pred_dir, workers=1, streaming=False, metrics=False, track_memory=True,
+                  export_mode="copy", archive=None, export_workers=8):
+    engine = SegComparisonEngine(workers=workers, streaming=streaming, metrics=metrics)
+    true_files = engine.seg_files(true_dir)
+    pred_files = engine.seg_files(pred_dir)
+    filenames = sorted(true_files.keys() & pred_files.keys())
+    stages = []
+
+    def read_stage():
+        labels = 0
+        for filename in filenames:
+            labels += len(engine.read_labels(os.path.join(true_dir, true_files[filename])))
+            labels += len(engine.read_labels(os.path.join(pred_dir, pred_files[filename])))
+        return len(filenames) * 2, labels, None
+
+    def compare_stage():
+        results = engine.compare_seg_directories(true_dir, pred_dir)
+        return len(results), sum(results.column('total_labels')), results
+
+    stage, _ = measure("read_labels", read_stage, track_memory)
+    stages.append(stage)
+    stage, results = measure("compare_seg_directories", compare_stage, track_memory)
+    stages.append(stage)
+
+    # display_results中与界面无关的部分：汇总统计和错误分类
+    def display_stage():
+        sum(results.column('mismatches'))
+        sum(results.column('length_diff'))
+        categories = categorize_results(results)
+        return len(results), sum(results.column('total_labels')), categories
+
+    stage, categories = measure("display_results", display_stage, track_memory)
+    stages.append(stage)
+
+    target_dir = tempfile.mkdtemp(prefix="seg_bench_copy_")
+    try:
+        def copy_stage():
+            copied = 0
+            labels = 0
+            for name, category in categories.items():
+                if not category["files"]:
+                    continue
+                report = export_category_files(results, category["files"], os.path.join(target_dir, name),
+                                               mode=export_mode, archive=archive, workers=export_workers)
+                copied += report['ref'] + report['pred']
+                labels += category["total_labels"] * 2
+            return copied, labels, None
+
+        stage, _ = measure("copy_selected_files", copy_stage, track_memory)
+        stages.append(stage)
+    finally:
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+    return stages
+
+
+def run_generate(args):
+    generate_corpus(args.out_dir, args.files, args.labels, args.classes, args.error_rate,
+                    args.length_mismatch, args.seed)
+    print(f"已生成 {args.files} 对文件: {args.out_dir}", file=sys.stderr)
+    return 0
+
+
+def run_bench(args):
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix="seg_bench_")
+    try:
+        if args.corpus:
+            true_dir = os.path.join(corpus_dir, "ref")
+            pred_dir = os.path.join(corpus_dir, "pred")
+        else:
+            true_dir, pred_dir = generate_corpus(corpus_dir, args.files, args.labels, args.classes,
+                                                 args.error_rate, args.length_mismatch, args.seed)
+
+        report = {
+            'config': {
+                'files': args.files,
+                'labels': args.labels,
+                'classes': args.classes,
+                'error_rate': args.error_rate,
+                'length_mismatch': args.length_mismatch,
+                'seed': args.seed,
+                'workers': args.workers,
+                'streaming': args.streaming,
+                'metrics': args.metrics,
+                'export_mode': args.export_mode,
+                'archive': args.archive,
+                'export_workers': args.export_workers,
+                'corpus': args.corpus
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'numpy': np.__version__ if np is not None else None
+            },
+            'stages': run_benchmark(true_dir, pred_dir, args.workers, args.streaming, args.metrics,
+                                    not args.no_memory, args.export_mode, args.archive, args.export_workers)
+        }
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    for stage in report['stages']:
+        print(f"{stage['stage']:<24} {stage['seconds']:8.3f}s  "
+              f"{stage['files_per_s'] or 0:10.1f} 文件/s  {stage['labels_per_s'] or 0:12.0f} 标签/s", file=sys.stderr)
+    return 0
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument("--files", type=int, default=100, help="文件对数量")
+    parser.add_argument("--labels", type=int, default=10000, help="每个文件的标签数")
+    parser.add_argument("--classes", type=int, default=8, help="类别数")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="预测标签的错误比例")
+    parser.add_argument("--length-mismatch", type=float, default=0.1, help="长度不一致文件的比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="seg_bench", description="SEG文件比较性能测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="生成合成的参考/预测目录")
+    generate.add_argument("out_dir", help="输出目录（生成ref/和pred/子目录）")
+    add_corpus_arguments(generate)
+    generate.set_defaults(func=run_generate)
+
+    bench = subparsers.add_parser("run", help="运行性能测试并输出JSON报告")
+    add_corpus_arguments(bench)
+    bench.add_argument("--corpus", help="使用已生成的目录（包含ref/和pred/），不再临时生成")
+    bench.add_argument("-j", "--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    bench.add_argument("--streaming", action="store_true", help="使用流式比较")
+    bench.add_argument("--metrics", action="store_true", help="同时计算类别指标")
+    bench.add_argument("--export-mode", choices=list(EXPORT_MODES), default="copy", help="文件导出方式")
+    bench.add_argument("--archive", choices=["zip", "tar"], help="每个分类导出为一个压缩包")
+    bench.add_argument("--export-workers", type=int, default=8, help="导出线程数")
+    bench.add_argument("--no-memory", action="store_true", help="不统计内存峰值（tracemalloc会降低速度）")
+    bench.add_argument("-o", "--output", help="JSON报告输出文件，默认输出到标准输出")
+    bench.set_defaults(func=run_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
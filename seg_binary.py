@@ -0,0 +1,89 @@
+import os
+import re
+import sys
+import struct
+from array import array
+
+from seg_compress import seg_key
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 二进制标签文件：16字节文件头 + 小端定长整数数组
+# 文件头: 魔数(4) 版本(1) 类型码(1) 保留(2) 标签数(8)
+BINARY_MAGIC = b'SEGB'
+BINARY_VERSION = 1
+BINARY_SUFFIX = '.segb'
+HEADER = struct.Struct('<4sBcxxQ')
+
+# 按取值范围选用最窄的整数类型
+TYPECODES = [('b', -2 ** 7, 2 ** 7 - 1), ('h', -2 ** 15, 2 ** 15 - 1),
+             ('i', -2 ** 31, 2 ** 31 - 1), ('q', -2 ** 63, 2 ** 63 - 1)]
+NUMPY_DTYPES = {'b': '<i1', 'h': '<i2', 'i': '<i4', 'q': '<i8'}
+
+# 只有规范形式的整数标签（无前导零、无正号、无"-0"）才按整数处理，
+# 保证与逐个字符串比较的结果完全一致
+INT_LABELS_RE = re.compile(r'(?:0|-?[1-9][0-9]{0,17})(?:\n(?:0|-?[1-9][0-9]{0,17}))*')
+
+
+def is_int_labels(labels):
+    return not labels or INT_LABELS_RE.fullmatch('\n'.join(labels)) is not None
+
+
+def binary_sibling(seg_path):
+    # 压缩文件 m.seg.gz 的二进制文件同样为 m.segb
+    root, ext = os.path.splitext(seg_key(seg_path))
+    return root + BINARY_SUFFIX
+
+
+def fresh_binary_sibling(seg_path):
+    binary_path = binary_sibling(seg_path)
+    try:
+        if os.stat(binary_path).st_mtime_ns >= os.stat(seg_path).st_mtime_ns:
+            return binary_path
+    except OSError:
+        pass
+    return None
+
+
+def write_binary_labels(path, values):
+    low = min(values, default=0)
+    high = max(values, default=0)
+    typecode = next(code for code, min_value, max_value in TYPECODES if min_value <= low and high <= max_value)
+    data = array(typecode, values)
+    if data.itemsize != int(NUMPY_DTYPES[typecode][-1]):
+        raise ValueError(f"平台不支持{typecode}类型的定长整数")
+    if sys.byteorder == 'big':
+        data.byteswap()
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(BINARY_MAGIC, BINARY_VERSION, typecode.encode('ascii'), len(data)))
+        data.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_binary_labels(path):
+    # 以内存映射方式加载，不复制数据
+    with open(path, 'rb') as f:
+        magic, version, typecode, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"不是有效的二进制标签文件: {path}")
+    dtype = NUMPY_DTYPES[typecode.decode('ascii')]
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size, shape=(count,))
+
+
+def convert_seg_file(seg_path, read_labels, force=False):
+    binary_path = binary_sibling(seg_path)
+    if not force and fresh_binary_sibling(seg_path):
+        return None
+    labels = read_labels(seg_path)
+    if not is_int_labels(labels):
+        raise ValueError("包含非整数标签，无法转换")
+    write_binary_labels(binary_path, [int(label) for label in labels])
+    return binary_path
@@ -0,0 +1,103 @@
+import json
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 默认分箱与原来的分类完全一致：错误率 <= edges[k] 落入第k个分箱，
+# 超过最后一个边界落入最后一个分箱；长度不一致的文件单独归类
+DEFAULT_EDGES = [0, 1, 3, 5, 10, 15, 20, 30, 50]
+DEFAULT_LABELS = [
+    "完美匹配(0%)", "极轻微错误(0-1%)", "轻微错误(1-3%)",
+    "中等偏轻错误(3-5%)", "中等错误(5-10%)", "中等偏重错误(10-15%)",
+    "显著错误(15-20%)", "严重错误(20-30%)", "非常严重错误(30-50%)",
+    "极端严重错误(>50%)"
+]
+DEFAULT_COLORS = [
+    "#28A745", "#36A2EB", "#36A2EB", "#48BB78", "#48BB78", "#48BB78",
+    "#FFCD56", "#FF9F43", "#FF6384", "#DC3545"
+]
+LENGTH_MISMATCH_LABEL = "长度不一致"
+LENGTH_MISMATCH_COLOR = "#6F42C1"
+
+
+class BinningError(ValueError):
+    pass
+
+
+class Binning:
+    def __init__(self, edges=DEFAULT_EDGES, labels=DEFAULT_LABELS, colors=DEFAULT_COLORS,
+                 length_mismatch_label=LENGTH_MISMATCH_LABEL, length_mismatch_color=LENGTH_MISMATCH_COLOR):
+        edges = [float(edge) for edge in edges]
+        if any(b <= a for a, b in zip(edges, edges[1:])):
+            raise BinningError("分箱边界必须严格递增")
+        if len(labels) != len(edges) + 1:
+            raise BinningError(f"{len(edges)}个边界需要{len(edges) + 1}个分类名称，实际为{len(labels)}个")
+        colors = list(colors or [])
+        if colors and len(colors) != len(labels):
+            raise BinningError("颜色数量必须与分类名称数量一致")
+        if len(set(labels) | {length_mismatch_label}) != len(labels) + 1:
+            raise BinningError("分类名称不能重复")
+        self.edges = edges
+        self.labels = list(labels)
+        self.colors = colors or [None] * len(labels)
+        self.length_mismatch_label = length_mismatch_label
+        self.length_mismatch_color = length_mismatch_color
+
+    @classmethod
+    def load(cls, path):
+        # JSON配置: {"edges": [...], "labels": [...], "colors": [...],
+        #            "length_mismatch_label": "...", "length_mismatch_color": "..."}
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_dict(cls, config):
+        try:
+            return cls(config['edges'], config['labels'], config.get('colors'),
+                       config.get('length_mismatch_label', LENGTH_MISMATCH_LABEL),
+                       config.get('length_mismatch_color', LENGTH_MISMATCH_COLOR))
+        except (KeyError, TypeError) as e:
+            raise BinningError(f"分箱配置格式错误: {e}")
+
+    def to_dict(self):
+        return {
+            'edges': self.edges,
+            'labels': self.labels,
+            'colors': self.colors,
+            'length_mismatch_label': self.length_mismatch_label,
+            'length_mismatch_color': self.length_mismatch_color
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def names(self):
+        return self.labels + [self.length_mismatch_label]
+
+    def color(self, name):
+        if name == self.length_mismatch_label:
+            return self.length_mismatch_color
+        try:
+            return self.colors[self.labels.index(name)]
+        except ValueError:
+            return None
+
+    def assign(self, error_rates, length_mismatch=None):
+        # 返回每个文件的分箱序号，长度不一致的文件为len(labels)
+        if np is not None:
+            codes = np.searchsorted(np.asarray(self.edges), np.asarray(error_rates, dtype=np.float64), side='left')
+            if length_mismatch is not None:
+                codes[np.asarray(length_mismatch, dtype=bool)] = len(self.labels)
+            return codes
+        codes = [bisect_left(self.edges, rate) for rate in error_rates]
+        if length_mismatch is not None:
+            codes = [len(self.labels) if mismatch else code for code, mismatch in zip(codes, length_mismatch)]
+        return codes
+
+
+DEFAULT_BINNING = Binning()
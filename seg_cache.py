@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import hashlib
+import time
+from array import array
+
+from seg_results import RESULT_FIELDS
+
+
+CACHE_FILENAME = ".seg_compare_cache.sqlite"
+CACHE_VERSION = 3
+# 每写入这么多条或经过这么多秒提交一次，进程中途崩溃时只丢失最近未提交的部分
+COMMIT_EVERY = 500
+COMMIT_SECONDS = 5.0
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def indices_to_bytes(indices):
+    if isinstance(indices, array) and indices.typecode == 'i':
+        return indices.tobytes()
+    if hasattr(indices, 'astype'):
+        return indices.astype('int32').tobytes()
+    return array('i', indices).tobytes()
+
+
+class ResultCache:
+    # 缓存条目以(参考文件, 文件名, 预测文件)为键，同一参考目录对应多个预测目录时互不覆盖。
+    # 默认按大小和修改时间判断文件是否变化；verify=True时另外保存内容哈希，
+    # 仅修改时间变化（例如重新复制）但内容相同的文件仍可命中，代价是写入时多读一遍文件。
+    # sidecar为结果依赖的其他文件（如邻接文件）的签名，与保存时不同也视为失效
+    def __init__(self, path, options="", verify=False):
+        self.path = path
+        # 影响结果内容的引擎选项，选项不同的缓存条目视为失效
+        self.options = options
+        self.verify = verify
+        self.conn = sqlite3.connect(path)
+        # 表结构变化时旧缓存直接丢弃重建
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS results")
+            self.conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                true_path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                pred_path TEXT NOT NULL,
+                options TEXT NOT NULL,
+                true_size INTEGER, true_mtime INTEGER, true_hash TEXT,
+                pred_size INTEGER, pred_mtime INTEGER, pred_hash TEXT,
+                total_labels INTEGER, mismatches INTEGER, length_diff INTEGER, error_rate REAL,
+                mismatch_indices BLOB,
+                extra TEXT,
+                sidecar TEXT,
+                PRIMARY KEY (true_path, filename, pred_path)
+            )
+        """)
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def _matches(self, path, size, mtime, digest, column_prefix, row_key):
+        cur_size, cur_mtime = file_signature(path)
+        if cur_size != size:
+            return False
+        if cur_mtime == mtime:
+            return True
+        # 仅修改时间变化时，启用校验且有内容哈希才比较哈希，哈希一致则刷新修改时间
+        if not self.verify or digest is None or file_hash(path) != digest:
+            return False
+        self.conn.execute(f"UPDATE results SET {column_prefix}_mtime = ? "
+                          f"WHERE true_path = ? AND filename = ? AND pred_path = ?", (cur_mtime,) + row_key)
+        return True
+
+    def get(self, filename, true_path, pred_path, sidecar=None):
+        row_key = (os.path.abspath(true_path), filename, os.path.abspath(pred_path))
+        row = self.conn.execute("""
+            SELECT options, true_size, true_mtime, true_hash, pred_size, pred_mtime, pred_hash,
+                   total_labels, mismatches, length_diff, error_rate, mismatch_indices, extra, sidecar
+            FROM results WHERE true_path = ? AND filename = ? AND pred_path = ?
+        """, row_key).fetchone()
+        if row is None or row[0] != self.options or row[13] != sidecar:
+            self.misses += 1
+            return None
+
+        try:
+            valid = (self._matches(true_path, row[1], row[2], row[3], "true", row_key) and
+                     self._matches(pred_path, row[4], row[5], row[6], "pred", row_key))
+        except OSError:
+            valid = False
+        if not valid:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        mismatch_indices = array('i')
+        mismatch_indices.frombytes(row[11])
+        data = {
+            'total_labels': row[7],
+            'mismatches': row[8],
+            'length_diff': row[9],
+            'error_rate': row[10],
+            'mismatch_indices': mismatch_indices,
+            'true_path': true_path,
+            'pred_path': pred_path,
+            'true_filename': os.path.basename(true_path),
+            'pred_filename': os.path.basename(pred_path)
+        }
+        if row[12]:
+            data.update(json.loads(row[12]))
+        return data
+
+    def put(self, filename, data, sidecar=None):
+        true_size, true_mtime = file_signature(data['true_path'])
+        pred_size, pred_mtime = file_signature(data['pred_path'])
+        true_hash = file_hash(data['true_path']) if self.verify else None
+        pred_hash = file_hash(data['pred_path']) if self.verify else None
+        self.conn.execute("""
+            INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (os.path.abspath(data['true_path']), filename, os.path.abspath(data['pred_path']), self.options,
+              true_size, true_mtime, true_hash, pred_size, pred_mtime, pred_hash,
+              data['total_labels'], data['mismatches'], data['length_diff'], data['error_rate'],
+              indices_to_bytes(data['mismatch_indices']),
+              json.dumps({key: value for key, value in data.items() if key not in RESULT_FIELDS}), sidecar))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_SECONDS:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
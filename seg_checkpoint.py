@@ -0,0 +1,110 @@
+import os
+import json
+import time
+
+from seg_cache import file_signature
+from seg_results import encode_runs, decode_runs
+
+
+CHECKPOINT_FILENAME = ".seg_compare_checkpoint.jsonl"
+CHECKPOINT_VERSION = 1
+# 两次写盘之间的最长间隔（秒），进程崩溃时最多丢失这段时间内的结果
+CHECKPOINT_INTERVAL = 5.0
+
+
+class Checkpoint:
+    # JSONL检查点：首行记录比较参数，之后每行一个文件的结果和两侧文件的大小/修改时间。
+    # 崩溃时最后一行可能不完整，读取时跳过；文件有变化的条目在恢复时重新比较
+    def __init__(self, path, true_dir, pred_dir, options="", interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.header = {
+            'checkpoint': CHECKPOINT_VERSION,
+            'true_dir': os.path.abspath(true_dir),
+            'pred_dir': os.path.abspath(pred_dir),
+            'options': options
+        }
+        self.interval = interval
+        self.file = None
+        self.last_flush = 0.0
+
+    def load(self):
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                if json.loads(f.readline()) != self.header:
+                    return {}
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries[entry.pop('filename')] = entry
+        except (OSError, ValueError):
+            return {}
+        return entries
+
+    def restore(self, entry, true_path, pred_path):
+        # 两侧文件与写入检查点时一致才复用结果
+        try:
+            if (list(file_signature(true_path)) != entry['true_signature'] or
+                    list(file_signature(pred_path)) != entry['pred_signature']):
+                return None
+        except (OSError, KeyError):
+            return None
+        data = {key: value for key, value in entry.items() if not key.endswith('_signature')}
+        data['mismatch_indices'] = decode_runs(data.pop('mismatch_runs'))
+        return data
+
+    def open(self, keep=()):
+        # 重新写出仍有效的条目，丢弃不完整的行和已失效的结果
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.file.write(json.dumps(self.header, ensure_ascii=False) + '\n')
+        for filename, entry in keep:
+            self.file.write(json.dumps(dict(entry, filename=filename), ensure_ascii=False) + '\n')
+        self.flush(force=True)
+
+    def add(self, filename, data):
+        entry = {'filename': filename}
+        for key, value in data.items():
+            if key == 'mismatch_indices':
+                entry['mismatch_runs'] = list(encode_runs(value))
+            else:
+                entry[key] = value
+        try:
+            entry['true_signature'] = list(file_signature(data['true_path']))
+            entry['pred_signature'] = list(file_signature(data['pred_path']))
+        except OSError:
+            return
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if self.file is None or (not force and now - self.last_flush < self.interval):
+            return
+        self.last_flush = now
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.flush(force=True)
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        # 写入出错后放弃检查点：关闭文件，不再写入
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import argparse
+
+from seg_engine import (SegComparisonEngine, SegComparisonError, save_results_json, save_results_csv,
+                        save_orphans_csv, leaderboard, save_leaderboard_csv, categorize_results, results_summary,
+                        STREAM_BLOCK_SIZE)
+from seg_cache import CACHE_FILENAME
+from seg_checkpoint import CHECKPOINT_FILENAME
+from seg_align import ALIGN_BAND
+from seg_bins import Binning, BinningError
+from seg_adjacency import adjacency_summary
+from seg_metrics import save_metrics_csv, save_confusion_csv
+from seg_shard import parse_shard, ShardError
+from seg_merge import results_header, save_results_file, merge_results_files
+from seg_session import save_session, SessionError
+from seg_diff import ResultsDiff, load_run, STATUS_NAMES
+
+
+def open_output(path):
+    if not path or path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def run_compare(args):
+    shard = parse_shard(args.shard) if args.shard else None
+    engine = SegComparisonEngine(workers=args.workers, chunksize=args.chunksize,
+                                 streaming=args.streaming, block_size=args.block_size,
+                                 cache=args.cache or bool(args.cache_path or args.cache_verify),
+                                 cache_path=args.cache_path, cache_verify=args.cache_verify,
+                                 metrics=args.metrics or bool(args.metrics_output or args.confusion_output),
+                                 recursive=args.recursive, checkpoint_path=args.checkpoint, resume=args.resume,
+                                 align=args.align, align_band=args.align_band,
+                                 profile=args.profile or bool(args.profile_output), cprofile_path=args.cprofile,
+                                 adjacency=args.adjacency, adjacency_dir=args.adjacency_dir, shard=shard)
+    try:
+        results = engine.compare_seg_directories(args.true_dir, args.pred_dir)
+    except KeyboardInterrupt:
+        if engine.checkpoint:
+            print("比较已中断，使用 --resume 可从检查点继续", file=sys.stderr)
+        return 130
+
+    out = open_output(args.output)
+    try:
+        if args.format == 'csv':
+            save_results_csv(results, out)
+        else:
+            save_results_json(results, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.results_file:
+        save_results_file(results, args.results_file,
+                          results_header(args.true_dir, args.pred_dir, engine.cache_options(), shard))
+    if args.session:
+        save_session(results, args.session, {'true_dir': os.path.abspath(args.true_dir),
+                                             'pred_dir': os.path.abspath(args.pred_dir),
+                                             'options': engine.cache_options()})
+
+    if results.confusion is not None:
+        for path, writer in ((args.metrics_output, save_metrics_csv), (args.confusion_output, save_confusion_csv)):
+            if path:
+                with open_output(path) as out:
+                    writer(results.confusion, out)
+        print(f"平均IoU: {results.confusion.mean_iou() * 100:.2f}%  "
+              f"准确率: {results.confusion.accuracy():.2f}%", file=sys.stderr)
+
+    summary = adjacency_summary(results) if engine.adjacency else None
+    if summary:
+        print(f"边界面错误率: {summary['boundary_error_rate']:.2f}%  内部面错误率: {summary['interior_error_rate']:.2f}%  "
+              f"邻居容差准确率: {summary['tolerant_accuracy']:.2f}%  （{summary['files']} 个文件有邻接数据）",
+              file=sys.stderr)
+    elif engine.adjacency:
+        print("流式比较不支持邻接指标" if engine.streaming else "没有找到邻接文件(.adj)，未计算邻接指标",
+              file=sys.stderr)
+
+    orphans = results.orphans or {'true_only': [], 'pred_only': []}
+    if args.orphans_output:
+        with open_output(args.orphans_output) as out:
+            save_orphans_csv(orphans, out)
+    if orphans['true_only'] or orphans['pred_only']:
+        print(f"仅参考目录存在 {len(orphans['true_only'])} 个文件，"
+              f"仅预测目录存在 {len(orphans['pred_only'])} 个文件", file=sys.stderr)
+
+    if results.failed:
+        print(f"{len(results.failed)} 个文件读取失败: {', '.join(sorted(results.failed)[:10])}"
+              f"{' ...' if len(results.failed) > 10 else ''}", file=sys.stderr)
+
+    for warning in engine.warnings:
+        print(warning, file=sys.stderr)
+
+    if results.profile is not None:
+        if args.profile_output:
+            with open_output(args.profile_output) as out:
+                results.profile.save_json(out)
+        print_profile(results.profile)
+
+    shard_text = f"（分片 {shard[0]}/{shard[1]}）" if shard else ""
+    print(f"比较完成！共处理 {len(results)} 个文件{shard_text}", file=sys.stderr)
+    return 0
+
+
+def run_merge(args):
+    binning = Binning.load(args.bins) if args.bins else None
+    header, results = merge_results_files(args.files, allow_missing=args.allow_missing,
+                                          allow_dir_mismatch=args.allow_dir_mismatch)
+    if args.output:
+        save_results_file(results, args.output, header, binning)
+    if args.csv:
+        with open_output(args.csv) as out:
+            save_results_csv(results, out)
+    if args.session:
+        save_session(results, args.session, {key: header[key] for key in ('true_dir', 'pred_dir', 'options')},
+                     binning)
+
+    if header.get('missing_shards'):
+        print(f"警告: 缺少分片 {', '.join(map(str, header['missing_shards']))}（共 {header['shard_count']} 个）",
+              file=sys.stderr)
+    summary = results_summary(results)
+    print(f"合并 {len(args.files)} 个结果文件，共 {summary['files']} 个文件  总标签数 {summary['total_labels']}  "
+          f"不匹配 {summary['total_mismatches']}  总体错误率 {summary['error_rate']:.2f}%", file=sys.stderr)
+    if results.confusion is not None:
+        print(f"平均IoU: {results.confusion.mean_iou() * 100:.2f}%  "
+              f"准确率: {results.confusion.accuracy():.2f}%", file=sys.stderr)
+    for name, category in categorize_results(results, binning).items():
+        if category['count']:
+            print(f"  {name}: {category['count']}", file=sys.stderr)
+    orphans = results.orphans
+    if orphans['true_only'] or orphans['pred_only']:
+        print(f"仅参考目录存在 {len(orphans['true_only'])} 个文件，"
+              f"仅预测目录存在 {len(orphans['pred_only'])} 个文件", file=sys.stderr)
+    if results.failed:
+        print(f"{len(results.failed)} 个文件读取失败", file=sys.stderr)
+    return 0
+
+
+def print_profile(profile, slowest=10):
+    print(f"总耗时 {profile.wall_seconds():.3f}s（子进程中的阶段按文件累加，多进程时可能超过总耗时）",
+          file=sys.stderr)
+    for row in profile.summary():
+        line = f"  {row['name']:<16} {row['seconds']:9.3f}s {row['share']:6.1f}%  {row['calls']:>8} 次"
+        if row['bytes_per_s']:
+            line += f"  {row['bytes'] / 1e6:10.1f} MB  {row['bytes_per_s'] / 1e6:8.1f} MB/s"
+        if row['labels_per_s']:
+            line += f"  {row['labels_per_s']:12.0f} 标签/s"
+        print(line, file=sys.stderr)
+    rows = profile.slowest(slowest)
+    if rows:
+        print("耗时最长的文件:", file=sys.stderr)
+        for row in rows:
+            print(f"  {row['filename']}  {row['seconds']:.3f}s  {row['bytes'] / 1e6:.1f} MB  "
+                  f"{row['labels']} 标签  最慢阶段: {row['slowest_stage']}", file=sys.stderr)
+
+
+def run_leaderboard(args):
+    engine = SegComparisonEngine(workers=args.workers, chunksize=args.chunksize,
+                                 cache=args.cache, metrics=args.metrics, recursive=args.recursive,
+                                 align=args.align, align_band=args.align_band)
+    binning = Binning.load(args.bins) if args.bins else None
+    results_by_model = engine.compare_multi(args.true_dir, args.pred_dirs)
+    rows = leaderboard(results_by_model, binning)
+
+    out = open_output(args.output)
+    try:
+        if args.format == 'csv':
+            save_leaderboard_csv(rows, out, binning)
+        else:
+            json.dump(rows, out, ensure_ascii=False, indent=2)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.results_dir:
+        os.makedirs(args.results_dir, exist_ok=True)
+        for pred_dir, results in results_by_model.items():
+            name = os.path.basename(os.path.normpath(pred_dir)) or "pred"
+            with open(os.path.join(args.results_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+                save_results_json(results, f)
+
+    for rank, row in enumerate(rows, 1):
+        print(f"{rank:>3}. {row['model']}  错误率 {row['error_rate']:.2f}%  文件 {row['files']}", file=sys.stderr)
+    return 0
+
+
+def run_diff(args):
+    binning = Binning.load(args.bins) if args.bins else None
+    diff = ResultsDiff(load_run(args.base), load_run(args.new), binning, args.threshold)
+    if args.output:
+        with open_output(args.output) as out:
+            if args.format == 'json':
+                diff.save_json(out)
+            else:
+                diff.save_csv(out)
+
+    summary = diff.summary()
+    print(f"共同文件 {summary['files']} 个  总体错误率 {summary['base_error_rate']:.2f}% -> "
+          f"{summary['new_error_rate']:.2f}%（{summary['delta']:+.2f}%）", file=sys.stderr)
+    print("  " + "  ".join(f"{STATUS_NAMES[name]} {count}" for name, count in diff.status_counts().items()),
+          file=sys.stderr)
+    if summary['base_only'] or summary['new_only']:
+        print(f"仅基准结果中存在 {summary['base_only']} 个文件，仅新结果中存在 {summary['new_only']} 个文件",
+              file=sys.stderr)
+    if summary['reference_changed']:
+        print(f"警告: 抽查的文件中有 {summary['reference_changed']} 个参考文件路径不同，两次结果可能使用了不同的参考目录",
+              file=sys.stderr)
+    changes = diff.category_changes()
+    if changes:
+        print("分类变化:", file=sys.stderr)
+        for before, after, count in changes[:args.top]:
+            print(f"  {before} -> {after}: {count}", file=sys.stderr)
+    rows = [row for row in diff.sorted_rows()[:args.top] if diff.delta[row] > 0 or diff.status_name(row) == 'newly_broken']
+    if rows:
+        print("变差最多的文件:", file=sys.stderr)
+        for row in rows:
+            record = diff.record(row)
+            print(f"  {record['filename']}  {record['base_error_rate']:.2f}% -> {record['new_error_rate']:.2f}%  "
+                  f"{STATUS_NAMES[record['status']]}", file=sys.stderr)
+    return 0
+
+
+def run_convert(args):
+    engine = SegComparisonEngine(recursive=args.recursive)
+    status = 0
+    for directory in args.directories:
+        converted, skipped, errors = engine.convert_directory(directory, force=args.force)
+        for filename, error in errors:
+            print(f"转换 {os.path.join(directory, filename)} 失败: {error}", file=sys.stderr)
+            status = 1
+        print(f"{directory}: 转换 {len(converted)} 个，已是最新 {len(skipped)} 个，失败 {len(errors)} 个",
+              file=sys.stderr)
+    return status
+
+
+def add_align_arguments(parser):
+    parser.add_argument("--align", action="store_true",
+                        help="对长度不一致的文件计算带状编辑距离，按对齐后的错误率分类（不支持流式比较）")
+    parser.add_argument("--align-band", type=int, default=ALIGN_BAND, help="对齐时允许偏离对角线的最大宽度")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="seg_cli", description="SEG文件比较工具（命令行版）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compare = subparsers.add_parser("compare", help="比较参考目录和预测目录下的.seg文件")
+    compare.add_argument("true_dir", help="参考标签目录")
+    compare.add_argument("pred_dir", help="预测标签目录")
+    compare.add_argument("-o", "--output", help="结果输出文件，默认输出到标准输出")
+    compare.add_argument("-f", "--format", choices=["json", "csv"], default="json", help="输出格式")
+    compare.add_argument("-r", "--recursive", action="store_true", help="递归比较子目录，按相对路径匹配文件")
+    compare.add_argument("-j", "--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    compare.add_argument("--chunksize", type=int, help="每次分发给子进程的文件数")
+    compare.add_argument("--streaming", action="store_true",
+                         help="流式比较，按块读取文件以限制内存占用（只保留部分不匹配位置）")
+    compare.add_argument("--block-size", type=int, default=STREAM_BLOCK_SIZE, help="流式比较每块的标签数")
+    compare.add_argument("--cache", action="store_true", help="复用预测目录下的比较结果缓存，只重新比较变化的文件")
+    compare.add_argument("--cache-verify", action="store_true",
+                         help="缓存同时保存文件内容哈希，只有修改时间变化的文件按哈希判断是否复用（写入缓存时多读一遍文件）")
+    compare.add_argument("--cache-path", help="缓存文件路径（默认为预测目录下的%s）" % CACHE_FILENAME)
+    add_align_arguments(compare)
+    compare.add_argument("--adjacency", action="store_true",
+                         help="读取参考文件旁的.adj面邻接文件，计算边界/内部错误率和邻居容差准确率")
+    compare.add_argument("--adjacency-dir", help="邻接文件所在目录（按相对路径查找，默认与参考文件放在一起）")
+    compare.add_argument("--checkpoint", help="定期把已完成的结果写入该检查点文件（默认为预测目录下的%s）"
+                         % CHECKPOINT_FILENAME)
+    compare.add_argument("--resume", action="store_true", help="从检查点继续上次中断的比较")
+    compare.add_argument("--metrics", action="store_true", help="同时计算混淆矩阵和各类别IoU/精确率/召回率/F1")
+    compare.add_argument("--metrics-output", help="各类别指标CSV输出文件")
+    compare.add_argument("--confusion-output", help="混淆矩阵CSV输出文件")
+    compare.add_argument("--orphans-output", help="只存在于一侧目录的文件列表CSV输出文件")
+    compare.add_argument("--profile", action="store_true", help="记录各阶段耗时、读取字节数和标签数，并输出汇总")
+    compare.add_argument("--profile-output", help="性能记录JSON输出文件（包含每个文件的记录）")
+    compare.add_argument("--cprofile", help="cProfile统计输出文件，可用pstats查看；多进程时子进程写入 <文件>.<进程号>")
+    compare.add_argument("--shard", help="只比较文件名哈希后属于该分片的文件，格式为 i/N（从0开始）；"
+                         "默认的缓存/检查点/不匹配段文件名附加分片编号")
+    compare.add_argument("--results-file", help="同时写出可合并的结果文件，供merge命令合并或在界面中加载")
+    compare.add_argument("--session", help="同时把结果保存为会话文件（.segsession），可在界面中打开")
+    compare.set_defaults(func=run_compare)
+
+    merge = subparsers.add_parser("merge", help="合并各分片（compare --shard --results-file）的结果文件")
+    merge.add_argument("files", nargs="+", help="各分片的结果文件")
+    merge.add_argument("-o", "--output", help="合并后的结果文件（格式相同，可在界面中加载）")
+    merge.add_argument("--csv", help="同时把合并后的逐文件结果输出为CSV")
+    merge.add_argument("--session", help="同时把合并后的结果保存为会话文件（.segsession）")
+    merge.add_argument("--bins", help="错误分类配置文件（JSON，包含edges/labels/colors）")
+    merge.add_argument("--allow-missing", action="store_true", help="缺少分片时仍然合并（只给出警告）")
+    merge.add_argument("--allow-dir-mismatch", action="store_true",
+                       help="各结果文件的参考/预测目录不一致时仍然合并（例如各节点挂载路径不同）")
+    merge.set_defaults(func=run_merge)
+
+    board = subparsers.add_parser("leaderboard", help="参考目录只加载一次，与多个预测目录比较并生成排行榜")
+    board.add_argument("true_dir", help="参考标签目录")
+    board.add_argument("pred_dirs", nargs="+", help="预测标签目录（每个目录对应一个模型）")
+    board.add_argument("-o", "--output", help="排行榜输出文件，默认输出到标准输出")
+    board.add_argument("-f", "--format", choices=["json", "csv"], default="csv", help="输出格式")
+    board.add_argument("--results-dir", help="同时将每个模型的详细结果保存为JSON到该目录")
+    board.add_argument("-r", "--recursive", action="store_true", help="递归比较子目录，按相对路径匹配文件")
+    board.add_argument("-j", "--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    board.add_argument("--chunksize", type=int, help="每次分发给子进程的文件数")
+    board.add_argument("--cache", action="store_true", help="复用各预测目录下的比较结果缓存")
+    board.add_argument("--metrics", action="store_true", help="同时计算平均IoU")
+    add_align_arguments(board)
+    board.add_argument("--bins", help="错误分类配置文件（JSON，包含edges/labels/colors）")
+    board.set_defaults(func=run_leaderboard)
+
+    diff = subparsers.add_parser("diff", help="比较同一参考目录下的两次比较结果，找出变差的文件")
+    diff.add_argument("base", help="基准结果（.segsession会话文件、--results-file结果文件或compare输出的JSON）")
+    diff.add_argument("new", help="新结果，格式同上")
+    diff.add_argument("-o", "--output", help="逐文件差异输出文件（按错误率变化从大到小排列）")
+    diff.add_argument("-f", "--format", choices=["json", "csv"], default="csv", help="输出格式")
+    diff.add_argument("--threshold", type=float, default=0.0, help="错误率变化超过该值（百分点）才算变差/改善")
+    diff.add_argument("--top", type=int, default=20, help="在终端列出的分类变化和变差文件数")
+    diff.add_argument("--bins", help="错误分类配置文件（JSON，包含edges/labels/colors）")
+    diff.set_defaults(func=run_diff)
+
+    convert = subparsers.add_parser("convert", help="将.seg文件转换为可内存映射的.segb二进制文件")
+    convert.add_argument("directories", nargs="+", help="包含.seg文件的目录")
+    convert.add_argument("-r", "--recursive", action="store_true", help="同时转换子目录下的文件")
+    convert.add_argument("--force", action="store_true", help="即使.segb已是最新也重新转换")
+    convert.set_defaults(func=run_convert)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (SegComparisonError, BinningError, ShardError, SessionError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import io
+import bz2
+import gzip
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SEG_SUFFIX = '.seg'
+# 压缩的标签文件按后缀识别；同一目录下同名文件有多种形式时按此顺序优先选用（未压缩的最快）
+COMPRESSED_SUFFIXES = ['.gz', '.zst', '.bz2', '.xz']
+READ_BUFFER_SIZE = 1024 * 1024
+# 读取标签文件失败（文件缺失、编码错误、压缩数据损坏或截断）时的异常，比较时该文件记为失败
+READ_ERRORS = (OSError, ValueError, UnicodeError, EOFError, zlib.error, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def split_seg_name(name):
+    # 返回(配对用的.seg文件名, 压缩后缀)，不是标签文件时返回(None, None)
+    lower = name.lower()
+    if lower.endswith(SEG_SUFFIX):
+        return name, ""
+    for suffix in COMPRESSED_SUFFIXES:
+        if lower.endswith(SEG_SUFFIX + suffix):
+            return name[:-len(suffix)], suffix
+    return None, None
+
+
+def seg_key(relpath):
+    return split_seg_name(relpath)[0] or relpath
+
+
+def compression_rank(suffix):
+    return COMPRESSED_SUFFIXES.index(suffix) + 1 if suffix else 0
+
+
+def open_zstd(path):
+    if zstandard is None:
+        raise ValueError(f"读取.zst文件需要安装zstandard: {path}")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+
+
+OPENERS = {
+    '.gz': lambda path: gzip.open(path, 'rb'),
+    '.bz2': lambda path: bz2.open(path, 'rb'),
+    '.xz': lambda path: lzma.open(path, 'rb'),
+    '.zst': open_zstd
+}
+
+
+def open_seg_text(path, buffering=READ_BUFFER_SIZE):
+    # 以文本方式打开标签文件，压缩文件边读边解压，不生成临时文件
+    suffix = split_seg_name(path)[1]
+    if not suffix:
+        return open(path, 'r', encoding='utf-8', errors='ignore', buffering=buffering)
+    raw = io.BufferedReader(OPENERS[suffix](path), buffer_size=buffering)
+    return io.TextIOWrapper(raw, encoding='utf-8', errors='ignore')
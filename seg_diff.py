@@ -0,0 +1,215 @@
+import csv
+import json
+from array import array
+from collections import Counter
+
+from seg_engine import effective_error_rates, result_column
+from seg_results import ResultStore
+from seg_bins import DEFAULT_BINNING
+from seg_merge import load_results_file, RESULTS_FORMAT
+from seg_session import load_session, SessionError, SESSION_SUFFIX
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 逐文件状态：参考完全匹配的文件出现错误为"新出错"，反之为"已修复"；
+# 其余按错误率变化是否超过阈值分为变差/改善/不变
+DIFF_STATUSES = ['newly_broken', 'regressed', 'unchanged', 'improved', 'fixed']
+STATUS_NAMES = {
+    'newly_broken': "新出错",
+    'regressed': "变差",
+    'unchanged': "不变",
+    'improved': "改善",
+    'fixed': "已修复"
+}
+DIFF_FIELDS = ['filename', 'status', 'base_error_rate', 'new_error_rate', 'delta',
+               'base_mismatches', 'new_mismatches', 'base_category', 'new_category']
+NUMPY_TYPES = {'d': 'float64', 'q': 'int64', 'i': 'int32'}
+# 检查参考路径是否一致时抽查的文件数（拼接全部路径在几十万个文件时要数秒）
+REFERENCE_SAMPLE = 1000
+
+
+def load_run(path):
+    # 会话文件、可合并的结果文件（compare --results-file / merge）或 compare -o 输出的JSON
+    if path.endswith(SESSION_SUFFIX):
+        return load_session(path)[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            content = json.load(f)
+        except ValueError as e:
+            raise SessionError(f"无法读取结果文件 {path}: {e}")
+    if isinstance(content, dict) and content.get('format') == RESULTS_FORMAT:
+        return load_results_file(path)[1]
+    try:
+        return ResultStore(content)
+    except (KeyError, TypeError, ValueError) as e:
+        raise SessionError(f"不是比较结果文件: {path}（{e}）")
+
+
+def to_array(typecode, values):
+    if np is not None and isinstance(values, np.ndarray):
+        result = array(typecode)
+        result.frombytes(values.astype(NUMPY_TYPES[typecode]).tobytes())
+        return result
+    return array(typecode, values)
+
+
+def rows_total(results, rows):
+    # 指定行的(标签总数, 不匹配总数)
+    labels = result_column(results, 'total_labels')
+    mismatches = result_column(results, 'mismatches')
+    return sum(labels[row] for row in rows), sum(mismatches[row] for row in rows)
+
+
+class ResultsDiff:
+    # 同一参考目录下两次比较结果（base为基准，new为新结果）按文件名连接后的逐文件差异，按列存放
+    def __init__(self, base, new, binning=None, threshold=0.0):
+        self.binning = binning or DEFAULT_BINNING
+        self.threshold = threshold
+        base_rates, base_mismatches, base_length = effective_error_rates(base)
+        new_rates, new_mismatches, new_length = effective_error_rates(new)
+        base_codes = self.binning.assign(base_rates, base_length)
+        new_codes = self.binning.assign(new_rates, new_length)
+
+        # 用新结果的文件名索引查找基准结果中每个文件的行号
+        base_names = list(base)
+        new_rows = new.rows(base_names)
+
+        if np is not None:
+            new_rows = np.asarray(new_rows, dtype=np.int64)
+            matched = np.flatnonzero(new_rows >= 0)
+            other = new_rows[matched]
+            base_rate = np.asarray(base_rates, dtype=np.float64)[matched]
+            new_rate = np.asarray(new_rates, dtype=np.float64)[other]
+            delta = new_rate - base_rate
+            base_perfect = (base_rate == 0) & ~np.asarray(base_length, dtype=bool)[matched]
+            new_perfect = (new_rate == 0) & ~np.asarray(new_length, dtype=bool)[other]
+            status = np.full(len(matched), DIFF_STATUSES.index('unchanged'))
+            status[delta > threshold] = DIFF_STATUSES.index('regressed')
+            status[delta < -threshold] = DIFF_STATUSES.index('improved')
+            status[base_perfect & ~new_perfect] = DIFF_STATUSES.index('newly_broken')
+            status[~base_perfect & new_perfect] = DIFF_STATUSES.index('fixed')
+            self.base_mismatches = to_array('q', np.asarray(base_mismatches)[matched])
+            self.new_mismatches = to_array('q', np.asarray(new_mismatches)[other])
+            self.base_category = to_array('i', np.asarray(base_codes)[matched])
+            self.new_category = to_array('i', np.asarray(new_codes)[other])
+            missing = np.flatnonzero(new_rows < 0).tolist()
+            matched = matched.tolist()
+            other = other.tolist()
+        else:
+            missing = [row for row, other in enumerate(new_rows) if other < 0]
+            matched = [row for row, other in enumerate(new_rows) if other >= 0]
+            other = [new_rows[row] for row in matched]
+            base_rate = [base_rates[row] for row in matched]
+            new_rate = [new_rates[row] for row in other]
+            delta = [b - a for a, b in zip(base_rate, new_rate)]
+            status = []
+            for k, (row, new_row) in enumerate(zip(matched, other)):
+                base_perfect = base_rate[k] == 0 and not base_length[row]
+                new_perfect = new_rate[k] == 0 and not new_length[new_row]
+                if base_perfect and not new_perfect:
+                    name = 'newly_broken'
+                elif new_perfect and not base_perfect:
+                    name = 'fixed'
+                elif delta[k] > threshold:
+                    name = 'regressed'
+                elif delta[k] < -threshold:
+                    name = 'improved'
+                else:
+                    name = 'unchanged'
+                status.append(DIFF_STATUSES.index(name))
+            self.base_mismatches = array('q', [base_mismatches[row] for row in matched])
+            self.new_mismatches = array('q', [new_mismatches[row] for row in other])
+            self.base_category = array('i', [base_codes[row] for row in matched])
+            self.new_category = array('i', [new_codes[row] for row in other])
+
+        self.names = [base_names[row] for row in matched]
+        self.base_error_rate = to_array('d', base_rate)
+        self.new_error_rate = to_array('d', new_rate)
+        self.delta = to_array('d', delta)
+        self.status = to_array('i', status)
+        new_names = list(new)
+        self.base_only = [base_names[row] for row in missing]
+        matched_new = set(other)
+        self.new_only = [new_names[row] for row in range(len(new_names)) if row not in matched_new]
+        # 抽查的共同文件中参考文件路径不同的个数，不为0时两次结果可能不是针对同一参考目录
+        step = max(1, len(self.names) // REFERENCE_SAMPLE)
+        self.reference_changed = sum(base[name]['true_path'] != new[name]['true_path']
+                                     for name in self.names[::step])
+        # 总体错误率只统计共同文件，两侧各自独有的文件不影响对比
+        self.base_total = rows_total(base, matched)
+        self.new_total = rows_total(new, other)
+
+    def __len__(self):
+        return len(self.names)
+
+    def column(self, key):
+        # 分类和状态列为序号
+        return self.names if key == 'filename' else getattr(self, key)
+
+    def status_name(self, row):
+        return DIFF_STATUSES[self.status[row]]
+
+    def category(self, code):
+        return self.binning.names()[code]
+
+    def record(self, row):
+        return {
+            'filename': self.names[row],
+            'status': self.status_name(row),
+            'base_error_rate': self.base_error_rate[row],
+            'new_error_rate': self.new_error_rate[row],
+            'delta': self.delta[row],
+            'base_mismatches': self.base_mismatches[row],
+            'new_mismatches': self.new_mismatches[row],
+            'base_category': self.category(self.base_category[row]),
+            'new_category': self.category(self.new_category[row])
+        }
+
+    def sorted_rows(self):
+        # 变差最多的文件在前
+        return sorted(range(len(self.names)), key=self.delta.__getitem__, reverse=True)
+
+    def status_counts(self):
+        counts = Counter(self.status)
+        return {name: counts.get(code, 0) for code, name in enumerate(DIFF_STATUSES)}
+
+    def category_changes(self):
+        # [(原分类, 新分类, 文件数)]，按文件数从多到少
+        changes = Counter((a, b) for a, b in zip(self.base_category, self.new_category) if a != b)
+        return [(self.category(a), self.category(b), count) for (a, b), count in changes.most_common()]
+
+    def summary(self):
+        base_labels, base_mismatches = self.base_total
+        new_labels, new_mismatches = self.new_total
+        base_rate = base_mismatches / base_labels * 100 if base_labels else 0
+        new_rate = new_mismatches / new_labels * 100 if new_labels else 0
+        return dict(self.status_counts(),
+                    files=len(self.names),
+                    base_only=len(self.base_only),
+                    new_only=len(self.new_only),
+                    reference_changed=self.reference_changed,
+                    base_error_rate=base_rate,
+                    new_error_rate=new_rate,
+                    delta=new_rate - base_rate,
+                    mean_delta=sum(self.delta) / len(self.delta) if len(self.delta) else 0,
+                    category_changes=sum(count for _, _, count in self.category_changes()))
+
+    def save_csv(self, fp, rows=None):
+        writer = csv.writer(fp)
+        writer.writerow(DIFF_FIELDS)
+        for row in (self.sorted_rows() if rows is None else rows):
+            record = self.record(row)
+            writer.writerow([record[field] for field in DIFF_FIELDS])
+
+    def save_json(self, fp):
+        json.dump({
+            'summary': self.summary(),
+            'category_changes': [{'from': a, 'to': b, 'count': count} for a, b, count in self.category_changes()],
+            'base_only': self.base_only,
+            'new_only': self.new_only,
+            'files': [self.record(row) for row in self.sorted_rows()]
+        }, fp, ensure_ascii=False, indent=2)
@@ -0,0 +1,782 @@
+import os
+import csv
+import json
+import time
+import cProfile
+import threading
+from array import array
+from operator import ne
+from itertools import islice, compress, count
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from seg_cache import ResultCache, CACHE_FILENAME
+from seg_results import ResultStore, RESULT_FIELDS
+from seg_metrics import ConfusionMatrix
+from seg_binary import fresh_binary_sibling, load_binary_labels, convert_seg_file
+from seg_reference import ReferenceIndex
+from seg_scan import PairScanner, scan_seg_files, join_relpath
+from seg_compress import open_seg_text, seg_key, READ_ERRORS
+from seg_checkpoint import Checkpoint, CHECKPOINT_FILENAME
+from seg_spans import SpanStore, SPANS_FILENAME, STORE_ERRORS, compute_spans, extend_spans
+from seg_align import aligned_distance, ALIGN_BAND
+from seg_bins import DEFAULT_BINNING
+from seg_adjacency import load_adjacency, adjacency_sidecar, adjacency_metrics, adjacency_signature
+from seg_vocab import LabelVocabulary
+from seg_profile import RunProfile, StageTimer, timed, file_size
+from seg_shard import shard_path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+STREAM_BLOCK_SIZE = 65536
+STREAM_INDEX_LIMIT = 1000
+# 边扫描边比较时文件总数未知，每次分发给子进程的文件数
+SCAN_CHUNKSIZE = 16
+# 进度和部分结果回调的最小间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+
+def numpy_codes(labels):
+    # 参考标签编码拼接为一个连续数组共享，需要NumPy
+    return labels if np is not None and isinstance(labels, np.ndarray) else None
+
+
+CATEGORY_NAMES = DEFAULT_BINNING.names()
+
+
+class SegComparisonError(Exception):
+    pass
+
+
+class SegComparisonCancelled(SegComparisonError):
+    def __init__(self, results):
+        super().__init__("比较已取消")
+        # 取消前已完成的部分结果
+        self.results = results
+
+
+# 子进程中的引擎和共享的参考标签，由进程池初始化函数设置，每个批次只传任务列表
+_worker_engine = None
+_worker_reference = None
+# 子进程中的cProfile分析器，启用cProfile输出时按需创建
+_worker_profiler = None
+
+
+def _init_worker(engine, reference):
+    global _worker_engine, _worker_reference
+    _worker_engine = engine
+    _worker_reference = reference
+
+
+def _compare_batch(tasks):
+    return _worker_engine.compare_batch(tasks)
+
+
+class SegComparisonEngine:
+    def __init__(self, progress_callback=None, file_callback=None, workers=1, chunksize=None,
+                 streaming=False, block_size=STREAM_BLOCK_SIZE, index_limit=STREAM_INDEX_LIMIT,
+                 cache=False, cache_path=None, metrics=False, use_binary=True, recursive=False,
+                 results_callback=None, progress_interval=PROGRESS_INTERVAL,
+                 checkpoint=False, checkpoint_path=None, resume=False, spans=False, spans_path=None,
+                 align=False, align_band=ALIGN_BAND, profile=False, cprofile_path=None,
+                 adjacency=False, adjacency_dir=None, shard=None, cache_verify=False):
+        self.progress_callback = progress_callback
+        self.file_callback = file_callback
+        # 回调按时间节流：每个间隔内最多通知一次，期间完成的结果以
+        # [(文件名, 结果), ...] 批量传给results_callback
+        self.results_callback = results_callback
+        self.progress_interval = progress_interval
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunksize = chunksize
+        # 流式模式下两个文件按块同步读取，内存占用与文件大小无关；
+        # 只保留前index_limit个不匹配位置
+        self.streaming = streaming
+        self.block_size = block_size
+        self.index_limit = index_limit
+        # 结果缓存默认保存在预测目录下，未变化的文件对直接复用上次结果
+        self.cache = cache
+        self.cache_path = cache_path
+        # 缓存同时保存内容哈希，文件只有修改时间变化时按哈希判断是否仍可复用
+        self.cache_verify = cache_verify
+        # 在比较的同时累计混淆矩阵，用于计算各类别IoU/F1
+        self.metrics = metrics
+        # 存在比.seg更新的.segb二进制文件时直接内存映射加载（需要NumPy）
+        self.use_binary = use_binary and np is not None
+        # 多预测目录模式下预加载的参考标签
+        self.reference = None
+        # 读取时把标签字符串映射为整数编码，比较、统计都在编码上进行；
+        # 随引擎传给子进程，子进程在其基础上继续添加新标签
+        self.vocabulary = LabelVocabulary()
+        # 递归扫描子目录，按相对路径匹配文件
+        self.recursive = recursive
+        # 比较过程中定期把已完成的结果写入检查点（默认在预测目录下），
+        # 中断后resume=True时跳过检查点中已完成且文件未变化的文件对
+        self.checkpoint = checkpoint or resume or bool(checkpoint_path)
+        self.checkpoint_path = checkpoint_path
+        self.resume = resume
+        # 把不匹配段(起点, 长度, 参考标签, 预测标签)写入SQLite文件（默认在预测目录下），
+        # 供差异查看器分页读取
+        self.spans = spans or bool(spans_path)
+        self.spans_path = spans_path
+        # 长度不一致的文件额外计算带状编辑距离，得到对齐后的错误率（流式模式不支持）
+        self.align = align
+        self.align_band = align_band
+        # 按参考文件旁的.adj邻接文件（或adjacency_dir下同一相对路径）计算边界/内部错误率
+        # 和邻居容差准确率；邻接图以CSR格式缓存为.adjb（流式模式不支持）
+        self.adjacency = adjacency or bool(adjacency_dir)
+        self.adjacency_dir = adjacency_dir
+        # 记录各阶段及每个文件的耗时、读取字节数和标签数，结果中的profile为RunProfile
+        self.profile = profile
+        # cProfile统计输出文件；多进程时各子进程另外写入 <路径>.<进程号>
+        self.cprofile_path = cprofile_path
+        # 分片(i, N)：多台机器各自比较文件名哈希后属于自己的部分，结果文件再合并
+        self.shard = shard
+        # 检查点等辅助文件写入失败时记录的说明；写入失败不影响比较本身
+        self.warnings = []
+        # 取消/暂停控制：在分发下一个文件对之前检查
+        self.cancel_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+
+    def __getstate__(self):
+        # 回调函数（例如Qt信号）无法传给子进程
+        state = self.__dict__.copy()
+        state['progress_callback'] = None
+        state['file_callback'] = None
+        state['results_callback'] = None
+        state['cancel_event'] = None
+        state['resume_event'] = None
+        state['reference'] = None
+        return state
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.resume_event.set()
+
+    def pause(self):
+        self.resume_event.clear()
+
+    def unpause(self):
+        self.resume_event.set()
+
+    def is_paused(self):
+        return not self.resume_event.is_set()
+
+    def get_seg_files(self, directory):
+        return set(self.seg_files(directory))
+
+    def seg_files(self, directory):
+        # {配对用的文件名: 实际相对路径}，压缩文件以去掉压缩后缀的文件名配对
+        return {seg_key(relpath): relpath for relpath in scan_seg_files(directory, self.recursive)}
+
+    def label_source(self, filepath):
+        if self.use_binary:
+            binary_path = fresh_binary_sibling(filepath)
+            if binary_path:
+                return binary_path
+        return filepath
+
+    def read_labels(self, filepath):
+        # 返回标签编码（NumPy数组或array('H')）
+        source = self.label_source(filepath)
+        if source != filepath:
+            return self.vocabulary.encode_values(load_binary_labels(source))
+        with open_seg_text(filepath) as f:
+            return self.vocabulary.parse(f)
+
+    def timed_read(self, timer, stage, filepath):
+        if timer is None:
+            return self.read_labels(filepath)
+        with timer.stage(stage, file_size(self.label_source(filepath))) as record:
+            labels = self.read_labels(filepath)
+            record['labels'] += len(labels)
+        return labels
+
+    def read_text_labels(self, filepath):
+        with open_seg_text(filepath) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def iter_labels(self, filepath):
+        with open_seg_text(filepath) as f:
+            yield from filter(None, map(str.strip, f))
+
+    def compare_streaming(self, true_path, pred_path, confusion=None, spans=None):
+        true_iter = self.iter_labels(true_path)
+        pred_iter = self.iter_labels(pred_path)
+        mismatch_indices = array('i')
+        mismatch_count = 0
+        true_count = pred_count = 0
+
+        while True:
+            true_block = list(islice(true_iter, self.block_size))
+            pred_block = list(islice(pred_iter, self.block_size))
+            true_block, pred_block = self.encode_labels(true_block, pred_block)
+            block_mismatches, _ = self.compare_labels(true_block, pred_block)
+            if confusion is not None:
+                confusion.update(true_block, pred_block, self.vocabulary.labels)
+            # 不匹配段与不匹配位置一样最多收集index_limit段，超出后停止收集
+            if spans is not None and len(spans) <= self.index_limit:
+                extend_spans(spans, compute_spans(true_block, pred_block, true_count, self.vocabulary.labels))
+                del spans[self.index_limit + 1:]
+            mismatch_count += len(block_mismatches)
+            room = self.index_limit - len(mismatch_indices)
+            if room > 0:
+                mismatch_indices.extend(true_count + int(i) for i in block_mismatches[:room])
+            true_count += len(true_block)
+            pred_count += len(pred_block)
+
+            if len(true_block) < self.block_size or len(pred_block) < self.block_size:
+                break
+
+        # 较短的文件已读完，剩余部分只计数
+        true_count += sum(1 for _ in true_iter)
+        pred_count += sum(1 for _ in pred_iter)
+
+        return true_count, mismatch_count, mismatch_indices, abs(true_count - pred_count)
+
+    def encode_labels(self, true_labels, pred_labels):
+        # 已是编码的直接返回，字符串序列通过同一个词表编码
+        return self.vocabulary.encode(true_labels), self.vocabulary.encode(pred_labels)
+
+    def compare_labels(self, true_labels, pred_labels):
+        true_labels, pred_labels = self.encode_labels(true_labels, pred_labels)
+        if np is not None and isinstance(true_labels, np.ndarray):
+            return self.compare_label_arrays(true_labels, pred_labels)
+
+        mismatches = list(compress(count(), map(ne, true_labels, pred_labels)))
+
+        length_diff = len(true_labels) - len(pred_labels)
+        return mismatches, abs(length_diff)
+
+    def compare_label_arrays(self, true_codes, pred_codes):
+        min_len = min(len(true_codes), len(pred_codes))
+        mismatches = np.flatnonzero(true_codes[:min_len] != pred_codes[:min_len]).astype(np.int32)
+        return mismatches, abs(len(true_codes) - len(pred_codes))
+
+    def convert_directory(self, directory, force=False):
+        converted = []
+        skipped = []
+        errors = []
+        for filename, relpath in sorted(self.seg_files(directory).items()):
+            try:
+                if convert_seg_file(join_relpath(directory, relpath), self.read_text_labels, force):
+                    converted.append(filename)
+                else:
+                    skipped.append(filename)
+            except Exception as e:
+                errors.append((filename, str(e)))
+        return converted, skipped, errors
+
+    def compare_seg_directories(self, true_dir, pred_dir):
+        # 目录扫描与比较同时进行，扫描到的文件对直接送入比较
+        pairs = PairScanner(true_dir, pred_dir, self.recursive, self.shard)
+        cache_path = (self.cache_path or self.default_path(pred_dir, CACHE_FILENAME)) if self.cache else None
+        checkpoint = None
+        if self.checkpoint:
+            checkpoint = Checkpoint(self.checkpoint_path or self.default_path(pred_dir, CHECKPOINT_FILENAME),
+                                    true_dir, pred_dir, self.cache_options())
+        spans_path = (self.spans_path or self.default_path(pred_dir, SPANS_FILENAME)) if self.spans else None
+        results = self.compare_pairs(pairs, cache_path, checkpoint, spans_path)
+        if results.profile is not None and pairs.seconds is not None:
+            results.profile.add('scan', pairs.seconds)
+        # 正常完成后不再需要检查点；取消或出错时保留，供下次继续
+        if checkpoint:
+            checkpoint.remove()
+        # 分片较多时个别分片可能没有文件，不算错误
+        if not pairs.matched and not pairs.skipped:
+            raise SegComparisonError("两个目录下没有相同名称的.seg文件")
+        results.orphans = pairs.orphans()
+        return results
+
+    def default_path(self, pred_dir, filename):
+        return shard_path(os.path.join(pred_dir, filename), self.shard)
+
+    def compare_multi(self, true_dir, pred_dirs):
+        true_files = self.seg_files(true_dir)
+        pred_files = {pred_dir: self.seg_files(pred_dir) for pred_dir in pred_dirs}
+        needed = sorted(true_files.keys() & set().union(*pred_files.values()))
+        if not needed:
+            raise SegComparisonError("参考目录与各预测目录下没有相同名称的.seg文件")
+
+        # 参考标签只读取一次，所有预测目录共用
+        self.reference = ReferenceIndex.load(self.read_labels, numpy_codes,
+                                             [(filename, join_relpath(true_dir, true_files[filename])) for filename in needed])
+        if self.workers > 1:
+            self.reference.share()
+
+        progress_callback = self.progress_callback
+        results = {}
+        try:
+            for k, pred_dir in enumerate(pred_dirs):
+                if progress_callback:
+                    self.progress_callback = lambda value, k=k: progress_callback(
+                        int((k * 100 + value) / len(pred_dirs)))
+                try:
+                    results[pred_dir] = self.compare_seg_directories(true_dir, pred_dir)
+                except SegComparisonCancelled:
+                    raise
+                except SegComparisonError:
+                    results[pred_dir] = ResultStore()
+        finally:
+            self.progress_callback = progress_callback
+            self.reference.close()
+            self.reference = None
+        return results
+
+    def compare_file(self, filename, true_path, pred_path):
+        confusion = ConfusionMatrix() if self.metrics else None
+        spans = [] if self.spans else None
+        timer = StageTimer() if self.profile else None
+        aligned = None
+        adjacency_data = None
+        if self.streaming:
+            bytes_read = file_size(true_path) + file_size(pred_path) if timer else 0
+            with timed(timer, 'compare_streaming', bytes_read) as record:
+                try:
+                    total_labels, mismatch_count, mismatches, length_diff = self.compare_streaming(
+                        true_path, pred_path, confusion, spans)
+                except READ_ERRORS:
+                    return filename, None
+                record['labels'] += total_labels
+            if spans is not None and len(spans) > self.index_limit:
+                # 不完整的不匹配段不保存，查看时再按需完整计算
+                spans = None
+        else:
+            # 只有读取失败（文件缺失、损坏、编码错误）的文件记为失败，其余异常照常抛出
+            try:
+                reference = self.reference if self.reference is not None else _worker_reference
+                true_labels = reference.get(filename) if reference is not None else None
+                if true_labels is None:
+                    true_labels = self.timed_read(timer, 'read_true', true_path)
+                pred_labels = self.timed_read(timer, 'read_pred', pred_path)
+            except READ_ERRORS:
+                return filename, None
+            with timed(timer, 'compare_labels') as record:
+                true_labels, pred_labels = self.encode_labels(true_labels, pred_labels)
+                mismatches, length_diff = self.compare_labels(true_labels, pred_labels)
+                record['labels'] += len(true_labels)
+            if confusion is not None:
+                with timed(timer, 'metrics'):
+                    confusion.update(true_labels, pred_labels, self.vocabulary.labels)
+            if spans is not None:
+                with timed(timer, 'spans'):
+                    spans = compute_spans(true_labels, pred_labels, labels=self.vocabulary.labels)
+            total_labels = len(true_labels)
+            mismatch_count = len(mismatches)
+            if self.align and length_diff > 0:
+                with timed(timer, 'align'):
+                    aligned = aligned_distance(true_labels, pred_labels, self.align_band)
+                # 以较长一侧的标签数归一化，错误率不超过100%
+                aligned_rate = aligned / max(len(true_labels), len(pred_labels)) * 100
+            if self.adjacency:
+                with timed(timer, 'adjacency'):
+                    adjacency_data = self.adjacency_metrics(filename, true_path, true_labels, pred_labels)
+
+        error_rate = (mismatch_count / total_labels) * 100 if total_labels > 0 else 0
+
+        data = {
+            'total_labels': total_labels,
+            'mismatches': mismatch_count,
+            'length_diff': length_diff,
+            'error_rate': error_rate,
+            'mismatch_indices': mismatches,
+            'true_path': true_path,
+            'pred_path': pred_path,
+            'true_filename': os.path.basename(true_path),
+            'pred_filename': os.path.basename(pred_path)
+        }
+        if confusion is not None:
+            data['confusion'] = confusion.to_list()
+            data['mean_iou'] = confusion.mean_iou()
+        if spans is not None:
+            data['spans'] = spans
+        if aligned is not None:
+            data['aligned_mismatches'] = aligned
+            data['aligned_error_rate'] = aligned_rate
+        if adjacency_data is not None:
+            data.update(adjacency_data)
+        if timer is not None:
+            data['timing'] = timer.file_record(total_labels)
+        return filename, data
+
+    def adjacency_metrics(self, filename, true_path, true_labels, pred_labels):
+        # 邻接文件缺失或损坏时不影响标签比较，只是该文件没有邻接指标
+        try:
+            adjacency = load_adjacency(adjacency_sidecar(true_path, filename, self.adjacency_dir))
+        except (OSError, ValueError):
+            return None
+        if adjacency is None:
+            return None
+        return adjacency_metrics(adjacency, true_labels, pred_labels)
+
+    def cache_sidecar(self, filename, true_path):
+        # 邻接指标随邻接文件变化，其签名随缓存条目一起校验
+        if not self.adjacency or self.streaming:
+            return None
+        return adjacency_signature(adjacency_sidecar(true_path, filename, self.adjacency_dir))
+
+    def file_spans(self, true_path, pred_path):
+        # 差异查看器在缺少不匹配段记录时按需计算
+        return compute_spans(self.read_labels(true_path), self.read_labels(pred_path),
+                             labels=self.vocabulary.labels)
+
+    def cache_options(self):
+        options = f"stream:{self.index_limit}" if self.streaming else "full"
+        if self.metrics:
+            options += "+metrics"
+        if self.align and not self.streaming:
+            options += f"+align:{self.align_band}"
+        if self.adjacency and not self.streaming:
+            options += f"+adjacency:{os.path.abspath(self.adjacency_dir) if self.adjacency_dir else ''}"
+        return options
+
+    def compare_pairs(self, tasks, cache_path=None, checkpoint=None, spans_path=None):
+        results = ResultStore()
+        results.confusion = ConfusionMatrix() if self.metrics else None
+        profile = results.profile = RunProfile() if self.profile else None
+        done = 0
+        batch = []
+        last_report = 0.0
+
+        def write_checkpoint(method, *args):
+            # 检查点写入失败（目录只读、磁盘已满等）时放弃检查点，继续比较
+            nonlocal checkpoint
+            try:
+                method(*args)
+            except OSError as e:
+                self.warnings.append(f"无法写入检查点 {checkpoint.path}，本次比较不再保存检查点: {e}")
+                checkpoint.discard()
+                checkpoint = None
+
+        def write_spans(method, *args):
+            # 不匹配段写入失败时同样只是不再保存，查看时按需计算
+            nonlocal span_store
+            try:
+                method(*args)
+            except STORE_ERRORS as e:
+                self.warnings.append(f"无法写入不匹配段文件 {spans_path}，本次比较不再保存不匹配段: {e}")
+                span_store.discard()
+                span_store = None
+
+        def report(filename, data=None, force=False):
+            nonlocal batch, last_report
+            if data is not None and self.results_callback:
+                batch.append((filename, data))
+            now = time.monotonic()
+            if not force and now - last_report < self.progress_interval:
+                return
+            last_report = now
+
+            with timed(profile, 'callbacks'):
+                if self.file_callback and filename:
+                    self.file_callback(filename)
+                # 目录仍在扫描时总数未知，扫描结束后再更新进度
+                total_files = len(tasks) if isinstance(tasks, list) else tasks.total
+                if self.progress_callback and total_files:
+                    self.progress_callback(int(done / total_files * 100))
+                if batch:
+                    self.results_callback(batch)
+                    batch = []
+
+        def finish(filename, data, source="compare"):
+            nonlocal done
+            if data is not None:
+                spans = data.pop('spans', None)
+                timing = data.pop('timing', None)
+                if profile is not None and timing is not None:
+                    profile.add_file(filename, timing)
+                if span_store and spans is not None:
+                    with timed(profile, 'write_spans'):
+                        write_spans(span_store.put, filename, data['true_path'], data['pred_path'], spans)
+                if cache and source == "compare":
+                    with timed(profile, 'write_cache'):
+                        cache.put(filename, data, self.cache_sidecar(filename, data['true_path']))
+                if checkpoint and source != "checkpoint":
+                    with timed(profile, 'write_checkpoint'):
+                        write_checkpoint(checkpoint.add, filename, data)
+                with timed(profile, 'add_result'):
+                    self.add_result(results, filename, data)
+            else:
+                results.failed.append(filename)
+            done += 1
+            report(filename, data)
+
+        def scheduled(tasks):
+            for task in tasks:
+                if not self.resume_event.is_set():
+                    # 暂停期间检查点先写盘，随时可以安全退出
+                    if checkpoint:
+                        write_checkpoint(checkpoint.flush, True)
+                    self.resume_event.wait()
+                if self.cancel_event.is_set():
+                    return
+
+                entry = saved.pop(task[0], None)
+                if entry is not None:
+                    with timed(profile, 'checkpoint_restore'):
+                        data = restore(entry, task[1], task[2])
+                    if data is not None:
+                        finish(task[0], data, "checkpoint")
+                        continue
+                if cache:
+                    with timed(profile, 'cache_lookup'):
+                        data = cache.get(*task, self.cache_sidecar(task[0], task[1]))
+                    if data is not None:
+                        finish(task[0], data, "cache")
+                        continue
+                yield task
+
+        saved = {}
+        restore = checkpoint.restore if checkpoint else None
+        cache = ResultCache(cache_path, self.cache_options(), self.cache_verify) if cache_path else None
+        span_store = None
+        if spans_path:
+            try:
+                span_store = SpanStore(spans_path)
+            except STORE_ERRORS as e:
+                self.warnings.append(f"无法写入不匹配段文件 {spans_path}，本次比较不再保存不匹配段: {e}")
+        profiler = cProfile.Profile() if self.cprofile_path else None
+        if profiler:
+            profiler.enable()
+        try:
+            if checkpoint:
+                saved = checkpoint.load() if self.resume else {}
+                write_checkpoint(checkpoint.open, saved.items())
+            filename = None
+            for filename, data in self.iter_compare(scheduled(tasks)):
+                finish(filename, data)
+            report(filename, force=True)
+        finally:
+            if cache:
+                cache.close()
+            if checkpoint:
+                write_checkpoint(checkpoint.close)
+            if span_store:
+                write_spans(span_store.close)
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(self.cprofile_path)
+            if profile is not None:
+                profile.finish()
+
+        # 不匹配段文件写入失败时不记录路径，查看时改用临时目录
+        results.spans_path = spans_path if span_store is not None else None
+        # 结果按完成顺序写入，恢复为按文件名排序的顺序
+        results.reorder(sorted(results))
+        if self.cancel_event.is_set():
+            raise SegComparisonCancelled(results)
+        return results
+
+    def add_result(self, results, filename, data):
+        # 单个文件的混淆矩阵只用于汇总，不随结果保存
+        confusion = data.pop('confusion', None)
+        if confusion is not None and results.confusion is not None:
+            results.confusion.merge(ConfusionMatrix.from_list(confusion))
+        results[filename] = data
+
+    def compare_batch(self, tasks):
+        global _worker_profiler
+        if not self.cprofile_path:
+            return [self.compare_file(*task) for task in tasks]
+        # 子进程内累计各批次的统计，每批结束后覆盖写出
+        if _worker_profiler is None:
+            _worker_profiler = cProfile.Profile()
+        _worker_profiler.enable()
+        try:
+            return [self.compare_file(*task) for task in tasks]
+        finally:
+            _worker_profiler.disable()
+            _worker_profiler.dump_stats(f"{self.cprofile_path}.{os.getpid()}")
+
+    def iter_compare(self, tasks):
+        if self.workers <= 1 or (isinstance(tasks, list) and len(tasks) < 2):
+            for task in tasks:
+                yield self.compare_file(*task)
+            return
+
+        if isinstance(tasks, list):
+            chunksize = self.chunksize or max(1, len(tasks) // (self.workers * 8))
+        else:
+            chunksize = self.chunksize or SCAN_CHUNKSIZE
+        tasks = iter(tasks)
+        batch = list(islice(tasks, chunksize))
+        if not batch:
+            return
+
+        # 按需取出任务分批提交，同时在途的批次数有上限，任务可以来自仍在进行的目录扫描
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self, self.reference)) as executor:
+            running = set()
+            while batch or running:
+                while batch and len(running) < self.workers * 2:
+                    running.add(executor.submit(_compare_batch, batch))
+                    batch = list(islice(tasks, chunksize))
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield from future.result()
+
+
+def _json_default(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return list(value)
+
+
+def save_results_json(results, fp):
+    json.dump({filename: dict(data) for filename, data in results.items()}, fp,
+              ensure_ascii=False, indent=2, default=_json_default)
+
+
+def save_results_csv(results, fp):
+    # 对齐、邻接等字段只出现在部分文件中，按首次出现的顺序合并所有行的字段
+    extra_fields = {}
+    for data in results.values():
+        for key in data:
+            if key not in RESULT_FIELDS:
+                extra_fields.setdefault(key)
+    extra_fields = list(extra_fields)
+
+    writer = csv.writer(fp)
+    writer.writerow(['filename'] + RESULT_FIELDS + extra_fields)
+    for filename, data in results.items():
+        row = [filename]
+        for field in RESULT_FIELDS:
+            value = data[field]
+            if field == 'mismatch_indices':
+                value = ' '.join(str(i) for i in value)
+            row.append(value)
+        row.extend(data.get(field, '') for field in extra_fields)
+        writer.writerow(row)
+
+
+def save_orphans_csv(orphans, fp):
+    writer = csv.writer(fp)
+    writer.writerow(['side', 'filename'])
+    for side in ('true_only', 'pred_only'):
+        for filename in orphans[side]:
+            writer.writerow([side, filename])
+
+
+def results_summary(results):
+    total_labels = sum(result_column(results, 'total_labels'))
+    total_mismatches = sum(result_column(results, 'mismatches'))
+    return {
+        'files': len(results),
+        'total_labels': total_labels,
+        'total_mismatches': total_mismatches,
+        'total_length_diff': sum(result_column(results, 'length_diff')),
+        'error_rate': total_mismatches / total_labels * 100 if total_labels > 0 else 0
+    }
+
+
+def leaderboard(results_by_model, binning=None):
+    binning = binning or DEFAULT_BINNING
+    rows = []
+    for model, results in results_by_model.items():
+        total_labels = sum(data['total_labels'] for data in results.values())
+        total_mismatches = sum(data['mismatches'] for data in results.values())
+        categories = categorize_results(results, binning)
+        confusion = getattr(results, 'confusion', None)
+        row = {
+            'model': model,
+            'files': len(results),
+            'total_labels': total_labels,
+            'mismatches': total_mismatches,
+            'error_rate': total_mismatches / total_labels * 100 if total_labels > 0 else 0,
+            'mean_file_error_rate': (sum(data['error_rate'] for data in results.values()) / len(results)
+                                     if results else 0),
+            'mean_iou': confusion.mean_iou() if confusion else None
+        }
+        for name in binning.names():
+            row[name] = categories[name]["count"]
+        rows.append(row)
+    rows.sort(key=lambda row: (row['files'] == 0, row['error_rate']))
+    return rows
+
+
+def save_leaderboard_csv(rows, fp, binning=None):
+    fields = ['rank', 'model', 'files', 'total_labels', 'mismatches', 'error_rate',
+              'mean_file_error_rate', 'mean_iou'] + (binning or DEFAULT_BINNING).names()
+    writer = csv.writer(fp)
+    writer.writerow(fields)
+    for rank, row in enumerate(rows, 1):
+        writer.writerow([rank] + [row[field] if row[field] is not None else '' for field in fields[1:]])
+
+
+def result_column(results, key, default=KeyError):
+    if isinstance(results, ResultStore):
+        return results.column(key, default)
+    if default is KeyError:
+        return [data[key] for data in results.values()]
+    return [data.get(key, default) for data in results.values()]
+
+
+def effective_error_rates(results):
+    # 对齐模式下长度不一致的文件使用对齐后的错误率，其余长度不一致的文件单独归类
+    error_rates = result_column(results, 'error_rate')
+    mismatches = result_column(results, 'mismatches')
+    length_diff = result_column(results, 'length_diff')
+    aligned_rates = result_column(results, 'aligned_error_rate', None)
+    aligned_mismatches = result_column(results, 'aligned_mismatches', None)
+
+    if np is not None:
+        error_rates = np.array(error_rates, dtype=np.float64)
+        mismatches = np.array(mismatches, dtype=np.int64)
+        length_mismatch = np.asarray(length_diff) > 0
+        aligned = np.array([rate is not None for rate in aligned_rates], dtype=bool) & length_mismatch
+        if aligned.any():
+            rows = np.flatnonzero(aligned)
+            error_rates[rows] = [aligned_rates[row] for row in rows]
+            mismatches[rows] = [aligned_mismatches[row] for row in rows]
+        return error_rates, mismatches, length_mismatch & ~aligned
+
+    error_rates = list(error_rates)
+    mismatches = list(mismatches)
+    length_mismatch = []
+    for row, diff in enumerate(length_diff):
+        aligned = diff > 0 and aligned_rates[row] is not None
+        if aligned:
+            error_rates[row] = aligned_rates[row]
+            mismatches[row] = aligned_mismatches[row]
+        length_mismatch.append(diff > 0 and not aligned)
+    return error_rates, mismatches, length_mismatch
+
+
+def categorize_results(results, binning=None):
+    # 按错误率列一次性分箱，改变分箱方案后无需重新比较
+    binning = binning or DEFAULT_BINNING
+    names = binning.names()
+    categories = {name: {"count": 0, "total_labels": 0, "total_mismatches": 0, "files": []}
+                  for name in names}
+    if not results:
+        return categories
+
+    filenames = list(results)
+    error_rates, mismatches, length_mismatch = effective_error_rates(results)
+    codes = binning.assign(error_rates, length_mismatch)
+    total_labels = result_column(results, 'total_labels')
+
+    if np is not None:
+        counts = np.bincount(codes, minlength=len(names))
+        label_sums = np.bincount(codes, weights=np.asarray(total_labels, dtype=np.float64), minlength=len(names))
+        mismatch_sums = np.bincount(codes, weights=mismatches.astype(np.float64), minlength=len(names))
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        for code, name in enumerate(names):
+            category = categories[name]
+            category["count"] = int(counts[code])
+            category["total_labels"] = int(label_sums[code])
+            category["total_mismatches"] = int(mismatch_sums[code])
+            category["files"] = [filenames[row] for row in order[bounds[code]:bounds[code + 1]].tolist()]
+        return categories
+
+    for row, code in enumerate(codes):
+        category = categories[names[code]]
+        category["count"] += 1
+        category["total_labels"] += total_labels[row]
+        category["total_mismatches"] += mismatches[row]
+        category["files"].append(filenames[row])
+    return categories
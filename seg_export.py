@@ -0,0 +1,121 @@
+import os
+import shutil
+import posixpath
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+EXPORT_MODES = {"copy": "复制", "hardlink": "硬链接", "symlink": "符号链接"}
+ARCHIVE_FORMATS = {None: "不打包", "zip": "ZIP压缩包", "tar": "TAR.GZ压缩包"}
+ARCHIVE_SUFFIXES = {"zip": ".zip", "tar": ".tar.gz"}
+
+
+def export_file(src_path, dst_path, mode="copy"):
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    if mode == "copy":
+        shutil.copy2(src_path, dst_path)
+        return
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    if mode == "hardlink":
+        os.link(src_path, dst_path)
+    elif mode == "symlink":
+        os.symlink(os.path.abspath(src_path), dst_path)
+    else:
+        raise ValueError(f"未知的导出方式: {mode}")
+
+
+def export_name(filename, src_path):
+    # 压缩文件以配对用的文件名记录结果，导出时保留源文件自己的文件名（如 m.seg.gz）
+    return posixpath.join(posixpath.dirname(filename), os.path.basename(src_path))
+
+
+def export_tasks(results, files, copy_ref=True, copy_pred=True):
+    # (文件名, 子目录, 源路径)，子目录为ref或pred
+    tasks = []
+    for filename in files:
+        data = results[filename]
+        if copy_ref:
+            tasks.append((export_name(filename, data['true_path']), "ref", data['true_path']))
+        if copy_pred:
+            tasks.append((export_name(filename, data['pred_path']), "pred", data['pred_path']))
+    return tasks
+
+
+def export_category_files(results, files, category_dir, copy_ref=True, copy_pred=True, mode="copy",
+                          archive=None, workers=8, progress_callback=None, cancel_event=None):
+    cancel_event = cancel_event or threading.Event()
+    tasks = export_tasks(results, files, copy_ref, copy_pred)
+    report = {'ref': 0, 'pred': 0, 'errors': [], 'cancelled': False, 'target': category_dir, 'total': len(tasks)}
+
+    def finish_task(done, subdir, filename, error):
+        if error is None:
+            report[subdir] += 1
+        else:
+            report['errors'].append((f"{subdir}/{filename}", error))
+        if progress_callback:
+            progress_callback(done, len(tasks))
+
+    if archive:
+        write_archive(tasks, category_dir, archive, report, finish_task, cancel_event)
+        return report
+
+    for subdir in {task[1] for task in tasks}:
+        os.makedirs(os.path.join(category_dir, subdir), exist_ok=True)
+
+    def run_task(task):
+        filename, subdir, src_path = task
+        if cancel_event.is_set():
+            return task, None, True
+        try:
+            export_file(src_path, os.path.join(category_dir, subdir, filename), mode)
+            return task, None, False
+        except Exception as e:
+            return task, str(e), False
+
+    done = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = [executor.submit(run_task, task) for task in tasks]
+        for future in as_completed(futures):
+            (filename, subdir, _), error, skipped = future.result()
+            if skipped:
+                continue
+            done += 1
+            finish_task(done, subdir, filename, error)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    report['cancelled'] = done < len(tasks)
+    return report
+
+
+def write_archive(tasks, category_dir, archive, report, finish_task, cancel_event):
+    # 压缩包只能顺序写入，每个分类生成一个文件
+    if archive not in ARCHIVE_SUFFIXES:
+        raise ValueError(f"未知的压缩包格式: {archive}")
+    path = category_dir + ARCHIVE_SUFFIXES[archive]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report['target'] = path
+
+    if archive == "zip":
+        handle = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+    else:
+        handle = tarfile.open(path, 'w:gz')
+
+    with handle:
+        for done, (filename, subdir, src_path) in enumerate(tasks, 1):
+            if cancel_event.is_set():
+                report['cancelled'] = True
+                break
+            error = None
+            try:
+                if archive == "zip":
+                    handle.write(src_path, f"{subdir}/{filename}")
+                else:
+                    handle.add(src_path, f"{subdir}/{filename}")
+            except Exception as e:
+                error = str(e)
+            finish_task(done, subdir, filename, error)
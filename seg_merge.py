@@ -0,0 +1,136 @@
+import os
+import json
+
+from seg_engine import categorize_results, results_summary
+from seg_results import ResultStore, ResultRecord, encode_runs
+from seg_metrics import ConfusionMatrix
+from seg_bins import DEFAULT_BINNING
+from seg_shard import ShardError
+
+
+RESULTS_FORMAT = "seg-compare-results"
+RESULTS_VERSION = 1
+
+
+class DirectoryMismatchError(ShardError):
+    pass
+
+
+def results_header(true_dir, pred_dir, options, shard=None):
+    index, count = shard or (0, 1)
+    return {
+        'format': RESULTS_FORMAT,
+        'version': RESULTS_VERSION,
+        'true_dir': os.path.abspath(true_dir),
+        'pred_dir': os.path.abspath(pred_dir),
+        'options': options,
+        'shard_count': count,
+        'shards': [index]
+    }
+
+
+def save_results_file(results, path, header, binning=None):
+    # 可合并的结果文件：文件头记录比较参数和包含的分片，附带汇总统计和分类计数，
+    # 每个文件的不匹配位置以行程编码保存。先写临时文件再改名，其他节点不会读到写了一半的文件
+    binning = binning or DEFAULT_BINNING
+    categories = categorize_results(results, binning)
+    records = {}
+    for filename, data in results.items():
+        record = {key: value for key, value in data.items() if key != 'mismatch_indices'}
+        if isinstance(data, ResultRecord):
+            record['mismatch_runs'] = list(data.store.mismatch_runs(data.row))
+        else:
+            record['mismatch_runs'] = list(encode_runs(data['mismatch_indices']))
+        records[filename] = record
+    confusion = getattr(results, 'confusion', None)
+    content = dict(header,
+                   summary=results_summary(results),
+                   binning=binning.to_dict(),
+                   categories={name: {key: value for key, value in category.items() if key != 'files'}
+                               for name, category in categories.items()},
+                   confusion=confusion.to_list() if confusion is not None else None,
+                   orphans=getattr(results, 'orphans', None) or {'true_only': [], 'pred_only': []},
+                   failed=sorted(getattr(results, 'failed', [])),
+                   results=records)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_results_file(path):
+    # 返回(文件头, ResultStore)
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            content = json.load(f)
+        except ValueError as e:
+            raise ShardError(f"无法解析结果文件 {path}: {e}")
+    if not isinstance(content, dict) or content.get('format') != RESULTS_FORMAT:
+        raise ShardError(f"不是比较结果文件: {path}")
+    if content.get('version') != RESULTS_VERSION:
+        raise ShardError(f"不支持的结果文件版本 {content.get('version')}: {path}")
+
+    results = ResultStore()
+    for filename, record in content.pop('results').items():
+        results[filename] = record
+    confusion = content.pop('confusion')
+    results.confusion = ConfusionMatrix.from_list(confusion) if confusion is not None else None
+    results.orphans = content.pop('orphans')
+    results.failed = content.pop('failed')
+    return content, results
+
+
+def merge_results_files(paths, allow_missing=False, allow_dir_mismatch=False):
+    # 合并各节点的分片结果：比较参数和分片总数必须一致，同一分片不能出现两次；
+    # 缺少分片时报错，allow_missing=True时只在文件头中记录缺少的分片。
+    # 参考/预测目录不一致时报错，各节点挂载路径不同时用allow_dir_mismatch=True跳过检查，文件头沿用第一个文件的目录
+    header = None
+    merged = ResultStore()
+    merged.orphans = {'true_only': [], 'pred_only': []}
+    shards = {}
+    for path in paths:
+        info, results = load_results_file(path)
+        if header is None:
+            header = info
+        else:
+            if info['shard_count'] != header['shard_count']:
+                raise ShardError(f"分片总数不一致: {path} 为 {info['shard_count']}，应为 {header['shard_count']}")
+            if info['options'] != header['options']:
+                raise ShardError(f"比较参数不一致: {path} 为 {info['options']!r}，应为 {header['options']!r}")
+            for key, name in (('true_dir', "参考目录"), ('pred_dir', "预测目录")):
+                if info[key] != header[key] and not allow_dir_mismatch:
+                    raise DirectoryMismatchError(f"{name}不一致: {path} 为 {info[key]}，应为 {header[key]}")
+        # 以第一个带混淆矩阵的文件为基础累加
+        if results.confusion is not None:
+            if merged.confusion is None:
+                merged.confusion = results.confusion
+            else:
+                merged.confusion.merge(results.confusion)
+        for index in info['shards']:
+            if index in shards:
+                raise ShardError(f"分片 {index} 同时出现在 {shards[index]} 和 {path} 中")
+            shards[index] = path
+        for filename in results:
+            if filename in merged:
+                raise ShardError(f"文件 {filename} 出现在多个结果文件中")
+            merged[filename] = results[filename]
+        for side in ('true_only', 'pred_only'):
+            merged.orphans[side].extend(results.orphans.get(side, []))
+        merged.failed.extend(results.failed)
+    if header is None:
+        raise ShardError("没有要合并的结果文件")
+
+    missing = [index for index in range(header['shard_count']) if index not in shards]
+    if missing and not allow_missing:
+        raise ShardError(f"缺少分片: {', '.join(map(str, missing))}（共 {header['shard_count']} 个）")
+    merged.reorder(sorted(merged))
+    for side in ('true_only', 'pred_only'):
+        merged.orphans[side].sort()
+    merged.failed.sort()
+    header = {key: value for key, value in header.items()
+              if key not in ('summary', 'binning', 'categories', 'missing_shards')}
+    header['shards'] = sorted(shards)
+    if missing:
+        header['missing_shards'] = missing
+    return header, merged
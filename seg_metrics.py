@@ -0,0 +1,136 @@
+import csv
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+METRIC_FIELDS = ['class', 'support', 'predicted', 'tp', 'fp', 'fn', 'iou', 'precision', 'recall', 'f1']
+
+
+def label_sort_key(label):
+    try:
+        return 0, int(label), label
+    except ValueError:
+        return 1, 0, label
+
+
+class ConfusionMatrix:
+    # 以(真实标签, 预测标签)为键的稀疏混淆矩阵，可在文件和进程之间合并
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def update(self, true_labels, pred_labels, labels=None):
+        # labels为词表（编码 -> 标签字符串），传入的是标签编码时用于还原类别名称
+        n = min(len(true_labels), len(pred_labels))
+        if n == 0:
+            return self
+        if np is not None and hasattr(true_labels, 'dtype') and hasattr(pred_labels, 'dtype'):
+            self.update_arrays(true_labels[:n], pred_labels[:n], labels)
+        elif labels is not None:
+            for (true_code, pred_code), count in Counter(zip(true_labels[:n], pred_labels[:n])).items():
+                self.counts[(labels[true_code], labels[pred_code])] += count
+        else:
+            self.counts.update(zip(true_labels[:n], pred_labels[:n]))
+        return self
+
+    def update_arrays(self, true_codes, pred_codes, labels=None):
+        n = len(true_codes)
+        classes, inverse = np.unique(np.concatenate((true_codes, pred_codes)), return_inverse=True)
+        names = [labels[code] for code in classes.tolist()] if labels is not None else [str(c) for c in classes]
+        k = len(classes)
+        counts = np.bincount(inverse[:n] * k + inverse[n:], minlength=k * k)
+        for idx in np.flatnonzero(counts).tolist():
+            self.counts[(names[idx // k], names[idx % k])] += int(counts[idx])
+
+    def merge(self, other):
+        if other is not None:
+            self.counts.update(other.counts)
+        return self
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def classes(self):
+        labels = set()
+        for true_label, pred_label in self.counts:
+            labels.add(true_label)
+            labels.add(pred_label)
+        return sorted(labels, key=label_sort_key)
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def correct(self):
+        return sum(count for (true_label, pred_label), count in self.counts.items() if true_label == pred_label)
+
+    def accuracy(self):
+        total = self.total()
+        return self.correct() / total * 100 if total > 0 else 0
+
+    def per_class(self):
+        support = Counter()
+        predicted = Counter()
+        tp = Counter()
+        for (true_label, pred_label), count in self.counts.items():
+            support[true_label] += count
+            predicted[pred_label] += count
+            if true_label == pred_label:
+                tp[true_label] += count
+
+        rows = []
+        for label in self.classes():
+            fp = predicted[label] - tp[label]
+            fn = support[label] - tp[label]
+            union = tp[label] + fp + fn
+            precision = tp[label] / predicted[label] if predicted[label] > 0 else 0
+            recall = tp[label] / support[label] if support[label] > 0 else 0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0
+            rows.append({
+                'class': label,
+                'support': support[label],
+                'predicted': predicted[label],
+                'tp': tp[label],
+                'fp': fp,
+                'fn': fn,
+                'iou': tp[label] / union if union > 0 else 0,
+                'precision': precision,
+                'recall': recall,
+                'f1': f1
+            })
+        return rows
+
+    def mean_iou(self):
+        rows = self.per_class()
+        return sum(row['iou'] for row in rows) / len(rows) if rows else 0
+
+    def matrix(self):
+        classes = self.classes()
+        return classes, [[self.counts.get((t, p), 0) for p in classes] for t in classes]
+
+    def to_list(self):
+        return [[true_label, pred_label, count] for (true_label, pred_label), count in self.counts.items()]
+
+    @classmethod
+    def from_list(cls, items):
+        return cls({(true_label, pred_label): count for true_label, pred_label, count in items})
+
+
+def save_metrics_csv(confusion, fp):
+    writer = csv.writer(fp)
+    writer.writerow(METRIC_FIELDS)
+    for row in confusion.per_class():
+        writer.writerow([row[field] for field in METRIC_FIELDS])
+    writer.writerow([])
+    writer.writerow(['mean_iou', confusion.mean_iou()])
+    writer.writerow(['accuracy', confusion.accuracy()])
+
+
+def save_confusion_csv(confusion, fp):
+    classes, matrix = confusion.matrix()
+    writer = csv.writer(fp)
+    writer.writerow(['true\\pred'] + classes)
+    for label, row in zip(classes, matrix):
+        writer.writerow([label] + row)
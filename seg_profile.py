@@ -0,0 +1,146 @@
+import os
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# 各阶段的显示名称；子进程中的阶段按文件累加，多进程时总和可能超过实际耗时
+STAGE_NAMES = {
+    'scan': "目录扫描（与比较并行）",
+    'read_true': "读取参考标签",
+    'read_pred': "读取预测标签",
+    'compare_labels': "标签比较",
+    'compare_streaming': "流式读取与比较",
+    'metrics': "混淆矩阵",
+    'spans': "计算不匹配段",
+    'align': "对齐",
+    'adjacency': "邻接指标",
+    'cache_lookup': "缓存查找",
+    'checkpoint_restore': "检查点恢复",
+    'write_spans': "写入不匹配段",
+    'write_cache': "写入缓存",
+    'write_checkpoint': "写入检查点",
+    'add_result': "保存结果",
+    'callbacks': "进度回调/信号",
+    'display_results': "界面显示"
+}
+PROFILE_SLOWEST = 20
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def timed(timer, name, bytes_read=0):
+    # 未启用性能记录时返回空上下文，调用处不需要分支
+    if timer is None:
+        return nullcontext({'labels': 0})
+    return timer.stage(name, bytes_read)
+
+
+class StageTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds=0.0, bytes_read=0, labels=0, calls=1):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'seconds': 0.0, 'calls': 0, 'bytes': 0, 'labels': 0}
+        stage['seconds'] += seconds
+        stage['calls'] += calls
+        stage['bytes'] += bytes_read
+        stage['labels'] += labels
+        return stage
+
+    @contextmanager
+    def stage(self, name, bytes_read=0):
+        # 返回该阶段的记录，块内可以累加标签数
+        stage = self.add(name, bytes_read=bytes_read)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage['seconds'] += time.perf_counter() - start
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def file_record(self, labels):
+        # 单个文件对的记录，随比较结果从子进程传回
+        return {
+            'seconds': self.elapsed(),
+            'bytes': sum(stage['bytes'] for stage in self.stages.values()),
+            'labels': labels,
+            'stages': self.stages
+        }
+
+
+class RunProfile(StageTimer):
+    # 一次比较的性能记录：各阶段累计的耗时/读取字节数/标签数，以及每个文件的记录
+    def __init__(self):
+        super().__init__()
+        self.wall = None
+        self.files = {}
+
+    def add_file(self, filename, record):
+        self.files[filename] = record
+        for name, stage in record['stages'].items():
+            self.add(name, stage['seconds'], stage['bytes'], stage['labels'], stage['calls'])
+
+    def finish(self):
+        self.wall = self.elapsed()
+
+    def wall_seconds(self):
+        return self.wall if self.wall is not None else self.elapsed()
+
+    def summary(self):
+        wall = self.wall_seconds()
+        rows = []
+        for name, stage in self.stages.items():
+            seconds = stage['seconds']
+            rows.append({
+                'stage': name,
+                'name': STAGE_NAMES.get(name, name),
+                'seconds': seconds,
+                'share': seconds / wall * 100 if wall > 0 else 0,
+                'calls': stage['calls'],
+                'bytes': stage['bytes'],
+                'labels': stage['labels'],
+                'bytes_per_s': stage['bytes'] / seconds if seconds > 0 and stage['bytes'] else None,
+                'labels_per_s': stage['labels'] / seconds if seconds > 0 and stage['labels'] else None
+            })
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+    def slowest(self, count=PROFILE_SLOWEST):
+        # 耗时最长的文件，附带其中最慢的阶段，用于定位异常文件或慢速存储
+        rows = []
+        for filename, record in sorted(self.files.items(), key=lambda item: item[1]['seconds'],
+                                       reverse=True)[:count]:
+            stage = max(record['stages'].items(), key=lambda item: item[1]['seconds'], default=(None, None))[0]
+            rows.append(dict(record, filename=filename, slowest_stage=stage))
+        return rows
+
+    def to_dict(self):
+        return {
+            'wall_seconds': self.wall_seconds(),
+            'files': len(self.files),
+            'stages': self.summary(),
+            'per_file': self.files
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        for row in data['stages']:
+            profile.add(row['stage'], row['seconds'], row['bytes'], row['labels'], row['calls'])
+        profile.files = data['per_file']
+        profile.wall = data['wall_seconds']
+        return profile
+
+    def save_json(self, fp):
+        json.dump(self.to_dict(), fp, ensure_ascii=False, indent=2)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ReferenceIndex:
+    # 参考标签一次性加载：标签编码拼接成一个连续数组并按偏移量切片，
+    # 没有NumPy时保留各文件自己的编码。多进程时数组写入临时文件，各子进程以内存映射共享
+    def __init__(self):
+        self.offsets = {}
+        self.text = {}
+        self.codes = None
+        self.path = None
+
+    @classmethod
+    def load(cls, read_labels, encode, paths, progress_callback=None):
+        index = cls()
+        parts = []
+        position = 0
+        for i, (filename, path) in enumerate(paths):
+            try:
+                labels = read_labels(path)
+            except Exception:
+                continue
+            codes = encode(labels)
+            if codes is None:
+                index.text[filename] = labels
+            else:
+                index.offsets[filename] = (position, len(codes))
+                parts.append(codes)
+                position += len(codes)
+            if progress_callback:
+                progress_callback(i + 1, len(paths))
+
+        if parts:
+            codes = np.concatenate(parts)
+            if len(codes) and codes.dtype.itemsize > 4 and -2 ** 31 <= codes.min() and codes.max() < 2 ** 31:
+                codes = codes.astype(np.int32)
+            index.codes = codes
+        return index
+
+    def __len__(self):
+        return len(self.offsets) + len(self.text)
+
+    def get(self, filename):
+        offset = self.offsets.get(filename)
+        if offset is not None:
+            start, length = offset
+            return self.codes[start:start + length]
+        return self.text.get(filename)
+
+    def share(self):
+        if self.codes is None or len(self.codes) == 0 or self.path is not None:
+            return
+        fd, self.path = tempfile.mkstemp(prefix="seg_reference_", suffix=".bin")
+        with os.fdopen(fd, 'wb') as f:
+            self.codes.tofile(f)
+        self.codes = np.memmap(self.path, dtype=self.codes.dtype, mode='r', shape=self.codes.shape)
+
+    def close(self):
+        if self.path is not None:
+            self.codes = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path is not None:
+            # 只传递文件路径，子进程重新映射
+            state['codes'] = (str(self.codes.dtype), len(self.codes))
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None:
+            dtype, count = self.codes
+            self.codes = np.memmap(self.path, dtype=dtype, mode='r', shape=(count,)) if count else np.empty(0, dtype)
@@ -0,0 +1,352 @@
+import os
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 被覆盖记录遗留的行程编码超过此数量且占一半以上时整理
+RUNS_COMPACT_MIN = 4096
+RESULT_FIELDS = ['total_labels', 'mismatches', 'length_diff', 'error_rate', 'mismatch_indices',
+                 'true_path', 'pred_path', 'true_filename', 'pred_filename']
+
+
+def encode_runs(indices):
+    # 有序的不匹配位置编码为(起点, 长度)对
+    runs = array('i')
+    if np is not None and hasattr(indices, 'dtype'):
+        if len(indices) == 0:
+            return runs
+        breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(indices)]))
+        pairs = np.empty(len(starts) * 2, dtype=np.int32)
+        pairs[0::2] = indices[starts]
+        pairs[1::2] = ends - starts
+        runs.frombytes(pairs.tobytes())
+        return runs
+
+    start = prev = None
+    for i in indices:
+        i = int(i)
+        if prev is not None and i == prev + 1:
+            prev = i
+            continue
+        if start is not None:
+            runs.append(start)
+            runs.append(prev - start + 1)
+        start = prev = i
+    if start is not None:
+        runs.append(start)
+        runs.append(prev - start + 1)
+    return runs
+
+
+def decode_runs(runs):
+    indices = array('i')
+    for k in range(0, len(runs), 2):
+        start = runs[k]
+        indices.extend(range(start, start + runs[k + 1]))
+    return indices
+
+
+def permute(column, order):
+    if isinstance(column, array):
+        return array(column.typecode, map(column.__getitem__, order))
+    return [column[row] for row in order]
+
+
+class ResultRecord(Mapping):
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.store.get_field(self.row, key)
+
+    def __iter__(self):
+        return iter(self.store.record_keys(self.row))
+
+    def __len__(self):
+        return len(self.store.record_keys(self.row))
+
+    def __repr__(self):
+        return f"ResultRecord({dict(self)!r})"
+
+
+# 按列存储的比较结果，对外保持 {文件名: 结果字典} 的接口：
+# 标量指标存放在array中，路径拆分为共享的目录表和文件名，
+# 不匹配位置以行程编码存放，只在访问mismatch_indices时展开
+class ResultStore(MutableMapping):
+    def __init__(self, results=None):
+        self.clear()
+        # 数据集级别的混淆矩阵（启用类别指标时）
+        self.confusion = None
+        # 只存在于参考目录或预测目录一侧的文件（相对路径列表）
+        self.orphans = None
+        # 不匹配段记录文件（SpanStore），未保存时为None
+        self.spans_path = None
+        # 启用性能记录时的RunProfile
+        self.profile = None
+        # 读取失败的文件（例如压缩文件损坏，或读取.zst时未安装zstandard）
+        self.failed = []
+        if results:
+            self.update(results)
+
+    @property
+    def profile(self):
+        if self._profile_loader is not None:
+            self._profile = self._profile_loader()
+            self._profile_loader = None
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile):
+        self._profile = profile
+        self._profile_loader = None
+
+    def load_profile_later(self, loader):
+        # 从会话文件打开时，性能记录在第一次使用时才由loader读取
+        self._profile_loader = loader
+
+    def clear(self):
+        self._index = {}
+        self._names = []
+        self._total_labels = array('q')
+        self._mismatches = array('q')
+        self._length_diff = array('q')
+        self._error_rate = array('d')
+        self._dirs = []
+        self._dir_index = {}
+        self._true_dir = array('I')
+        self._pred_dir = array('I')
+        self._true_base = []
+        self._pred_base = []
+        self._runs = array('i')
+        self._run_start = array('q')
+        self._run_count = array('q')
+        # _runs中已不被任何记录引用的(起点, 长度)对数，过多时整理
+        self._dead_runs = 0
+        self._extra = {}
+
+    def _intern_dir(self, directory):
+        idx = self._dir_index.get(directory)
+        if idx is None:
+            idx = self._dir_index[directory] = len(self._dirs)
+            self._dirs.append(directory)
+        return idx
+
+    def _split_path(self, filename, path):
+        directory, base = os.path.split(path)
+        # 与键相同的文件名直接引用键，避免重复保存字符串
+        return self._intern_dir(directory), filename if base == filename else base
+
+    def __setitem__(self, filename, data):
+        row = self._index.get(filename)
+        replaced = row is not None
+        if row is None:
+            row = self._index[filename] = len(self._names)
+            self._names.append(filename)
+            self._total_labels.append(0)
+            self._mismatches.append(0)
+            self._length_diff.append(0)
+            self._error_rate.append(0.0)
+            self._true_dir.append(0)
+            self._pred_dir.append(0)
+            self._true_base.append(None)
+            self._pred_base.append(None)
+            self._run_start.append(0)
+            self._run_count.append(0)
+            for column in self._extra.values():
+                column.append(None)
+
+        self._total_labels[row] = data['total_labels']
+        self._mismatches[row] = data['mismatches']
+        self._length_diff[row] = data['length_diff']
+        self._error_rate[row] = data['error_rate']
+        self._true_dir[row], self._true_base[row] = self._split_path(filename, data['true_path'])
+        self._pred_dir[row], self._pred_base[row] = self._split_path(filename, data['pred_path'])
+
+        if not isinstance(self._runs, array):
+            # 从会话文件延迟读取的不匹配位置，修改前整体读入
+            self._runs = self._runs[:]
+        if isinstance(data, ResultRecord):
+            runs = data.store.mismatch_runs(data.row)
+        elif 'mismatch_runs' in data:
+            # 从结果文件读入的记录已是行程编码
+            runs = array('i', data['mismatch_runs'])
+        else:
+            runs = encode_runs(data['mismatch_indices'])
+        count = len(runs) // 2
+        old_count = self._run_count[row] if replaced else 0
+        if replaced and count <= old_count:
+            # 覆盖已有记录时原位置放得下就直接复用
+            start = self._run_start[row] * 2
+            self._runs[start:start + len(runs)] = runs
+            self._dead_runs += old_count - count
+        else:
+            self._run_start[row] = len(self._runs) // 2
+            self._runs.extend(runs)
+            self._dead_runs += old_count
+        self._run_count[row] = count
+        if self._dead_runs > RUNS_COMPACT_MIN and self._dead_runs * 2 > len(self._runs) // 2:
+            self.compact_runs()
+
+        if replaced:
+            # 新记录没有的附加字段清空，不保留上一次的值
+            for key, column in self._extra.items():
+                if key not in data:
+                    column[row] = None
+        for key, value in data.items():
+            if key in RESULT_FIELDS or key == 'mismatch_runs':
+                continue
+            column = self._extra.get(key)
+            if column is None:
+                column = self._extra[key] = [None] * len(self._names)
+            column[row] = value
+
+    def __getitem__(self, filename):
+        return ResultRecord(self, self._index[filename])
+
+    def __delitem__(self, filename):
+        if filename not in self._index:
+            raise KeyError(filename)
+        self.reorder([name for name in self._names if name != filename])
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, filename):
+        return filename in self._index
+
+    def record_keys(self, row):
+        return RESULT_FIELDS + [key for key, column in self._extra.items() if column[row] is not None]
+
+    def get_field(self, row, key):
+        if key == 'total_labels':
+            return self._total_labels[row]
+        if key == 'mismatches':
+            return self._mismatches[row]
+        if key == 'length_diff':
+            return self._length_diff[row]
+        if key == 'error_rate':
+            return self._error_rate[row]
+        if key == 'mismatch_indices':
+            return decode_runs(self.mismatch_runs(row))
+        if key == 'true_path':
+            return os.path.join(self._dirs[self._true_dir[row]], self._true_base[row])
+        if key == 'pred_path':
+            return os.path.join(self._dirs[self._pred_dir[row]], self._pred_base[row])
+        if key == 'true_filename':
+            return self._true_base[row]
+        if key == 'pred_filename':
+            return self._pred_base[row]
+        column = self._extra.get(key)
+        if column is None or column[row] is None:
+            raise KeyError(key)
+        return column[row]
+
+    def rows(self, filenames):
+        # 各文件名对应的行号，不存在的为-1；用于按文件名连接两次比较的结果
+        index = self._index
+        return array('q', [index.get(name, -1) for name in filenames])
+
+    def compact_runs(self):
+        # 按行顺序重新排列行程编码，去掉被覆盖记录遗留的部分
+        runs = array('i')
+        for row in range(len(self._names)):
+            start = self._run_start[row] * 2
+            self._run_start[row] = len(runs) // 2
+            runs.extend(self._runs[start:start + self._run_count[row] * 2])
+        self._runs = runs
+        self._dead_runs = 0
+
+    def mismatch_runs(self, row):
+        start = self._run_start[row] * 2
+        return self._runs[start:start + self._run_count[row] * 2]
+
+    def column(self, key, default=KeyError):
+        # 按文件顺序返回整列数据，供统计和分类使用；给出default时缺失的附加字段以default填充
+        if default is not KeyError and key not in RESULT_FIELDS:
+            column = self._extra.get(key)
+            if column is None:
+                return [default] * len(self._names)
+            return [default if value is None else value for value in column]
+        if key == 'total_labels':
+            return self._total_labels
+        if key == 'mismatches':
+            return self._mismatches
+        if key == 'length_diff':
+            return self._length_diff
+        if key == 'error_rate':
+            return self._error_rate
+        return [self.get_field(row, key) for row in range(len(self._names))]
+
+    def to_columns(self):
+        # 保存会话用的各列（数值列为array，字符串列为list）
+        if self._dead_runs:
+            self.compact_runs()
+        return {
+            'names': self._names,
+            'total_labels': self._total_labels,
+            'mismatches': self._mismatches,
+            'length_diff': self._length_diff,
+            'error_rate': self._error_rate,
+            'dirs': self._dirs,
+            'true_dir': self._true_dir,
+            'pred_dir': self._pred_dir,
+            'true_base': self._true_base,
+            'pred_base': self._pred_base,
+            'runs': self._runs,
+            'run_start': self._run_start,
+            'run_count': self._run_count,
+            'extra': self._extra
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        # runs可以是按需读取的对象，只需支持len()和切片
+        store = cls()
+        store._names = columns['names']
+        store._index = {name: row for row, name in enumerate(store._names)}
+        store._total_labels = columns['total_labels']
+        store._mismatches = columns['mismatches']
+        store._length_diff = columns['length_diff']
+        store._error_rate = columns['error_rate']
+        store._dirs = columns['dirs']
+        store._dir_index = {directory: idx for idx, directory in enumerate(store._dirs)}
+        store._true_dir = columns['true_dir']
+        store._pred_dir = columns['pred_dir']
+        store._true_base = columns['true_base']
+        store._pred_base = columns['pred_base']
+        store._runs = columns['runs']
+        store._run_start = columns['run_start']
+        store._run_count = columns['run_count']
+        store._dead_runs = 0
+        store._extra = columns['extra']
+        return store
+
+    def reorder(self, filenames):
+        # 按行号排列逐列重排，每次只新建一列；行程编码本身不移动，只重排各行的起点和长度
+        filenames = [name for name in filenames if name in self._index]
+        if filenames == self._names:
+            return
+        order = array('q', [self._index[name] for name in filenames])
+        if len(order) < len(self._names):
+            kept = set(order)
+            self._dead_runs += sum(self._run_count[row] for row in range(len(self._names)) if row not in kept)
+        for key in ('_total_labels', '_mismatches', '_length_diff', '_error_rate', '_true_dir', '_pred_dir',
+                    '_true_base', '_pred_base', '_run_start', '_run_count'):
+            setattr(self, key, permute(getattr(self, key), order))
+        for key, column in self._extra.items():
+            self._extra[key] = permute(column, order)
+        self._names = filenames
+        self._index = {name: row for row, name in enumerate(filenames)}
@@ -0,0 +1,118 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+
+from seg_compress import split_seg_name, seg_key, compression_rank
+from seg_shard import in_shard
+
+
+def scan_seg_files(directory, recursive=False):
+    # os.scandir直接给出目录项类型，不需要逐个stat；返回以"/"分隔的相对路径。
+    # 递归时不跟随指向目录的符号链接，避免循环。
+    # 压缩文件(.seg.gz等)同样返回，同一目录下同名的多种形式只保留一个
+    stack = [(directory, "")]
+    while stack:
+        path, prefix = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            if not prefix:
+                raise
+            continue
+        found = {}
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append((entry.path, prefix + entry.name + "/"))
+                        continue
+                except OSError:
+                    continue
+                name, suffix = split_seg_name(entry.name)
+                if name is None:
+                    continue
+                rank = compression_rank(suffix)
+                if name not in found or rank < found[name][0]:
+                    found[name] = (rank, entry.name)
+        for rank, name in found.values():
+            yield prefix + name
+
+
+def join_relpath(directory, relpath):
+    return os.path.join(directory, *relpath.split("/"))
+
+
+class PairScanner:
+    # 参考目录和预测目录各由一个线程扫描，同一相对路径在两侧都出现后立即产出文件对，
+    # 比较不必等待目录遍历结束；遍历完成后只存在于一侧的文件记入true_only/pred_only。
+    # 按去掉压缩后缀的路径配对，文件对以该路径为名，允许只有一侧是压缩文件。
+    # 指定shard=(i, N)时只产出属于该分片的文件对和孤立文件
+    def __init__(self, true_dir, pred_dir, recursive=False, shard=None):
+        self.true_dir = true_dir
+        self.pred_dir = pred_dir
+        self.recursive = recursive
+        self.shard = shard
+        self.matched = 0
+        # 两侧都存在但属于其他分片的文件对数
+        self.skipped = 0
+        self.total = None
+        # 两侧扫描全部完成所用的时间（秒）
+        self.seconds = None
+        self.true_only = []
+        self.pred_only = []
+
+    def scan(self, side, directory, found):
+        try:
+            for relpath in scan_seg_files(directory, self.recursive):
+                found.put((side, relpath))
+        except OSError as e:
+            found.put((side, e))
+        found.put((side, None))
+
+    def __iter__(self):
+        found = queue.Queue()
+        start = time.perf_counter()
+        for side, directory in enumerate((self.true_dir, self.pred_dir)):
+            threading.Thread(target=self.scan, args=(side, directory, found), daemon=True).start()
+
+        seen = ({}, {})
+        pairs = deque()
+        running = 2
+        while running or pairs:
+            # 先取完队列中已有的扫描结果，两侧扫描结束后即可确定文件对总数
+            while running:
+                try:
+                    side, relpath = found.get(block=not pairs)
+                except queue.Empty:
+                    break
+                if relpath is None:
+                    running -= 1
+                elif isinstance(relpath, OSError):
+                    raise relpath
+                else:
+                    key = seg_key(relpath)
+                    other = seen[1 - side].pop(key, None)
+                    if other is None:
+                        seen[side][key] = relpath
+                        continue
+                    if not in_shard(key, self.shard):
+                        self.skipped += 1
+                        continue
+                    true_relpath, pred_relpath = (relpath, other) if side == 0 else (other, relpath)
+                    self.matched += 1
+                    pairs.append((key, join_relpath(self.true_dir, true_relpath),
+                                  join_relpath(self.pred_dir, pred_relpath)))
+
+            if not running and self.total is None:
+                self.total = self.matched
+                self.seconds = time.perf_counter() - start
+                self.true_only = sorted(relpath for key, relpath in seen[0].items() if in_shard(key, self.shard))
+                self.pred_only = sorted(relpath for key, relpath in seen[1].items() if in_shard(key, self.shard))
+            if pairs:
+                yield pairs.popleft()
+
+    def orphans(self):
+        return {'true_only': self.true_only, 'pred_only': self.pred_only}
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import struct
+from array import array
+
+from seg_engine import results_summary
+from seg_results import ResultStore
+from seg_metrics import ConfusionMatrix
+from seg_profile import RunProfile
+
+
+# 会话文件：32字节文件头（魔数、版本、清单位置和长度）+ 各列数据 + JSON清单。
+# 数值列按小端定长整数/浮点数连续存放，字符串列和附加字段（每个字段一块）以JSON存放；
+# 打开时只读入清单和标量列，不匹配位置（行程编码）在查看某个文件时才从文件读取，
+# 附加字段和性能记录在首次使用时读取
+SESSION_SUFFIX = '.segsession'
+SESSION_MAGIC = b'SEGS'
+SESSION_VERSION = 1
+SESSION_HEADER = struct.Struct('<4sBxxxQQQ')
+SESSION_ALIGNMENT = 8
+NUMERIC_COLUMNS = {
+    'total_labels': 'q', 'mismatches': 'q', 'length_diff': 'q', 'error_rate': 'd',
+    'true_dir': 'I', 'pred_dir': 'I', 'run_start': 'q', 'run_count': 'q', 'runs': 'i'
+}
+ITEM_SIZES = {'q': 8, 'd': 8, 'I': 4, 'i': 4}
+TEXT_COLUMNS = ['names', 'dirs', 'true_base', 'pred_base']
+# 清单中记录数据位置的项，不返回给调用者
+LAYOUT_KEYS = ('columns', 'blocks', 'extra')
+
+
+class SessionError(ValueError):
+    pass
+
+
+class SessionRuns:
+    # 会话文件中的行程编码，按切片读取，不常驻内存
+    def __init__(self, path, offset, count):
+        self.path = path
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        start, stop, step = key.indices(self.count)
+        values = array('i')
+        if stop > start:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset + start * ITEM_SIZES['i'])
+                values.fromfile(f, stop - start)
+            if sys.byteorder == 'big':
+                values.byteswap()
+        return values[::step] if step != 1 else values
+
+
+class SessionBlock:
+    # 会话文件中的一个JSON块
+    def __init__(self, path, offset, size):
+        self.path = path
+        self.offset = offset
+        self.size = size
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            return json.loads(f.read(self.size).decode('utf-8'))
+
+
+class SessionColumn:
+    # 附加字段列，用法与list相同，第一次访问其中的值时整列读入
+    def __init__(self, block, count):
+        self.block = block
+        self.count = count
+        self.values = None
+
+    def load(self):
+        if self.values is None:
+            self.values = self.block.load()
+        return self.values
+
+    def __len__(self):
+        return self.count if self.values is None else len(self.values)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        self.load()[key] = value
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def append(self, value):
+        self.load().append(value)
+
+
+def write_block(f, data):
+    padding = -f.tell() % SESSION_ALIGNMENT
+    f.write(b'\0' * padding)
+    offset = f.tell()
+    f.write(data)
+    return offset
+
+
+def column_bytes(values, typecode):
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values[:] if isinstance(values, SessionRuns) else values)
+    if values.itemsize != ITEM_SIZES[typecode]:
+        raise SessionError(f"平台不支持{typecode}类型的定长数值")
+    if sys.byteorder == 'big':
+        values = array(typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save_session(results, path, info=None, binning=None):
+    # info为比较参数（目录、选项等），与汇总统计一起写入清单，打开会话时原样返回
+    columns = results.to_columns()
+    manifest = {
+        'format': "seg-compare-session",
+        'version': SESSION_VERSION,
+        'info': info or {},
+        'summary': results_summary(results),
+        'binning': binning.to_dict() if binning else None,
+        'confusion': results.confusion.to_list() if results.confusion is not None else None,
+        'spans_path': os.path.abspath(results.spans_path) if results.spans_path else None,
+        'columns': {},
+        'blocks': {},
+        'extra': {}
+    }
+    blocks = {name: columns[name] for name in TEXT_COLUMNS}
+    blocks['orphans'] = results.orphans
+    blocks['failed'] = results.failed
+    blocks['profile'] = results.profile.to_dict() if results.profile is not None else None
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * SESSION_HEADER.size)
+        for name, typecode in NUMERIC_COLUMNS.items():
+            values = columns[name]
+            manifest['columns'][name] = [write_block(f, column_bytes(values, typecode)), typecode, len(values)]
+        for name, value in blocks.items():
+            data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+            manifest['blocks'][name] = [write_block(f, data), len(data)]
+        for key, column in columns['extra'].items():
+            data = json.dumps(list(column), ensure_ascii=False).encode('utf-8')
+            manifest['extra'][key] = [write_block(f, data), len(data)]
+        data = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+        offset = write_block(f, data)
+        f.seek(0)
+        f.write(SESSION_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, offset, len(data), len(results)))
+    os.replace(tmp_path, path)
+
+    # 覆盖当前会话文件时，延迟读取的行程编码改为指向新文件中的同一列
+    runs = columns['runs']
+    if isinstance(runs, SessionRuns) and os.path.abspath(runs.path) == os.path.abspath(path):
+        runs.offset = manifest['columns']['runs'][0]
+
+
+def read_manifest(f, path):
+    try:
+        magic, version, offset, size, count = SESSION_HEADER.unpack(f.read(SESSION_HEADER.size))
+    except struct.error:
+        raise SessionError(f"不是有效的会话文件: {path}")
+    if magic != SESSION_MAGIC:
+        raise SessionError(f"不是有效的会话文件: {path}")
+    if version != SESSION_VERSION:
+        raise SessionError(f"不支持的会话文件版本 {version}: {path}")
+    f.seek(offset)
+    return json.loads(f.read(size).decode('utf-8'))
+
+
+def session_info(path):
+    # 只读取清单（比较参数、汇总统计等），不加载结果
+    with open(path, 'rb') as f:
+        manifest = read_manifest(f, path)
+    return {key: value for key, value in manifest.items() if key not in LAYOUT_KEYS}
+
+
+def load_session(path):
+    # 返回(清单, ResultStore)；结果中的不匹配位置在访问时才从会话文件读取
+    with open(path, 'rb') as f:
+        manifest = read_manifest(f, path)
+        columns = {}
+        for name, (offset, typecode, count) in manifest['columns'].items():
+            if name == 'runs':
+                columns[name] = SessionRuns(path, offset, count)
+                continue
+            values = array(typecode)
+            if values.itemsize != ITEM_SIZES[typecode]:
+                raise SessionError(f"平台不支持{typecode}类型的定长数值")
+            f.seek(offset)
+            try:
+                values.fromfile(f, count)
+            except EOFError:
+                raise SessionError(f"会话文件不完整: {path}")
+            if sys.byteorder == 'big':
+                values.byteswap()
+            columns[name] = values
+        blocks = {}
+        for name, (offset, size) in manifest['blocks'].items():
+            if name == 'profile':
+                continue
+            f.seek(offset)
+            blocks[name] = json.loads(f.read(size).decode('utf-8'))
+
+    columns.update((name, blocks[name]) for name in TEXT_COLUMNS)
+    # 早期的会话文件把全部附加字段存为一块
+    columns['extra'] = blocks['extra'] if 'extra' in blocks else {
+        key: SessionColumn(SessionBlock(path, offset, size), len(columns['names']))
+        for key, (offset, size) in manifest['extra'].items()
+    }
+    results = ResultStore.from_columns(columns)
+    confusion = manifest['confusion']
+    results.confusion = ConfusionMatrix.from_list(confusion) if confusion is not None else None
+    results.orphans = blocks['orphans']
+    results.failed = blocks['failed']
+    results.spans_path = manifest['spans_path']
+    profile_block = SessionBlock(path, *manifest['blocks']['profile'])
+
+    def load_profile():
+        data = profile_block.load()
+        return RunProfile.from_dict(data) if data is not None else None
+    results.load_profile_later(load_profile)
+    return {key: value for key, value in manifest.items() if key not in LAYOUT_KEYS}, results
@@ -0,0 +1,34 @@
+import os
+import zlib
+
+
+class ShardError(ValueError):
+    pass
+
+
+def parse_shard(text):
+    # "i/N"：共N个分片中的第i个（从0开始）
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ShardError(f"分片格式应为 i/N，例如 0/4: {text}")
+    if count < 1 or not 0 <= index < count:
+        raise ShardError(f"分片序号必须满足 0 <= i < N: {text}")
+    return index, count
+
+
+def shard_index(filename, count):
+    # 按配对用的相对路径（"/"分隔）的CRC32分配，与机器、操作系统和扫描顺序无关
+    return zlib.crc32(filename.encode('utf-8')) % count
+
+
+def in_shard(filename, shard):
+    return shard is None or shard_index(filename, shard[1]) == shard[0]
+
+
+def shard_path(path, shard):
+    # 各节点共用同一存储时，默认的缓存/检查点/不匹配段文件按分片区分，避免互相覆盖
+    if shard is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard[0]}of{shard[1]}{ext}"
@@ -0,0 +1,157 @@
+import os
+import csv
+import sqlite3
+
+from seg_cache import file_signature
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SPANS_FILENAME = ".seg_compare_spans.sqlite"
+SPAN_FIELDS = ['start', 'length', 'true_label', 'pred_label']
+# 不匹配段文件无法创建或写入（目录只读、磁盘已满等）时的异常
+STORE_ERRORS = (OSError, sqlite3.Error)
+
+
+def compute_spans(true_labels, pred_labels, offset=0, labels=None):
+    # 连续且(参考标签, 预测标签)相同的不匹配位置合并为一段: (起点, 长度, 参考标签, 预测标签)。
+    # labels为词表时传入的是标签编码，输出还原为标签字符串
+    name = labels.__getitem__ if labels is not None else str
+    n = min(len(true_labels), len(pred_labels))
+    if np is not None and hasattr(true_labels, 'dtype') and hasattr(pred_labels, 'dtype'):
+        true_labels = true_labels[:n]
+        pred_labels = pred_labels[:n]
+        indices = np.flatnonzero(true_labels != pred_labels)
+        if len(indices) == 0:
+            return []
+        true_values = true_labels[indices]
+        pred_values = pred_labels[indices]
+        breaks = np.flatnonzero((np.diff(indices) != 1) | (true_values[1:] != true_values[:-1]) |
+                                (pred_values[1:] != pred_values[:-1])) + 1
+        starts = np.concatenate(([0], breaks))
+        lengths = np.diff(np.concatenate((starts, [len(indices)])))
+        return list(zip((indices[starts] + offset).tolist(), lengths.tolist(),
+                        map(name, true_values[starts].tolist()), map(name, pred_values[starts].tolist())))
+
+    spans = []
+    for i in range(n):
+        if true_labels[i] == pred_labels[i]:
+            continue
+        true_label = name(true_labels[i])
+        pred_label = name(pred_labels[i])
+        if spans:
+            start, length, last_true, last_pred = spans[-1]
+            if start + length == i + offset and last_true == true_label and last_pred == pred_label:
+                spans[-1] = (start, length + 1, last_true, last_pred)
+                continue
+        spans.append((i + offset, 1, true_label, pred_label))
+    return spans
+
+
+def extend_spans(spans, block_spans):
+    # 流式比较时拼接各块的结果，跨块边界的同一段合并
+    if spans and block_spans:
+        start, length, true_label, pred_label = spans[-1]
+        next_start, next_length, next_true, next_pred = block_spans[0]
+        if start + length == next_start and true_label == next_true and pred_label == next_pred:
+            spans[-1] = (start, length + next_length, true_label, pred_label)
+            block_spans = block_spans[1:]
+    spans.extend(block_spans)
+    return spans
+
+
+class SpanStore:
+    # 不匹配段保存在SQLite中，查看时按页读取，不需要全部载入内存。
+    # 记录两侧文件的大小/修改时间，文件变化后的旧记录视为不存在
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS span_files (
+                true_path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                pred_path TEXT,
+                true_size INTEGER, true_mtime INTEGER,
+                pred_size INTEGER, pred_mtime INTEGER,
+                count INTEGER,
+                PRIMARY KEY (true_path, filename)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS spans (
+                true_path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                start INTEGER, length INTEGER, true_label TEXT, pred_label TEXT,
+                PRIMARY KEY (true_path, filename, seq)
+            ) WITHOUT ROWID
+        """)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def discard(self):
+        # 写入出错后放弃未提交的记录并关闭
+        try:
+            self.conn.close()
+        except STORE_ERRORS:
+            pass
+
+    def put(self, filename, true_path, pred_path, spans):
+        key = (os.path.abspath(true_path), filename)
+        try:
+            signature = file_signature(true_path) + file_signature(pred_path)
+        except OSError:
+            return
+        self.conn.execute("DELETE FROM spans WHERE true_path = ? AND filename = ?", key)
+        self.conn.executemany("INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (key + (seq,) + tuple(span) for seq, span in enumerate(spans)))
+        self.conn.execute("INSERT OR REPLACE INTO span_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          key + (os.path.abspath(pred_path),) + signature + (len(spans),))
+
+    def count(self, filename, true_path, pred_path):
+        key = (os.path.abspath(true_path), filename)
+        row = self.conn.execute("""
+            SELECT pred_path, true_size, true_mtime, pred_size, pred_mtime, count
+            FROM span_files WHERE true_path = ? AND filename = ?
+        """, key).fetchone()
+        if row is None or row[0] != os.path.abspath(pred_path):
+            return None
+        try:
+            if tuple(row[1:5]) != file_signature(true_path) + file_signature(pred_path):
+                return None
+        except OSError:
+            return None
+        return row[5]
+
+    def page(self, filename, true_path, offset, limit):
+        return self.conn.execute("""
+            SELECT start, length, true_label, pred_label FROM spans
+            WHERE true_path = ? AND filename = ? AND seq >= ? AND seq < ? ORDER BY seq
+        """, (os.path.abspath(true_path), filename, offset, offset + limit)).fetchall()
+
+    def find(self, filename, true_path, position):
+        # 第一个结束位置在position之后的段的序号
+        row = self.conn.execute("""
+            SELECT seq FROM spans WHERE true_path = ? AND filename = ? AND start + length > ?
+            ORDER BY seq LIMIT 1
+        """, (os.path.abspath(true_path), filename, position)).fetchone()
+        return row[0] if row else None
+
+    def save_csv(self, filename, true_path, fp, page_size=10000):
+        writer = csv.writer(fp)
+        writer.writerow(SPAN_FIELDS)
+        offset = 0
+        while True:
+            rows = self.page(filename, true_path, offset, page_size)
+            writer.writerows(rows)
+            if len(rows) < page_size:
+                break
+            offset += page_size
@@ -0,0 +1,98 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 标签字符串与小整数编码的映射。参考和预测使用同一个词表，编码相同当且仅当字符串相同，
+# 数字标签和命名标签一样处理。编码存放在array('H')中（超过65536种标签时改用'I'），
+# 有NumPy时直接包装为数组，不复制数据
+class LabelVocabulary:
+    def __init__(self, labels=()):
+        self.codes = {}
+        self.labels = []
+        for label in labels:
+            self.code(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getstate__(self):
+        return self.labels
+
+    def __setstate__(self, labels):
+        self.__init__(labels)
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def typecode(self):
+        return 'H' if len(self.labels) <= 1 << 16 else 'I'
+
+    def to_buffer(self, codes):
+        if not isinstance(codes, array) or codes.typecode != self.typecode():
+            codes = array(self.typecode(), codes)
+        if np is not None:
+            return np.frombuffer(codes, dtype=np.uint16 if codes.typecode == 'H' else np.uint32)
+        return codes
+
+    def code_list(self, labels):
+        try:
+            # 常见情况下所有标签都已在词表中，整个映射在C层完成
+            return list(map(self.codes.__getitem__, labels))
+        except KeyError:
+            return [self.code(label) for label in labels]
+
+    def encode(self, labels):
+        # 字符串序列转为编码；已经是编码数组时原样返回
+        if isinstance(labels, array) or (np is not None and isinstance(labels, np.ndarray)):
+            return labels
+        return self.to_buffer(self.code_list(list(labels)))
+
+    def parse(self, f, block_size=1 << 20):
+        # 按块读取文本并按行拆分，去掉首尾空白、跳过空行后逐块编码，不保留整个文件的字符串
+        codes = array('H')
+        rest = ""
+        while True:
+            block = f.read(block_size)
+            lines = (rest + block).split('\n')
+            rest = lines.pop() if block else ""
+            labels = self.code_list(list(filter(None, map(str.strip, lines))))
+            if codes.typecode != self.typecode():
+                codes = array(self.typecode(), codes)
+            codes.extend(labels)
+            if not block:
+                break
+        return self.to_buffer(codes)
+
+    def encode_values(self, values):
+        # 二进制文件中的整数标签按其十进制字符串编码，与同一标签的文本形式一致
+        if len(values) == 0:
+            return self.to_buffer([])
+        values = np.asarray(values).astype(np.int64)
+        low = int(values.min())
+        high = int(values.max())
+        if high - low < 1 << 20:
+            offsets = values - low
+            present = np.zeros(high - low + 1, dtype=bool)
+            present[offsets] = True
+            table = np.zeros(high - low + 1, dtype=np.int64)
+            for offset in np.flatnonzero(present).tolist():
+                table[offset] = self.code(str(offset + low))
+            codes = table[offsets]
+        else:
+            unique, inverse = np.unique(values, return_inverse=True)
+            codes = np.array([self.code(str(value)) for value in unique.tolist()], dtype=np.int64)[inverse]
+        return codes.astype(np.uint16 if self.typecode() == 'H' else np.uint32)
+
+    def decode(self, codes):
+        if hasattr(codes, 'tolist'):
+            codes = codes.tolist()
+        labels = self.labels
+        return [labels[code] for code in codes]
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_seg(path, labels):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("".join(f"{label}\n" for label in labels))
+
+
+# 参考/预测标签：完全匹配、少量错误、长度不一致、字符串标签
+SEG_PAIRS = {
+    'perfect.seg': ([1, 2, 3, 4, 5, 6], [1, 2, 3, 4, 5, 6]),
+    'minor.seg': ([1] * 50 + [2] * 50, [1] * 50 + [3, 3] + [2] * 48),
+    'shorter.seg': ([1, 2, 3, 4, 5], [1, 2, 9]),
+    'names.seg': (['hole', 'face', 'fillet', 'face'], ['hole', 'fillet', 'fillet', 'face']),
+}
+
+
+# 按SEG_PAIRS比较后每个文件的(标签数, 不匹配位置, 长度差)
+EXPECTED = {
+    'perfect.seg': (6, [], 0),
+    'minor.seg': (100, [50, 51], 0),
+    'shorter.seg': (5, [2], 2),
+    'names.seg': (4, [1], 0),
+}
+
+
+def check_results(results):
+    assert sorted(results) == sorted(EXPECTED)
+    for filename, (total_labels, mismatches, length_diff) in EXPECTED.items():
+        data = results[filename]
+        assert data['total_labels'] == total_labels
+        assert list(data['mismatch_indices']) == mismatches
+        assert data['mismatches'] == len(mismatches)
+        assert data['length_diff'] == length_diff
+        assert data['error_rate'] == pytest.approx(len(mismatches) / total_labels * 100)
+
+
+@pytest.fixture
+def seg_dirs(tmp_path):
+    true_dir = str(tmp_path / 'ref')
+    pred_dir = str(tmp_path / 'pred')
+    for filename, (true_labels, pred_labels) in SEG_PAIRS.items():
+        write_seg(os.path.join(true_dir, filename), true_labels)
+        write_seg(os.path.join(pred_dir, filename), pred_labels)
+    write_seg(os.path.join(true_dir, 'orphan.seg'), [1, 2])
+    return true_dir, pred_dir
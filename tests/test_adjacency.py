@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import seg_adjacency
+from seg_adjacency import Adjacency, load_adjacency, adjacency_metrics, ADJACENCY_CACHE_SUFFIX
+from seg_engine import SegComparisonEngine
+
+
+EDGES = [0, 1, 1, 2, 2, 0, 2, 3, 4, 4]
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_adjacency_from_edges(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_adjacency, 'np', None)
+    adjacency = Adjacency.from_edges(EDGES)
+    assert adjacency.faces == 5
+    assert sorted(adjacency.neighbors(2)) == [0, 1, 3]
+    assert list(adjacency.neighbors(4)) == []
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_adjacency_cache_round_trip(tmp_path, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_adjacency, 'np', None)
+    sidecar = tmp_path / 'm.adj'
+    sidecar.write_text("# 面邻接\n0 1\n1 2\n2 0\n2 3\n")
+    adjacency = load_adjacency(str(sidecar))
+    cache_path = str(tmp_path / ('m' + ADJACENCY_CACHE_SUFFIX))
+    assert os.path.exists(cache_path)
+    cached = load_adjacency(str(sidecar))
+    assert list(cached.indptr) == list(adjacency.indptr)
+    assert list(cached.indices) == list(adjacency.indices)
+    # 只有缓存时也可以使用
+    sidecar.unlink()
+    assert list(load_adjacency(str(sidecar)).indices) == list(adjacency.indices)
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_adjacency_metrics(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_adjacency, 'np', None)
+    adjacency = Adjacency.from_edges([0, 1, 1, 2, 2, 3])
+    metrics = adjacency_metrics(adjacency, [1, 1, 2, 2], [1, 2, 2, 1])
+    # 面1、2是边界面；面1预测为邻居的标签2，按容差视为正确
+    assert metrics['boundary_faces'] == 2
+    assert metrics['boundary_mismatches'] == 1
+    assert metrics['interior_faces'] == 2
+    assert metrics['interior_mismatches'] == 1
+    assert metrics['tolerant_mismatches'] == 1
+
+
+def test_engine_adjacency(seg_dirs):
+    true_dir, pred_dir = seg_dirs
+    with open(os.path.join(true_dir, 'minor.adj'), 'w') as f:
+        f.writelines(f"{i} {i + 1}\n" for i in range(99))
+    results = SegComparisonEngine(adjacency=True).compare_seg_directories(true_dir, pred_dir)
+    data = results['minor.seg']
+    # 标签在面49/50之间变化；错误的面50是边界面，面51在内部
+    assert data['boundary_faces'] == 2
+    assert data['boundary_mismatches'] == 1
+    assert data['interior_mismatches'] == 1
+    assert 'boundary_faces' not in results['perfect.seg']
@@ -0,0 +1,101 @@
+import csv
+import io
+import random
+
+import pytest
+
+import seg_align
+from seg_align import aligned_distance, banded_distance_python, trim_common
+from seg_engine import SegComparisonEngine, save_results_csv
+
+from conftest import write_seg
+
+
+def levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        row = [i]
+        for j, y in enumerate(b, 1):
+            row.append(min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (x != y)))
+        prev = row
+    return prev[-1]
+
+
+def random_pair(rng, length, edits):
+    a = [rng.randrange(4) for _ in range(length)]
+    b = list(a)
+    for _ in range(edits):
+        k = rng.randrange(len(b) + 1)
+        op = rng.randrange(3)
+        if op == 0 or not b:
+            b.insert(k, rng.randrange(4))
+        elif op == 1:
+            del b[min(k, len(b) - 1)]
+        else:
+            b[min(k, len(b) - 1)] = rng.randrange(4)
+    return a, b
+
+
+def test_trim_common():
+    assert trim_common([1, 2, 3, 4], [1, 9, 4]) == ([2, 3], [9])
+    assert trim_common([1, 2], [1, 2]) == ([], [])
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_aligned_distance_matches_full_dp(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_align, 'np', None)
+    rng = random.Random(1)
+    for _ in range(50):
+        a, b = random_pair(rng, rng.randrange(1, 80), rng.randrange(0, 10))
+        # 带宽覆盖整个矩阵时与完整DP一致
+        assert aligned_distance(a, b, band=len(a) + len(b)) == levenshtein(a, b)
+
+
+def test_numpy_blocks_match_python(monkeypatch):
+    np = pytest.importorskip('numpy')
+    # 分块很小时跨块的对角线扫描也要得到同样的结果
+    monkeypatch.setattr(seg_align, 'ALIGN_BLOCK_CELLS', 1)
+    rng = random.Random(2)
+    for band in (1, 3, 8):
+        for _ in range(20):
+            a, b = random_pair(rng, rng.randrange(300, 700), rng.randrange(0, 30))
+            expected = banded_distance_python(a, b, band)
+            assert seg_align.banded_distance_numpy(np.array(a), np.array(b), band) == expected
+
+
+def test_band_gives_upper_bound():
+    rng = random.Random(3)
+    a, b = random_pair(rng, 200, 40)
+    exact = levenshtein(a, b)
+    assert banded_distance_python(a, b, 1) >= exact
+    assert banded_distance_python(a, b, 400) == exact
+
+
+def test_engine_aligned_error_rate(tmp_path):
+    labels = [1] * 20 + [2] * 20
+    write_seg(str(tmp_path / 'ref' / 'a.seg'), labels)
+    # 在开头插入一个面：逐位比较时之后的标签都错开，对齐后只差一次插入
+    write_seg(str(tmp_path / 'pred' / 'a.seg'), [3] + labels)
+    results = SegComparisonEngine(align=True).compare_seg_directories(str(tmp_path / 'ref'), str(tmp_path / 'pred'))
+    data = results['a.seg']
+    assert data['aligned_mismatches'] == 1
+    assert data['aligned_error_rate'] == pytest.approx(1 / 41 * 100)
+
+
+def test_csv_includes_aligned_fields_from_any_row(tmp_path):
+    # 只有长度不一致的文件才有对齐字段，第一行没有时也要写入表头
+    write_seg(str(tmp_path / 'ref' / 'a.seg'), [1, 2, 3])
+    write_seg(str(tmp_path / 'pred' / 'a.seg'), [1, 2, 3])
+    write_seg(str(tmp_path / 'ref' / 'b.seg'), [1, 2, 3, 4])
+    write_seg(str(tmp_path / 'pred' / 'b.seg'), [1, 2, 4])
+    results = SegComparisonEngine(align=True).compare_seg_directories(str(tmp_path / 'ref'), str(tmp_path / 'pred'))
+    assert list(results) == ['a.seg', 'b.seg']
+    assert results['b.seg']['aligned_error_rate'] == pytest.approx(25.0)
+    out = io.StringIO()
+    save_results_csv(results, out)
+    rows = {row['filename']: row for row in csv.DictReader(io.StringIO(out.getvalue()))}
+    assert rows['a.seg']['aligned_error_rate'] == ''
+    assert float(rows['b.seg']['aligned_error_rate']) == pytest.approx(25.0)
@@ -0,0 +1,42 @@
+import pytest
+
+from seg_binary import write_binary_labels, load_binary_labels, convert_seg_file, fresh_binary_sibling
+from seg_engine import SegComparisonEngine
+
+from conftest import write_seg
+
+
+def test_binary_labels_round_trip(tmp_path):
+    pytest.importorskip('numpy')
+    for values in ([], [0, 1, 127], [-5, 300], [2 ** 40, -1]):
+        path = str(tmp_path / 'labels.segb')
+        write_binary_labels(path, values)
+        assert load_binary_labels(path).tolist() == values
+
+
+def test_convert_seg_file(tmp_path):
+    pytest.importorskip('numpy')
+    path = str(tmp_path / 'm.seg')
+    write_seg(path, [3, 1, 2, 2])
+    engine = SegComparisonEngine()
+    binary_path = convert_seg_file(path, engine.read_text_labels)
+    assert fresh_binary_sibling(path) == binary_path
+    assert load_binary_labels(binary_path).tolist() == [3, 1, 2, 2]
+    # 已有较新的二进制文件时跳过
+    assert convert_seg_file(path, engine.read_text_labels) is None
+
+    write_seg(str(tmp_path / 'names.seg'), ['hole', 'face'])
+    with pytest.raises(ValueError):
+        convert_seg_file(str(tmp_path / 'names.seg'), engine.read_text_labels)
+
+
+def test_binary_labels_compare_like_text(seg_dirs):
+    pytest.importorskip('numpy')
+    true_dir, pred_dir = seg_dirs
+    engine = SegComparisonEngine()
+    expected = engine.compare_seg_directories(true_dir, pred_dir)
+    engine.convert_directory(true_dir)
+    engine.convert_directory(pred_dir)
+    results = SegComparisonEngine().compare_seg_directories(true_dir, pred_dir)
+    for filename in expected:
+        assert dict(results[filename]) == dict(expected[filename])
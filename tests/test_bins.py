@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import seg_bins
+from seg_bins import Binning, BinningError, DEFAULT_BINNING
+from seg_engine import SegComparisonEngine, categorize_results
+
+
+RATES = [0, 0.5, 1, 1.0001, 3, 10, 49.9, 50, 50.1, 100]
+# 与原来的if/elif分类一致：错误率等于边界值时归入较低的分类
+DEFAULT_CODES = [0, 1, 1, 2, 2, 4, 8, 8, 9, 9]
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_default_binning(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_bins, 'np', None)
+    assert list(DEFAULT_BINNING.assign(RATES)) == DEFAULT_CODES
+    length_mismatch = [False] * (len(RATES) - 1) + [True]
+    codes = list(DEFAULT_BINNING.assign(RATES, length_mismatch))
+    assert codes[-1] == len(DEFAULT_BINNING.labels)
+    assert DEFAULT_BINNING.names()[codes[-1]] == "长度不一致"
+
+
+def test_config_round_trip(tmp_path):
+    binning = Binning([0, 5], ["完美", "可用", "不可用"], ["#00FF00", "#FFFF00", "#FF0000"])
+    path = str(tmp_path / 'bins.json')
+    binning.save(path)
+    loaded = Binning.load(path)
+    assert loaded.to_dict() == binning.to_dict()
+    assert loaded.names() == ["完美", "可用", "不可用", "长度不一致"]
+    assert loaded.color("不可用") == "#FF0000"
+    assert loaded.color("未知") is None
+    # 颜色和长度不一致分类可以省略
+    assert Binning.from_dict({'edges': [1], 'labels': ["好", "差"]}).colors == [None, None]
+
+
+@pytest.mark.parametrize('config', [
+    {'edges': [5, 1], 'labels': ["a", "b", "c"]},
+    {'edges': [1, 1], 'labels': ["a", "b", "c"]},
+    {'edges': [1], 'labels': ["a", "b", "c"]},
+    {'edges': [1], 'labels': ["a", "b"], 'colors': ["#000000"]},
+    {'edges': [1], 'labels': ["a", "a"]},
+    {'edges': [1], 'labels': ["a", "长度不一致"]},
+    {'labels': ["a"]},
+    {'edges': 3, 'labels': ["a"]},
+])
+def test_invalid_config(config):
+    with pytest.raises(BinningError):
+        Binning.from_dict(config)
+
+
+def test_invalid_config_file(tmp_path):
+    path = tmp_path / 'bins.json'
+    path.write_text(json.dumps({'edges': [2, 1], 'labels': ["a", "b", "c"]}))
+    with pytest.raises(BinningError):
+        Binning.load(str(path))
+
+
+def test_categorize_with_custom_binning(seg_dirs):
+    results = SegComparisonEngine().compare_seg_directories(*seg_dirs)
+    binning = Binning([0, 10], ["完美", "可用", "不可用"], None)
+    categories = categorize_results(results, binning)
+    assert list(categories) == binning.names()
+    assert categories["完美"]['files'] == ['perfect.seg']
+    assert categories["可用"]['files'] == ['minor.seg']
+    assert categories["不可用"]['files'] == ['names.seg']
+    assert categories["长度不一致"]['files'] == ['shorter.seg']
+    assert categories["可用"]['total_mismatches'] == 2
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+
+import seg_cache
+from seg_cache import ResultCache, CACHE_VERSION
+from seg_engine import SegComparisonEngine
+
+from conftest import write_seg
+
+
+def make_pair(tmp_path, pred_name='pred', pred_labels=(1, 2, 2)):
+    true_path = str(tmp_path / 'ref' / 'a.seg')
+    pred_path = str(tmp_path / pred_name / 'a.seg')
+    write_seg(true_path, [1, 2, 3])
+    write_seg(pred_path, list(pred_labels))
+    return true_path, pred_path
+
+
+def compare(true_path, pred_path):
+    return SegComparisonEngine().compare_file('a.seg', true_path, pred_path)[1]
+
+
+def touch(path, delta=10 ** 9):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + delta))
+
+
+def test_hit_and_invalidation(tmp_path):
+    true_path, pred_path = make_pair(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'), "full")
+    assert cache.get('a.seg', true_path, pred_path) is None
+    cache.put('a.seg', compare(true_path, pred_path))
+    data = cache.get('a.seg', true_path, pred_path)
+    assert data['mismatches'] == 1
+    assert list(data['mismatch_indices']) == [2]
+
+    # 内容变化（大小变化）后失效
+    write_seg(pred_path, [1, 2, 3, 4])
+    assert cache.get('a.seg', true_path, pred_path) is None
+    cache.close()
+
+    # 选项不同的条目视为失效
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'), "full+metrics")
+    assert cache.get('a.seg', true_path, pred_path) is None
+    cache.close()
+
+
+def test_prediction_directories_do_not_collide(tmp_path):
+    true_path, pred_path = make_pair(tmp_path, 'pred', (1, 2, 2))
+    _, other_path = make_pair(tmp_path, 'pred2', (1, 2, 3))
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    cache.put('a.seg', compare(true_path, pred_path))
+    cache.put('a.seg', compare(true_path, other_path))
+    assert cache.get('a.seg', true_path, pred_path)['mismatches'] == 1
+    assert cache.get('a.seg', true_path, other_path)['mismatches'] == 0
+    cache.close()
+
+
+def test_mtime_only_change(tmp_path):
+    true_path, pred_path = make_pair(tmp_path)
+    path = str(tmp_path / 'cache.sqlite')
+
+    cache = ResultCache(path)
+    cache.put('a.seg', compare(true_path, pred_path))
+    touch(pred_path)
+    # 默认不保存哈希，只有修改时间变化也视为失效
+    assert cache.get('a.seg', true_path, pred_path) is None
+    cache.close()
+
+    cache = ResultCache(path, verify=True)
+    cache.put('a.seg', compare(true_path, pred_path))
+    touch(pred_path)
+    assert cache.get('a.seg', true_path, pred_path) is not None
+    # 修改时间已刷新，再次查询不需要重新计算哈希
+    row = cache.conn.execute("SELECT pred_mtime FROM results").fetchone()
+    assert row[0] == os.stat(pred_path).st_mtime_ns
+    # 大小不变但内容变化
+    write_seg(pred_path, [1, 2, 1])
+    touch(pred_path)
+    assert cache.get('a.seg', true_path, pred_path) is None
+    cache.close()
+
+
+def test_puts_are_committed_periodically(tmp_path, monkeypatch):
+    monkeypatch.setattr(seg_cache, 'COMMIT_EVERY', 2)
+    true_path, pred_path = make_pair(tmp_path)
+    _, other_path = make_pair(tmp_path, 'pred2')
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResultCache(path)
+
+    def committed():
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        finally:
+            conn.close()
+    cache.put('a.seg', compare(true_path, pred_path))
+    assert committed() == 0
+    # 不调用close（例如进程被杀死）也能保留已提交的条目
+    cache.put('a.seg', compare(true_path, other_path))
+    assert committed() == 2
+    cache.close()
+
+
+def test_old_cache_version_is_dropped(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (true_path TEXT, filename TEXT, PRIMARY KEY (true_path, filename))")
+    conn.execute(f"PRAGMA user_version = {CACHE_VERSION - 1}")
+    conn.commit()
+    conn.close()
+    true_path, pred_path = make_pair(tmp_path)
+    cache = ResultCache(path)
+    cache.put('a.seg', compare(true_path, pred_path))
+    assert cache.get('a.seg', true_path, pred_path) is not None
+    cache.close()
+
+
+def test_engine_uses_cache(seg_dirs, tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    first = SegComparisonEngine(cache=True, cache_path=path).compare_seg_directories(*seg_dirs)
+
+    def not_cached(self, filename, true_path, pred_path):
+        raise AssertionError(f"{filename} 未命中缓存")
+    monkeypatch.setattr(SegComparisonEngine, 'compare_file', not_cached)
+    second = SegComparisonEngine(cache=True, cache_path=path).compare_seg_directories(*seg_dirs)
+    for filename in first:
+        assert dict(second[filename]) == dict(first[filename])
+
+
+def test_adjacency_change_invalidates_entry(seg_dirs, tmp_path):
+    true_dir, pred_dir = seg_dirs
+    sidecar = os.path.join(true_dir, 'minor.adj')
+    path = str(tmp_path / 'cache.sqlite')
+    with open(sidecar, 'w') as f:
+        f.writelines(f"{i} {i + 1}\n" for i in range(99))
+    first = SegComparisonEngine(cache=True, cache_path=path, adjacency=True).compare_seg_directories(*seg_dirs)
+    assert first['minor.seg']['boundary_faces'] == 2
+    # 去掉面49-50之间的边后不再有边界面，缓存的邻接指标不能沿用
+    with open(sidecar, 'w') as f:
+        f.writelines(f"{i} {i + 1}\n" for i in range(99) if i != 49)
+    second = SegComparisonEngine(cache=True, cache_path=path, adjacency=True).compare_seg_directories(*seg_dirs)
+    assert second['minor.seg']['boundary_faces'] == 0
+    assert dict(second['perfect.seg']) == dict(first['perfect.seg'])
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from seg_checkpoint import Checkpoint
+from seg_engine import SegComparisonEngine, SegComparisonCancelled
+
+from conftest import write_seg, check_results
+
+
+def interrupted_run(seg_dirs, checkpoint_path, stop_after=2):
+    # 完成stop_after个文件后取消，检查点保留
+    engine = SegComparisonEngine(checkpoint_path=checkpoint_path, progress_interval=0)
+    done = []
+
+    def on_file(filename):
+        done.append(filename)
+        if len(done) == stop_after:
+            engine.cancel()
+    engine.file_callback = on_file
+    with pytest.raises(SegComparisonCancelled) as e:
+        engine.compare_seg_directories(*seg_dirs)
+    return e.value.results
+
+
+def counting_compare(monkeypatch):
+    compared = []
+    compare_file = SegComparisonEngine.compare_file
+
+    def counted(self, filename, true_path, pred_path):
+        compared.append(filename)
+        return compare_file(self, filename, true_path, pred_path)
+    monkeypatch.setattr(SegComparisonEngine, 'compare_file', counted)
+    return compared
+
+
+def test_resume_skips_finished_files(seg_dirs, tmp_path, monkeypatch):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    partial = interrupted_run(seg_dirs, checkpoint_path)
+    assert len(partial) == 2
+    assert os.path.exists(checkpoint_path)
+    expected = SegComparisonEngine().compare_seg_directories(*seg_dirs)
+
+    compared = counting_compare(monkeypatch)
+    results = SegComparisonEngine(checkpoint_path=checkpoint_path, resume=True).compare_seg_directories(*seg_dirs)
+    assert sorted(compared) == sorted(set(expected) - set(partial))
+    for filename in expected:
+        assert dict(results[filename]) == dict(expected[filename])
+    # 正常完成后删除检查点
+    assert not os.path.exists(checkpoint_path)
+
+
+def test_changed_file_is_compared_again(seg_dirs, tmp_path, monkeypatch):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    partial = interrupted_run(seg_dirs, checkpoint_path)
+    changed = next(iter(partial))
+    write_seg(os.path.join(seg_dirs[1], changed), [0] * 200)
+
+    compared = counting_compare(monkeypatch)
+    results = SegComparisonEngine(checkpoint_path=checkpoint_path, resume=True).compare_seg_directories(*seg_dirs)
+    assert changed in compared
+    assert results[changed]['length_diff'] != partial[changed]['length_diff']
+
+
+def test_options_must_match(seg_dirs, tmp_path, monkeypatch):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    interrupted_run(seg_dirs, checkpoint_path)
+    compared = counting_compare(monkeypatch)
+    SegComparisonEngine(checkpoint_path=checkpoint_path, resume=True, metrics=True).compare_seg_directories(*seg_dirs)
+    assert len(compared) == 4
+
+
+def test_truncated_line_is_ignored(seg_dirs, tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    partial = interrupted_run(seg_dirs, checkpoint_path)
+    with open(checkpoint_path, 'a', encoding='utf-8') as f:
+        f.write('{"filename": "minor.seg", "total_lab')
+    checkpoint = Checkpoint(checkpoint_path, *seg_dirs, SegComparisonEngine().cache_options())
+    entries = checkpoint.load()
+    assert sorted(entries) == sorted(partial)
+    filename = next(iter(partial))
+    data = checkpoint.restore(entries[filename], partial[filename]['true_path'], partial[filename]['pred_path'])
+    assert list(data['mismatch_indices']) == list(partial[filename]['mismatch_indices'])
+
+
+def test_checkpoint_write_failure_is_not_fatal(seg_dirs, tmp_path):
+    blocker = tmp_path / 'blocker'
+    blocker.write_text("")
+    engine = SegComparisonEngine(checkpoint_path=str(blocker / 'checkpoint.jsonl'))
+    results = engine.compare_seg_directories(*seg_dirs)
+    check_results(results)
+    assert len(engine.warnings) == 1
@@ -0,0 +1,38 @@
+import os
+import gzip
+import bz2
+import lzma
+
+import pytest
+
+from seg_engine import SegComparisonEngine
+
+from conftest import SEG_PAIRS, check_results
+
+
+@pytest.mark.parametrize('suffix, opener', [('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)])
+@pytest.mark.parametrize('streaming', [False, True])
+def test_compressed_input(seg_dirs, suffix, opener, streaming):
+    true_dir, pred_dir = seg_dirs
+    for filename in SEG_PAIRS:
+        path = os.path.join(pred_dir, filename)
+        with open(path, 'rb') as src, opener(path + suffix, 'wb') as dst:
+            dst.write(src.read())
+        os.remove(path)
+    results = SegComparisonEngine(streaming=streaming).compare_seg_directories(true_dir, pred_dir)
+    check_results(results)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_unreadable_file_is_failed(seg_dirs, streaming):
+    true_dir, pred_dir = seg_dirs
+    path = os.path.join(pred_dir, 'minor.seg')
+    with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+        dst.write(src.read())
+    os.remove(path)
+    with open(path + '.gz', 'r+b') as f:
+        f.truncate(20)
+    results = SegComparisonEngine(streaming=streaming).compare_seg_directories(true_dir, pred_dir)
+    assert results.failed == ['minor.seg']
+    assert 'minor.seg' not in results
+    assert len(results) == 3
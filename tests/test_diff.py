@@ -0,0 +1,117 @@
+import io
+import csv
+import json
+
+import pytest
+
+from seg_diff import ResultsDiff, load_run, DIFF_FIELDS
+from seg_results import ResultStore
+from seg_session import save_session, SessionError
+from seg_engine import save_results_json
+
+
+def store(rates):
+    results = ResultStore()
+    for filename, (mismatches, length_diff) in rates.items():
+        results[filename] = {
+            'total_labels': 100,
+            'mismatches': mismatches,
+            'length_diff': length_diff,
+            'error_rate': float(mismatches),
+            'mismatch_indices': list(range(mismatches)),
+            'true_path': f'/ref/{filename}',
+            'pred_path': f'/pred/{filename}',
+            'true_filename': filename,
+            'pred_filename': filename
+        }
+    return results
+
+
+BASE = store({
+    'broken.seg': (0, 0),
+    'worse.seg': (2, 0),
+    'same.seg': (5, 0),
+    'better.seg': (20, 0),
+    'fixed.seg': (3, 0),
+    'base_only.seg': (1, 0),
+})
+NEW = store({
+    'broken.seg': (1, 0),
+    'worse.seg': (6, 0),
+    'same.seg': (5, 0),
+    'better.seg': (4, 0),
+    'fixed.seg': (0, 0),
+    'new_only.seg': (0, 0),
+})
+
+
+def test_statuses():
+    diff = ResultsDiff(BASE, NEW)
+    statuses = {diff.names[row]: diff.status_name(row) for row in range(len(diff))}
+    assert statuses == {
+        'broken.seg': 'newly_broken',
+        'worse.seg': 'regressed',
+        'same.seg': 'unchanged',
+        'better.seg': 'improved',
+        'fixed.seg': 'fixed',
+    }
+    assert diff.base_only == ['base_only.seg']
+    assert diff.new_only == ['new_only.seg']
+    assert diff.reference_changed == 0
+    counts = diff.status_counts()
+    assert counts['regressed'] == counts['improved'] == 1
+
+
+def test_threshold_and_length_mismatch():
+    diff = ResultsDiff(BASE, NEW, threshold=5)
+    statuses = {diff.names[row]: diff.status_name(row) for row in range(len(diff))}
+    assert statuses['worse.seg'] == 'unchanged'
+    assert statuses['better.seg'] == 'improved'
+
+    # 长度不一致的文件不算完全匹配
+    diff = ResultsDiff(store({'a.seg': (0, 2)}), store({'a.seg': (0, 0)}))
+    assert diff.status_name(0) == 'fixed'
+    assert diff.category_changes() == [("长度不一致", "完美匹配(0%)", 1)]
+
+
+def test_sorted_rows_and_summary():
+    diff = ResultsDiff(BASE, NEW)
+    order = [diff.names[row] for row in diff.sorted_rows()]
+    assert order[0] == 'worse.seg'
+    assert order[-1] == 'better.seg'
+    summary = diff.summary()
+    assert summary['files'] == 5
+    # 只统计共同文件，base_only.seg的不匹配不计入
+    assert summary['base_error_rate'] == pytest.approx(30 / 500 * 100)
+    assert summary['delta'] == pytest.approx((16 - 30) / 500 * 100)
+
+
+def test_reports():
+    diff = ResultsDiff(BASE, NEW)
+    out = io.StringIO()
+    diff.save_csv(out)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == DIFF_FIELDS
+    assert rows[1][0] == 'worse.seg'
+    out = io.StringIO()
+    diff.save_json(out)
+    content = json.loads(out.getvalue())
+    assert content['summary']['newly_broken'] == 1
+    assert len(content['files']) == 5
+
+
+def test_load_run_formats(tmp_path):
+    session_path = str(tmp_path / 'run.segsession')
+    save_session(NEW, session_path)
+    json_path = str(tmp_path / 'run.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        save_results_json(NEW, f)
+    for path in (session_path, json_path):
+        loaded = load_run(path)
+        assert list(loaded) == list(NEW)
+        assert loaded['worse.seg']['mismatches'] == 6
+
+    bad_path = tmp_path / 'bad.json'
+    bad_path.write_text("[1, 2")
+    with pytest.raises(SessionError):
+        load_run(str(bad_path))
@@ -0,0 +1,61 @@
+import json
+import io
+
+import pytest
+
+from seg_engine import (SegComparisonEngine, SegComparisonError, results_summary, save_results_json,
+                        categorize_results)
+
+from conftest import write_seg, check_results
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'workers': 2, 'chunksize': 1},
+    {'streaming': True, 'block_size': 3},
+    {'metrics': True},
+])
+def test_compare_directories(seg_dirs, options):
+    results = SegComparisonEngine(**options).compare_seg_directories(*seg_dirs)
+    check_results(results)
+    assert results.orphans == {'true_only': ['orphan.seg'], 'pred_only': []}
+    assert results.failed == []
+
+
+def test_summary_and_categories(seg_dirs):
+    results = SegComparisonEngine().compare_seg_directories(*seg_dirs)
+    summary = results_summary(results)
+    assert summary['files'] == 4
+    assert summary['total_labels'] == 115
+    assert summary['total_mismatches'] == 4
+    assert summary['total_length_diff'] == 2
+    categories = categorize_results(results)
+    assert categories["完美匹配(0%)"]['files'] == ['perfect.seg']
+    assert categories["长度不一致"]['files'] == ['shorter.seg']
+
+
+def test_json_output_lists_indices(seg_dirs):
+    results = SegComparisonEngine().compare_seg_directories(*seg_dirs)
+    out = io.StringIO()
+    save_results_json(results, out)
+    content = json.loads(out.getvalue())
+    assert content['minor.seg']['mismatch_indices'] == [50, 51]
+
+
+def test_no_matching_files(tmp_path):
+    write_seg(str(tmp_path / 'ref' / 'a.seg'), [1])
+    write_seg(str(tmp_path / 'pred' / 'b.seg'), [1])
+    with pytest.raises(SegComparisonError):
+        SegComparisonEngine().compare_seg_directories(str(tmp_path / 'ref'), str(tmp_path / 'pred'))
+
+
+
+
+
+def test_compare_errors_propagate(seg_dirs, monkeypatch):
+    # 只有读取失败记为失败文件，比较本身出错时照常抛出
+    def broken(self, true_labels, pred_labels):
+        raise RuntimeError("broken")
+    monkeypatch.setattr(SegComparisonEngine, 'compare_labels', broken)
+    with pytest.raises(RuntimeError):
+        SegComparisonEngine().compare_seg_directories(*seg_dirs)
@@ -0,0 +1,73 @@
+import os
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+from seg_engine import SegComparisonEngine
+from seg_export import export_category_files
+
+
+FILES = ['minor.seg', 'names.seg']
+
+
+@pytest.fixture
+def results(seg_dirs):
+    return SegComparisonEngine().compare_seg_directories(*seg_dirs)
+
+
+@pytest.mark.parametrize('mode', ['copy', 'hardlink'])
+def test_export_files(results, tmp_path, mode):
+    category_dir = str(tmp_path / 'out' / 'minor')
+    progress = []
+    report = export_category_files(results, FILES, category_dir, mode=mode,
+                                   progress_callback=lambda done, total: progress.append((done, total)))
+    assert (report['ref'], report['pred'], report['errors'], report['cancelled']) == (2, 2, [], False)
+    assert progress[-1] == (4, 4)
+    for filename in FILES:
+        for subdir, key in (('ref', 'true_path'), ('pred', 'pred_path')):
+            path = os.path.join(category_dir, subdir, filename)
+            with open(path, 'rb') as f, open(results[filename][key], 'rb') as src:
+                assert f.read() == src.read()
+            if mode == 'hardlink':
+                assert os.path.samefile(path, results[filename][key])
+
+
+def test_export_reference_only(results, tmp_path):
+    category_dir = str(tmp_path / 'minor')
+    report = export_category_files(results, FILES, category_dir, copy_pred=False)
+    assert (report['ref'], report['pred']) == (2, 0)
+    assert not os.path.exists(os.path.join(category_dir, 'pred'))
+
+
+@pytest.mark.parametrize('archive, suffix', [('zip', '.zip'), ('tar', '.tar.gz')])
+def test_export_archive(results, tmp_path, archive, suffix):
+    category_dir = str(tmp_path / 'minor')
+    report = export_category_files(results, FILES, category_dir, archive=archive)
+    assert report['target'] == category_dir + suffix
+    assert (report['ref'], report['pred'], report['errors']) == (2, 2, [])
+    if archive == 'zip':
+        with zipfile.ZipFile(report['target']) as f:
+            names = f.namelist()
+    else:
+        with tarfile.open(report['target'], 'r:gz') as f:
+            names = f.getnames()
+    assert sorted(names) == sorted(f"{subdir}/{name}" for subdir in ('ref', 'pred') for name in FILES)
+
+
+def test_missing_source_is_reported(results, tmp_path):
+    os.remove(results['minor.seg']['pred_path'])
+    report = export_category_files(results, FILES, str(tmp_path / 'minor'))
+    assert report['pred'] == 1
+    assert [name for name, _ in report['errors']] == ['pred/minor.seg']
+
+
+@pytest.mark.parametrize('archive', [None, 'zip'])
+def test_cancelled_export(results, tmp_path, archive):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    report = export_category_files(results, FILES, str(tmp_path / 'minor'), archive=archive,
+                                   cancel_event=cancel_event)
+    assert report['cancelled']
+    assert report['ref'] + report['pred'] == 0
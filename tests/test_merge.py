@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from seg_engine import SegComparisonEngine
+from seg_merge import (results_header, save_results_file, load_results_file, merge_results_files,
+                       DirectoryMismatchError)
+from seg_shard import parse_shard, shard_index, shard_path, ShardError
+
+
+SHARDS = 3
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    for text in ("4/4", "-1/2", "1", "a/b", "0/0"):
+        with pytest.raises(ShardError):
+            parse_shard(text)
+
+
+def test_shard_path():
+    assert shard_path('/p/.cache.sqlite', None) == '/p/.cache.sqlite'
+    assert shard_path('/p/cache.sqlite', (1, 4)) == '/p/cache.1of4.sqlite'
+
+
+def test_shards_partition_files(seg_dirs):
+    names = set()
+    for index in range(SHARDS):
+        results = SegComparisonEngine(shard=(index, SHARDS)).compare_seg_directories(*seg_dirs)
+        assert all(shard_index(filename, SHARDS) == index for filename in results)
+        assert names.isdisjoint(results)
+        names.update(results)
+    assert names == set(SegComparisonEngine().compare_seg_directories(*seg_dirs))
+
+
+def write_shards(seg_dirs, tmp_path, metrics=True):
+    paths = []
+    for index in range(SHARDS):
+        engine = SegComparisonEngine(shard=(index, SHARDS), metrics=metrics)
+        results = engine.compare_seg_directories(*seg_dirs)
+        path = str(tmp_path / f'shard{index}.json')
+        save_results_file(results, path, results_header(*seg_dirs, engine.cache_options(), (index, SHARDS)))
+        paths.append(path)
+    return paths
+
+
+def test_results_file_round_trip(seg_dirs, tmp_path):
+    engine = SegComparisonEngine(metrics=True)
+    results = engine.compare_seg_directories(*seg_dirs)
+    path = str(tmp_path / 'results.json')
+    save_results_file(results, path, results_header(*seg_dirs, engine.cache_options()))
+    header, loaded = load_results_file(path)
+    assert header['shard_count'] == 1
+    assert header['summary']['files'] == 4
+    assert list(loaded) == list(results)
+    for filename in results:
+        assert dict(loaded[filename]) == dict(results[filename])
+    assert loaded.confusion.to_list() == results.confusion.to_list()
+    assert loaded.orphans == results.orphans
+
+
+def test_merge_matches_unsharded(seg_dirs, tmp_path):
+    expected = SegComparisonEngine(metrics=True).compare_seg_directories(*seg_dirs)
+    header, merged = merge_results_files(write_shards(seg_dirs, tmp_path))
+    assert header['shards'] == list(range(SHARDS))
+    assert 'missing_shards' not in header
+    assert list(merged) == list(expected)
+    for filename in expected:
+        assert dict(merged[filename]) == dict(expected[filename])
+    assert sorted(merged.confusion.to_list()) == sorted(expected.confusion.to_list())
+    assert merged.orphans == expected.orphans
+
+
+def test_merge_takes_confusion_from_any_shard(seg_dirs, tmp_path):
+    paths = write_shards(seg_dirs, tmp_path)
+    expected = merge_results_files(paths[1:], allow_missing=True)[1].confusion
+    with open(paths[0], encoding='utf-8') as f:
+        content = json.load(f)
+    content['confusion'] = None
+    with open(paths[0], 'w', encoding='utf-8') as f:
+        json.dump(content, f)
+    _, merged = merge_results_files(paths)
+    assert sorted(merged.confusion.to_list()) == sorted(expected.to_list())
+
+
+def test_merge_rejects_inconsistent_inputs(seg_dirs, tmp_path):
+    paths = write_shards(seg_dirs, tmp_path)
+    with pytest.raises(ShardError):
+        merge_results_files(paths[:2])
+    header, _ = merge_results_files(paths[:2], allow_missing=True)
+    assert header['missing_shards'] == [2]
+    with pytest.raises(ShardError):
+        merge_results_files(paths + [paths[0]])
+
+    with open(paths[1], encoding='utf-8') as f:
+        content = json.load(f)
+    content['pred_dir'] = '/elsewhere/pred'
+    with open(paths[1], 'w', encoding='utf-8') as f:
+        json.dump(content, f)
+    with pytest.raises(DirectoryMismatchError):
+        merge_results_files(paths)
+    header, merged = merge_results_files(paths, allow_dir_mismatch=True)
+    assert header['pred_dir'] != '/elsewhere/pred'
+    assert len(merged) == 4
+
+
+def test_merge_rejects_different_options(seg_dirs, tmp_path):
+    paths = write_shards(seg_dirs, tmp_path)
+    (tmp_path / 'plain').mkdir()
+    plain = write_shards(seg_dirs, tmp_path / 'plain', metrics=False)
+    with pytest.raises(ShardError):
+        merge_results_files(paths[:2] + plain[2:])
@@ -0,0 +1,66 @@
+import io
+import os
+
+import pytest
+
+from seg_engine import SegComparisonEngine, leaderboard, save_leaderboard_csv
+
+from conftest import write_seg, SEG_PAIRS
+
+
+@pytest.fixture
+def model_dirs(seg_dirs, tmp_path):
+    # 第二个模型每个文件的第一个标签都预测错误
+    true_dir, pred_dir = seg_dirs
+    worse_dir = str(tmp_path / 'worse')
+    for filename, (_, pred_labels) in SEG_PAIRS.items():
+        write_seg(os.path.join(worse_dir, filename), ['x'] + pred_labels[1:])
+    empty_dir = str(tmp_path / 'empty')
+    write_seg(os.path.join(empty_dir, 'unrelated.seg'), [1])
+    return true_dir, [worse_dir, pred_dir, empty_dir]
+
+
+@pytest.mark.parametrize('options', [{}, {'workers': 2, 'chunksize': 1}])
+def test_compare_multi_matches_single_runs(model_dirs, options):
+    true_dir, pred_dirs = model_dirs
+    results = SegComparisonEngine(**options).compare_multi(true_dir, pred_dirs)
+    assert list(results) == pred_dirs
+    for pred_dir in pred_dirs[:2]:
+        expected = SegComparisonEngine().compare_seg_directories(true_dir, pred_dir)
+        assert list(results[pred_dir]) == list(expected)
+        for filename in expected:
+            assert dict(results[pred_dir][filename]) == dict(expected[filename])
+    # 没有共同文件的预测目录得到空结果
+    assert len(results[pred_dirs[2]]) == 0
+
+
+def test_reference_is_read_once(model_dirs, monkeypatch):
+    true_dir, pred_dirs = model_dirs
+    reads = []
+    read_labels = SegComparisonEngine.read_labels
+
+    def counted(self, path):
+        reads.append(path)
+        return read_labels(self, path)
+    monkeypatch.setattr(SegComparisonEngine, 'read_labels', counted)
+    SegComparisonEngine().compare_multi(true_dir, pred_dirs[:2])
+    true_reads = [path for path in reads if path.startswith(true_dir)]
+    assert sorted(true_reads) == sorted(os.path.join(true_dir, filename) for filename in SEG_PAIRS)
+
+
+def test_leaderboard(model_dirs):
+    true_dir, pred_dirs = model_dirs
+    results = SegComparisonEngine(metrics=True).compare_multi(true_dir, pred_dirs)
+    rows = leaderboard(results)
+    assert [row['model'] for row in rows] == [pred_dirs[1], pred_dirs[0], pred_dirs[2]]
+    assert rows[0]['mismatches'] == 4
+    assert rows[0]['完美匹配(0%)'] == 1
+    assert rows[1]['完美匹配(0%)'] == 0
+    assert rows[2]['files'] == 0
+    assert rows[0]['mean_iou'] > rows[1]['mean_iou']
+
+    out = io.StringIO()
+    save_leaderboard_csv(rows, out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith('rank,model,files')
+    assert lines[1].startswith(f'1,{pred_dirs[1]},4,')
@@ -0,0 +1,33 @@
+import pytest
+
+from seg_engine import SegComparisonEngine
+
+
+def run(seg_dirs, **options):
+    batches = []
+    progress = []
+    engine = SegComparisonEngine(results_callback=batches.append, progress_callback=progress.append, **options)
+    results = engine.compare_seg_directories(*seg_dirs)
+    return results, batches, progress
+
+
+@pytest.mark.parametrize('options', [{}, {'workers': 2, 'chunksize': 1}])
+def test_throttled_batches(seg_dirs, options):
+    # 间隔很长时只在第一个文件和结束时各通知一次，其余结果合并为一批
+    results, batches, progress = run(seg_dirs, progress_interval=3600, **options)
+    assert len(batches) <= 2
+    streamed = [item for batch in batches for item in batch]
+    assert sorted(filename for filename, _ in streamed) == sorted(results)
+    for filename, data in streamed:
+        expected = results[filename]
+        assert data['mismatches'] == expected['mismatches']
+        assert list(data['mismatch_indices']) == list(expected['mismatch_indices'])
+    assert len(progress) <= 2
+    assert progress[-1] == 100
+
+
+def test_unthrottled_batches(seg_dirs):
+    results, batches, progress = run(seg_dirs, progress_interval=0)
+    assert [len(batch) for batch in batches] == [1] * len(results)
+    # 结束时再强制通知一次
+    assert progress == [25, 50, 75, 100, 100]
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from seg_results import ResultStore, encode_runs, decode_runs, RUNS_COMPACT_MIN
+
+
+def record(indices, total_labels=1000, **extra):
+    return dict({
+        'total_labels': total_labels,
+        'mismatches': len(indices),
+        'length_diff': 0,
+        'error_rate': len(indices) / total_labels * 100,
+        'mismatch_indices': indices,
+        'true_path': '/ref/a.seg',
+        'pred_path': '/pred/a.seg',
+        'true_filename': 'a.seg',
+        'pred_filename': 'a.seg'
+    }, **extra)
+
+
+@pytest.mark.parametrize('indices', [[], [0], [3, 4, 5, 9], list(range(100)), [1, 3, 5, 7]])
+def test_runs_round_trip(indices):
+    runs = encode_runs(indices)
+    assert list(decode_runs(runs)) == indices
+    assert len(runs) % 2 == 0
+
+
+def test_runs_encoding():
+    assert list(encode_runs([3, 4, 5, 9])) == [3, 3, 9, 1]
+
+
+def test_store_mapping():
+    results = ResultStore()
+    results['b.seg'] = record([1, 2], iou=0.5)
+    results['a.seg'] = record([])
+    assert list(results) == ['b.seg', 'a.seg']
+    assert list(results['b.seg']['mismatch_indices']) == [1, 2]
+    assert results['b.seg']['iou'] == 0.5
+    assert 'iou' not in results['a.seg']
+    assert results['a.seg']['true_path'] == '/ref/a.seg'
+    results.reorder(sorted(results))
+    assert list(results) == ['a.seg', 'b.seg']
+    assert list(results['b.seg']['mismatch_indices']) == [1, 2]
+    del results['a.seg']
+    assert list(results) == ['b.seg']
+
+
+def test_overwrite_reuses_run_storage():
+    results = ResultStore()
+    results['a.seg'] = record([1, 2, 10, 20])
+    results['b.seg'] = record([5])
+    size = len(results._runs)
+    for _ in range(100):
+        results['a.seg'] = record([1, 10])
+    assert len(results._runs) == size
+    assert list(results['a.seg']['mismatch_indices']) == [1, 10]
+    assert list(results['b.seg']['mismatch_indices']) == [5]
+
+
+def test_overwrite_compacts_runs():
+    rng = random.Random(0)
+    results = ResultStore()
+    expected = {}
+    peak = 0
+    for step in range(5000):
+        filename = f"f{rng.randrange(20)}.seg"
+        indices = sorted(rng.sample(range(1000), rng.randrange(200)))
+        results[filename] = record(indices)
+        expected[filename] = indices
+        peak = max(peak, len(results._runs))
+    # 不整理时会累积近百万个值；整理后遗留部分不超过阈值或总量的一半
+    assert peak < 4 * (RUNS_COMPACT_MIN + 20 * 200)
+    for filename, indices in expected.items():
+        assert list(results[filename]['mismatch_indices']) == indices
+
+
+def test_overwrite_clears_stale_extra_fields():
+    results = ResultStore()
+    results['a.seg'] = record([1], aligned_error_rate=3.0, mean_iou=0.9)
+    results['a.seg'] = record([1], mean_iou=0.8)
+    assert 'aligned_error_rate' not in results['a.seg']
+    assert results['a.seg']['mean_iou'] == 0.8
+
+
+def test_columns_round_trip():
+    results = ResultStore()
+    results['a.seg'] = record([1, 2, 3], mean_iou=0.5)
+    results['b.seg'] = record([7])
+    results['a.seg'] = record([4, 8])
+    copy = ResultStore.from_columns(results.to_columns())
+    assert list(copy) == list(results)
+    for filename in results:
+        assert dict(copy[filename]) == dict(results[filename])
+
+
+def test_reorder_permutes_rows_in_place():
+    results = ResultStore()
+    results['c.seg'] = record([7, 8], mean_iou=0.3)
+    results['a.seg'] = record([1])
+    results['b.seg'] = record([2, 4], mean_iou=0.1)
+    expected = {filename: dict(results[filename]) for filename in results}
+    runs = results._runs
+    results.reorder(sorted(results))
+    assert list(results) == ['a.seg', 'b.seg', 'c.seg']
+    # 行程编码不复制，只重排各行的起点
+    assert results._runs is runs
+    for filename, data in expected.items():
+        assert dict(results[filename]) == data
+    assert results.column('mean_iou', None) == [None, 0.1, 0.3]
+
+    del results['b.seg']
+    assert list(results) == ['a.seg', 'c.seg']
+    assert dict(results['c.seg']) == expected['c.seg']
+    copy = ResultStore.from_columns(results.to_columns())
+    assert list(copy._runs) == [1, 1, 7, 2]
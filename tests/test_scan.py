@@ -0,0 +1,77 @@
+import os
+import gzip
+
+import pytest
+
+from seg_engine import SegComparisonEngine
+from seg_scan import scan_seg_files, PairScanner
+
+from conftest import write_seg
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with (gzip.open if path.endswith('.gz') else open)(path, 'wt') as f:
+        f.write("1\n")
+
+
+@pytest.fixture
+def nested_dirs(tmp_path):
+    true_dir = str(tmp_path / 'ref')
+    pred_dir = str(tmp_path / 'pred')
+    for relpath in ('top.seg', 'a/one.seg', 'a/b/two.seg', 'b/one.seg', 'a/ref_only.seg'):
+        touch(os.path.join(true_dir, *relpath.split('/')))
+    for relpath in ('top.seg', 'a/one.seg', 'a/b/two.seg.gz', 'b/one.seg', 'c/pred_only.seg'):
+        touch(os.path.join(pred_dir, *relpath.split('/')))
+    touch(os.path.join(true_dir, 'notes.txt'))
+    return true_dir, pred_dir
+
+
+def test_scan_seg_files(nested_dirs):
+    true_dir, pred_dir = nested_dirs
+    assert sorted(scan_seg_files(true_dir)) == ['top.seg']
+    assert sorted(scan_seg_files(true_dir, recursive=True)) == [
+        'a/b/two.seg', 'a/one.seg', 'a/ref_only.seg', 'b/one.seg', 'top.seg']
+    assert sorted(scan_seg_files(pred_dir, recursive=True)) == [
+        'a/b/two.seg.gz', 'a/one.seg', 'b/one.seg', 'c/pred_only.seg', 'top.seg']
+
+
+def test_uncompressed_file_is_preferred(tmp_path):
+    touch(str(tmp_path / 'm.seg.gz'))
+    touch(str(tmp_path / 'm.seg'))
+    touch(str(tmp_path / 'n.seg.xz'))
+    touch(str(tmp_path / 'n.seg.bz2'))
+    assert sorted(scan_seg_files(str(tmp_path))) == ['m.seg', 'n.seg.bz2']
+
+
+def test_pair_scanner_pairs_by_relative_path(nested_dirs):
+    true_dir, pred_dir = nested_dirs
+    scanner = PairScanner(true_dir, pred_dir, recursive=True)
+    pairs = sorted(scanner)
+    assert [key for key, _, _ in pairs] == ['a/b/two.seg', 'a/one.seg', 'b/one.seg', 'top.seg']
+    # 同名文件在不同子目录下分别配对
+    assert pairs[1][1] == os.path.join(true_dir, 'a', 'one.seg')
+    assert pairs[2][2] == os.path.join(pred_dir, 'b', 'one.seg')
+    # 只有一侧是压缩文件时按去掉压缩后缀的路径配对
+    assert pairs[0][2] == os.path.join(pred_dir, 'a', 'b', 'two.seg.gz')
+    assert scanner.total == 4
+    assert scanner.orphans() == {'true_only': ['a/ref_only.seg'], 'pred_only': ['c/pred_only.seg']}
+
+
+def test_pair_scanner_top_level_only(nested_dirs):
+    scanner = PairScanner(*nested_dirs)
+    assert [key for key, _, _ in scanner] == ['top.seg']
+    assert scanner.orphans() == {'true_only': [], 'pred_only': []}
+
+
+def test_missing_directory_raises(tmp_path):
+    write_seg(str(tmp_path / 'ref' / 'a.seg'), [1])
+    with pytest.raises(OSError):
+        list(PairScanner(str(tmp_path / 'ref'), str(tmp_path / 'missing')))
+
+
+def test_engine_recursive(nested_dirs):
+    results = SegComparisonEngine(recursive=True).compare_seg_directories(*nested_dirs)
+    assert list(results) == ['a/b/two.seg', 'a/one.seg', 'b/one.seg', 'top.seg']
+    assert results.orphans == {'true_only': ['a/ref_only.seg'], 'pred_only': ['c/pred_only.seg']}
+    assert results.failed == []
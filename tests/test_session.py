@@ -0,0 +1,61 @@
+import pytest
+
+from seg_engine import SegComparisonEngine
+from seg_session import save_session, load_session, session_info, SessionRuns, SessionError
+from seg_bins import Binning
+
+
+def test_session_round_trip(seg_dirs, tmp_path):
+    results = SegComparisonEngine(metrics=True, profile=True).compare_seg_directories(*seg_dirs)
+    binning = Binning([0, 10], ["好", "中", "差"], None)
+    path = str(tmp_path / 'run.segsession')
+    save_session(results, path, {'true_dir': seg_dirs[0]}, binning)
+
+    manifest, loaded = load_session(path)
+    assert manifest['info'] == {'true_dir': seg_dirs[0]}
+    assert manifest['summary']['files'] == 4
+    assert Binning.from_dict(manifest['binning']).names() == binning.names()
+    assert session_info(path)['summary'] == manifest['summary']
+    # 不匹配位置、附加字段和性能记录延迟读取
+    assert isinstance(loaded._runs, SessionRuns)
+    assert all(column.values is None for column in loaded._extra.values())
+    assert loaded._profile_loader is not None
+    assert list(loaded) == list(results)
+    for filename in results:
+        assert dict(loaded[filename]) == dict(results[filename])
+    assert loaded.confusion.to_list() == results.confusion.to_list()
+    assert loaded.orphans == results.orphans
+    assert loaded.failed == results.failed
+    assert loaded.profile.to_dict() == results.profile.to_dict()
+
+
+def test_session_overwrite_in_place(seg_dirs, tmp_path):
+    results = SegComparisonEngine().compare_seg_directories(*seg_dirs)
+    path = str(tmp_path / 'run.segsession')
+    save_session(results, path)
+    _, loaded = load_session(path)
+    loaded['extra.seg'] = dict(results['minor.seg'])
+    save_session(loaded, path)
+    _, reloaded = load_session(path)
+    assert list(reloaded['extra.seg']['mismatch_indices']) == [50, 51]
+    assert list(reloaded['minor.seg']['mismatch_indices']) == [50, 51]
+
+
+def test_lazy_fields_survive_overwrite(seg_dirs, tmp_path):
+    results = SegComparisonEngine(metrics=True, profile=True).compare_seg_directories(*seg_dirs)
+    path = str(tmp_path / 'run.segsession')
+    save_session(results, path)
+    _, loaded = load_session(path)
+    # 未读取的附加字段和性能记录在覆盖保存后仍然有效
+    save_session(loaded, path)
+    assert loaded['minor.seg']['mean_iou'] == results['minor.seg']['mean_iou']
+    assert loaded.profile.to_dict() == results.profile.to_dict()
+    _, reloaded = load_session(path)
+    assert dict(reloaded['names.seg']) == dict(results['names.seg'])
+
+
+def test_invalid_session(tmp_path):
+    path = tmp_path / 'bad.segsession'
+    path.write_bytes(b'not a session file at all, just text padding')
+    with pytest.raises(SessionError):
+        load_session(str(path))
@@ -0,0 +1,57 @@
+from seg_engine import SegComparisonEngine
+from seg_spans import SpanStore
+
+from conftest import check_results
+
+
+def test_spans(seg_dirs):
+    engine = SegComparisonEngine(spans=True)
+    results = engine.compare_seg_directories(*seg_dirs)
+    store = SpanStore(results.spans_path)
+    try:
+        data = results['minor.seg']
+        assert store.count('minor.seg', data['true_path'], data['pred_path']) == 1
+        assert store.page('minor.seg', data['true_path'], 0, 10) == [(50, 2, '2', '3')]
+        data = results['names.seg']
+        assert store.page('names.seg', data['true_path'], 0, 10) == [(1, 1, 'face', 'fillet')]
+    finally:
+        store.close()
+
+
+def test_span_store_failure_is_not_fatal(seg_dirs, tmp_path):
+    blocker = tmp_path / 'blocker'
+    blocker.write_text("")
+    engine = SegComparisonEngine(spans_path=str(blocker / 'spans.sqlite'))
+    results = engine.compare_seg_directories(*seg_dirs)
+    check_results(results)
+    assert results.spans_path is None
+    assert len(engine.warnings) == 1
+
+
+def test_streaming_spans_are_bounded(seg_dirs):
+    # 不匹配段超过index_limit的文件不保存，查看时再按需计算
+    engine = SegComparisonEngine(spans=True, streaming=True, block_size=2, index_limit=0)
+    results = engine.compare_seg_directories(*seg_dirs)
+    store = SpanStore(results.spans_path)
+    try:
+        data = results['perfect.seg']
+        assert store.count('perfect.seg', data['true_path'], data['pred_path']) == 0
+        data = results['minor.seg']
+        assert store.count('minor.seg', data['true_path'], data['pred_path']) is None
+        assert data['mismatches'] == 2
+        assert list(data['mismatch_indices']) == []
+    finally:
+        store.close()
+
+
+def test_file_spans_match_streaming(seg_dirs):
+    engine = SegComparisonEngine(spans=True, streaming=True, block_size=3)
+    results = engine.compare_seg_directories(*seg_dirs)
+    store = SpanStore(results.spans_path)
+    try:
+        for filename in results:
+            data = results[filename]
+            spans = engine.file_spans(data['true_path'], data['pred_path'])
+            assert store.page(filename, data['true_path'], 0, 100) == [tuple(span) for span in spans]
+    finally:
+        store.close()
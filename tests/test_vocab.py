@@ -0,0 +1,72 @@
+import io
+import pickle
+
+import pytest
+
+import seg_vocab
+from seg_vocab import LabelVocabulary
+from seg_engine import SegComparisonEngine
+
+
+@pytest.fixture(params=[False, True], ids=['python', 'numpy'])
+def use_numpy(request, monkeypatch):
+    if request.param:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(seg_vocab, 'np', None)
+    return request.param
+
+
+def test_encode_and_decode(use_numpy):
+    vocabulary = LabelVocabulary()
+    true_codes = vocabulary.encode(['hole', 'face', '1', 'face'])
+    pred_codes = vocabulary.encode(['face', 'fillet', '1'])
+    assert list(true_codes) == [0, 1, 2, 1]
+    # 参考和预测共用词表，相同字符串得到相同编码
+    assert list(pred_codes) == [1, 3, 2]
+    assert vocabulary.decode(pred_codes) == ['face', 'fillet', '1']
+    assert len(vocabulary) == 4
+    # 已经是编码数组时原样返回
+    assert vocabulary.encode(true_codes) is true_codes
+
+
+def test_parse_strips_whitespace_and_blank_lines(use_numpy):
+    vocabulary = LabelVocabulary()
+    text = "1\n 2 \r\n\n1\n3"
+    # 块边界落在标签中间时也能正确拆分
+    codes = vocabulary.parse(io.StringIO(text), block_size=3)
+    assert vocabulary.decode(codes) == ['1', '2', '1', '3']
+
+
+def test_wide_codes(use_numpy):
+    vocabulary = LabelVocabulary()
+    labels = [str(i) for i in range(70000)]
+    codes = vocabulary.encode(labels)
+    assert vocabulary.typecode() == 'I'
+    assert int(codes[-1]) == 69999
+    assert vocabulary.decode(codes[-2:]) == ['69998', '69999']
+
+
+def test_encode_values_matches_text():
+    np = pytest.importorskip('numpy')
+    vocabulary = LabelVocabulary()
+    text_codes = vocabulary.encode(['7', '-3', '7'])
+    value_codes = vocabulary.encode_values(np.array([7, -3, 7, 10 ** 9]))
+    assert list(value_codes[:3]) == list(text_codes)
+    assert vocabulary.decode(value_codes[3:]) == [str(10 ** 9)]
+
+
+def test_pickle_keeps_codes():
+    vocabulary = LabelVocabulary(['a', 'b'])
+    copy = pickle.loads(pickle.dumps(vocabulary))
+    assert copy.labels == ['a', 'b']
+    assert copy.code('b') == 1
+    assert copy.code('c') == 2
+
+
+def test_engine_reads_interned_labels(tmp_path):
+    path = tmp_path / 'm.seg'
+    path.write_text("hole\nface\nhole\n")
+    engine = SegComparisonEngine()
+    codes = engine.read_labels(str(path))
+    assert engine.vocabulary.decode(codes) == ['hole', 'face', 'hole']